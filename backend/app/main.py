@@ -6,17 +6,27 @@ Aplicação principal FastAPI
 import logging
 import os
 from contextlib import asynccontextmanager
+from datetime import datetime
 from typing import Optional
 
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from app.config import settings
-from app.routers import cameras, gravacoes, stream, pessoas, grupos, parametros, auth, usuarios
-from app.services.recorder import recording_manager
+from app.routers import cameras, gravacoes, stream, pessoas, grupos, parametros, auth, usuarios, armazenamento
+from app.services.recorder import recording_manager, recover_in_progress
+from app.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
 from app.services.cleanup import cleanup_old_recordings
+from app.services.retention import retention_engine
+from app.services.partitions import ensure_partitions
+from app.services import rollups
+from app.services.faces import sync_face_counts
+from app.services.face_search import HISTORY_REBUILD_MINUTES as FACE_INDEX_REBUILD_MINUTES, face_index
+from app.services.archive import archive_old_recordings
+from app.services.transcoder import transcoder
 from app.services.mediamtx_client import sync_all_cameras
 from app.services.recorder import SyncSession
 from app.models import Camera
@@ -93,9 +103,84 @@ async def lifespan(app: FastAPI):
                 "ALTER TABLE cameras ADD COLUMN IF NOT EXISTS recursos VARCHAR(2000)"
             )
         )
+        session.execute(
+            sa_text(
+                "ALTER TABLE cameras ADD COLUMN IF NOT EXISTS quota_gb INTEGER"
+            )
+        )
+        session.execute(
+            sa_text(
+                "ALTER TABLE cameras ADD COLUMN IF NOT EXISTS zonas_movimento TEXT"
+            )
+        )
+        session.execute(
+            sa_text(
+                "ALTER TABLE cameras ADD COLUMN IF NOT EXISTS detector_movimento VARCHAR(20)"
+            )
+        )
+        session.execute(
+            sa_text(
+                "ALTER TABLE cameras ADD COLUMN IF NOT EXISTS onvif_url VARCHAR(500)"
+            )
+        )
+        session.execute(
+            sa_text(
+                "ALTER TABLE grupos ADD COLUMN IF NOT EXISTS quota_gb INTEGER"
+            )
+        )
+        session.execute(
+            sa_text(
+                "ALTER TABLE pessoas ADD COLUMN IF NOT EXISTS total_fotos INTEGER NOT NULL DEFAULT 0"
+            )
+        )
+        session.execute(
+            sa_text(
+                "ALTER TABLE reconhecimentos ADD COLUMN IF NOT EXISTS encoding BYTEA"
+            )
+        )
+        session.execute(
+            sa_text(
+                "ALTER TABLE gravacoes ADD COLUMN IF NOT EXISTS perfil_video VARCHAR(20)"
+            )
+        )
+        session.execute(
+            sa_text(
+                "ALTER TABLE gravacoes ADD COLUMN IF NOT EXISTS in_progress BOOLEAN DEFAULT FALSE"
+            )
+        )
+        session.execute(
+            sa_text(
+                "CREATE INDEX IF NOT EXISTS idx_gravacoes_in_progress ON gravacoes(in_progress) WHERE in_progress"
+            )
+        )
+        for column, column_type in (
+            ("atividade_max", "REAL"),
+            ("atividade_media", "REAL"),
+            ("atividade_serie", "BYTEA"),
+            ("atividade_mapa", "BYTEA"),
+            ("duracao_segundos", "REAL"),
+            ("codec_video", "VARCHAR(20)"),
+            ("largura", "INTEGER"),
+            ("altura", "INTEGER"),
+            ("bitrate_kbps", "INTEGER"),
+            ("keyframes", "INTEGER"),
+        ):
+            session.execute(
+                sa_text(f"ALTER TABLE gravacoes ADD COLUMN IF NOT EXISTS {column} {column_type}")
+            )
+        session.execute(
+            sa_text(
+                "CREATE INDEX IF NOT EXISTS idx_gravacoes_camera_atividade ON gravacoes(id_camera, atividade_max)"
+            )
+        )
+        session.execute(
+            sa_text(
+                "CREATE INDEX IF NOT EXISTS idx_reconhecimentos_pessoa_data ON reconhecimentos(id_pessoa, dt_registro)"
+            )
+        )
         session.commit()
         session.close()
-        logger.info("Migration face_analyzed / hr_ini / hr_fim / recursos verificada")
+        logger.info("Migration face_analyzed / hr_ini / hr_fim / recursos / quota_gb / zonas_movimento / detector_movimento / onvif_url / perfil_video / in_progress / atividade / metadados de mídia / total_fotos / encoding verificada")
 
         # Criar tabela parametros se não existir
         session2 = SyncSession()
@@ -201,6 +286,36 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Migration face_analyzed: {e}")
 
+    # Partições mensais futuras (somente se o banco foi particionado)
+    try:
+        session = SyncSession()
+        ensure_partitions(session)
+        session.close()
+    except Exception as e:
+        logger.warning(f"Erro ao criar partições: {e}")
+
+    # Rollups de uso por câmera (tabelas, triggers e carga inicial)
+    try:
+        session = SyncSession()
+        rollups.ensure_schema(session)
+        session.close()
+        logger.info("Rollups de uso por câmera verificados")
+    except Exception as e:
+        logger.warning(f"Erro ao preparar rollups de uso: {e}")
+
+    # Contagem de fotos de face (corrige fotos copiadas/apagadas direto no disco)
+    try:
+        session = SyncSession()
+        changed = sync_face_counts(session)
+        session.close()
+        if changed:
+            logger.info(f"Contagem de fotos atualizada para {changed} pessoa(s)")
+    except Exception as e:
+        logger.warning(f"Erro ao sincronizar contagem de fotos: {e}")
+
+    # Segmentos interrompidos no último encerramento (linhas in_progress)
+    recover_in_progress()
+
     # Inicia o serviço de gravação (somente se habilitado)
     if settings.RECORDING_ENABLED:
         try:
@@ -220,14 +335,44 @@ async def lifespan(app: FastAPI):
         id="cleanup_recordings",
         replace_existing=True,
     )
+    if settings.ARCHIVE_ENABLED:
+        scheduler.add_job(
+            archive_old_recordings,
+            "interval",
+            minutes=settings.ARCHIVE_INTERVAL_MINUTES,
+            id="archive_recordings",
+            replace_existing=True,
+        )
+        logger.info(
+            f"Arquivamento em {settings.S3_BUCKET} agendado a cada "
+            f"{settings.ARCHIVE_INTERVAL_MINUTES} min (gravações > {settings.ARCHIVE_AFTER_DAYS} dias)"
+        )
+    if settings.FACE_RECOGNITION_ENABLED:
+        scheduler.add_job(
+            face_index.rebuild,
+            "interval",
+            minutes=FACE_INDEX_REBUILD_MINUTES,
+            next_run_time=datetime.now(),
+            id="face_search_index",
+            replace_existing=True,
+        )
     scheduler.start()
     logger.info("Limpeza automática agendada para 03:00 diariamente")
 
+    # Retenção contínua (watermarks de disco + cotas por câmera/grupo)
+    retention_engine.start()
+
+    # Recodificação de gravações antigas para o perfil reduzido (opcional)
+    if settings.TRANSCODE_ENABLED:
+        transcoder.start()
+
     yield
 
     # Encerra serviços
     logger.info("Encerrando serviços...")
     recording_manager.stop_all()
+    retention_engine.stop()
+    transcoder.stop()
     scheduler.shutdown(wait=False)
     logger.info("Sistema encerrado")
 
@@ -258,6 +403,7 @@ app.include_router(grupos.router)
 app.include_router(parametros.router)
 app.include_router(auth.router)
 app.include_router(usuarios.router)
+app.include_router(armazenamento.router)
 
 
 # Rota de saúde
@@ -291,12 +437,20 @@ async def start_recording():
 
 @app.post("/api/recording/stop")
 async def stop_recording():
-    """Para a gravação de todas as câmeras (não-bloqueante)."""
+    """Para a gravação de todas as câmeras, salvando os segmentos em andamento."""
     import asyncio
     await asyncio.to_thread(recording_manager.stop_all)
     return {"message": "Gravação parada"}
 
 
+@app.post("/api/recording/restart")
+async def restart_recording():
+    """Reinício rápido: aplica câmeras novas/alteradas sem derrubar streams já conectados."""
+    import asyncio
+    result = await asyncio.to_thread(recording_manager.restart_all)
+    return {"message": "Gravação reiniciada", **result, "status": recording_manager.get_status()}
+
+
 @app.get("/api/recording/status")
 async def recording_status():
     """Retorna o status da gravação."""
@@ -306,6 +460,18 @@ async def recording_status():
     }
 
 
+@app.get("/api/recording/motion")
+async def recording_motion_stats():
+    """Estatísticas da detecção de movimento por câmera (disparos falsos, horas economizadas)."""
+    return {"cameras": recording_manager.get_motion_stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Telemetria do recorder por câmera no formato do Prometheus."""
+    return Response(recording_manager.render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 # ---- Controle de gravação contínua ----
 @app.post("/api/recording/continuous/start")
 async def start_continuous_recording():
@@ -420,10 +586,21 @@ def is_face_recognition_active() -> bool:
     return _face_recognition_active
 
 
-# Servir arquivos de gravação
+class RecordingsStaticFiles(StaticFiles):
+    """Resolve /recordings/... na primeira raiz de gravação que tiver o arquivo."""
+
+    def __init__(self, directories: list):
+        super().__init__(directory=directories[0])
+        self.all_directories = list(directories)
+
+
+# Servir arquivos de gravação (todos os volumes têm o mesmo layout relativo)
 if os.path.exists(settings.RECORDINGS_PATH):
     app.mount(
         "/recordings",
-        StaticFiles(directory=settings.RECORDINGS_PATH),
+        RecordingsStaticFiles(
+            [settings.RECORDINGS_PATH]
+            + [p for p in settings.RECORDINGS_PATHS if p != settings.RECORDINGS_PATH and os.path.isdir(p)]
+        ),
         name="recordings",
     )
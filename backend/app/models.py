@@ -1,8 +1,8 @@
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, BigInteger, ForeignKey, Text
+    Column, Integer, String, Boolean, DateTime, BigInteger, Float, ForeignKey, LargeBinary, Text
 )
-from sqlalchemy.orm import DeclarativeBase, relationship
+from sqlalchemy.orm import DeclarativeBase, deferred, relationship
 
 
 class Base(DeclarativeBase):
@@ -20,6 +20,10 @@ class Camera(Base):
     hr_ini = Column(Integer, nullable=True)   # Hora início gravação contínua (0-23)
     hr_fim = Column(Integer, nullable=True)   # Hora fim gravação contínua (0-23)
     recursos = Column(String(2000), nullable=True)  # JSON com info do stream (resolução, codec, fps)
+    quota_gb = Column(Integer, nullable=True)  # Cota de armazenamento da câmera (GB)
+    zonas_movimento = Column(Text, nullable=True)  # JSON com polígonos incluir/excluir (services/motion_zones.py)
+    detector_movimento = Column(String(20), nullable=True)  # "diferenca", "fundo", "cena", "onvif" ou None (padrão global)
+    onvif_url = Column(String(500), nullable=True)  # Device service ONVIF (padrão: host da URL RTSP)
     criada_em = Column(DateTime, default=datetime.now)
     atualizada_em = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -39,6 +43,20 @@ class Gravacao(Base):
     data_fim = Column(DateTime, nullable=False)
     tamanho_bytes = Column(BigInteger, default=0)
     face_analyzed = Column(Boolean, default=False)
+    perfil_video = Column(String(20), nullable=True)  # None, "original" ou "reduzido" (transcoder)
+    in_progress = Column(Boolean, default=False)  # Segmento ainda sendo gravado
+    # Atividade de movimento (services/activity.py); série e mapa carregados só sob demanda
+    atividade_max = Column(Float, nullable=True)
+    atividade_media = Column(Float, nullable=True)
+    atividade_serie = deferred(Column(LargeBinary, nullable=True))
+    atividade_mapa = deferred(Column(LargeBinary, nullable=True))
+    # Metadados de mídia capturados pelo recorder na finalização (services/segment_meta.py)
+    duracao_segundos = Column(Float, nullable=True)
+    codec_video = Column(String(20), nullable=True)
+    largura = Column(Integer, nullable=True)
+    altura = Column(Integer, nullable=True)
+    bitrate_kbps = Column(Integer, nullable=True)
+    keyframes = Column(Integer, nullable=True)
     criada_em = Column(DateTime, default=datetime.now)
 
     camera = relationship("Camera", back_populates="gravacoes")
@@ -54,6 +72,7 @@ class Pessoa(Base):
     id_pessoa = Column(Integer, primary_key=True, autoincrement=True)
     no_pessoa = Column(String(200), nullable=False)
     ao_tipo = Column(String(1), nullable=False, default='V')
+    total_fotos = Column(Integer, nullable=False, default=0)  # Fotos em faces/{id_pessoa}/, mantido pelos uploads
     criada_em = Column(DateTime, default=datetime.now)
     atualizada_em = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -71,6 +90,7 @@ class Reconhecimento(Base):
     id_camera = Column(Integer, ForeignKey("cameras.id", ondelete="CASCADE"), nullable=False)
     id_gravacao = Column(Integer, ForeignKey("gravacoes.id", ondelete="CASCADE"), nullable=True)
     dt_registro = Column(DateTime, default=datetime.now)
+    encoding = deferred(Column(LargeBinary, nullable=True))  # Encoding do rosto detectado (128 x float32)
 
     pessoa = relationship("Pessoa", back_populates="reconhecimentos")
     camera = relationship("Camera")
@@ -85,6 +105,7 @@ class Grupo(Base):
 
     id_grupo = Column(Integer, primary_key=True, autoincrement=True)
     no_grupo = Column(String(200), nullable=False)
+    quota_gb = Column(Integer, nullable=True)  # Cota de armazenamento somada das câmeras do grupo (GB)
     criado_em = Column(DateTime, default=datetime.now)
     atualizado_em = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -0,0 +1,55 @@
+"""
+Router de armazenamento: uso de disco, retenção e projeções.
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from app.services.retention import retention_engine
+from app.services.transcoder import transcoder
+from app.services import rollups, volumes
+
+router = APIRouter(prefix="/api/armazenamento", tags=["armazenamento"])
+
+
+@router.get("/retencao")
+async def status_retencao():
+    """Uso do disco, watermarks e dias de retenção projetados por câmera."""
+    return await asyncio.to_thread(retention_engine.projection)
+
+
+@router.post("/retencao/executar")
+async def executar_retencao():
+    """Antecipa a próxima rodada da retenção contínua."""
+    retention_engine.trigger()
+    return {"message": "Rodada de retenção agendada"}
+
+
+@router.get("/volumes")
+async def status_volumes():
+    """Espaço, throughput e latência de escrita de cada volume de gravação."""
+    return await asyncio.to_thread(volumes.stats)
+
+
+@router.get("/uso")
+async def uso_por_camera(
+    granularidade: str = Query("dia", pattern="^(hora|dia)$"),
+    dias: int = Query(7, ge=1, le=366),
+    camera_id: Optional[int] = None,
+):
+    """Bytes, horas gravadas, segmentos e reconhecimentos por câmera e hora/dia (tabelas de rollup)."""
+    return await asyncio.to_thread(rollups.summary, granularidade, dias, camera_id)
+
+
+@router.get("/previsao")
+async def previsao_disco():
+    """Previsão de enchimento do disco pela tendência diária de gravação."""
+    return await asyncio.to_thread(rollups.forecast)
+
+
+@router.get("/transcodificacao")
+async def status_transcodificacao():
+    """Progresso da recodificação de gravações antigas para o perfil reduzido."""
+    return transcoder.status()
@@ -7,7 +7,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models import Camera, CameraRec
-from app.schemas import CameraCreate, CameraUpdate, CameraResponse
+from app.schemas import CameraCreate, CameraUpdate, CameraResponse, ZonaMovimento
+from app.services import motion, motion_zones
 from app.services.mediamtx_client import add_camera_path, remove_camera_path
 from app.dependencies import get_current_user
 
@@ -17,6 +18,14 @@ import logging
 
 logger = logging.getLogger("cameras")
 
+
+def _check_detector(kind):
+    if kind and kind not in motion.DETECTOR_KINDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Detector inválido: {kind!r} (use {', '.join(motion.DETECTOR_KINDS)})",
+        )
+
 router = APIRouter(prefix="/api/cameras", tags=["cameras"])
 
 
@@ -68,6 +77,7 @@ async def criar_camera(
     user: dict = Depends(get_current_user),
 ):
     """Cadastra uma nova câmera e dá permissão ao criador."""
+    _check_detector(camera.detector_movimento)
     nova_camera = Camera(
         nome=camera.nome,
         rtsp_url=camera.rtsp_url,
@@ -75,6 +85,9 @@ async def criar_camera(
         continuos=camera.continuos,
         hr_ini=camera.hr_ini,
         hr_fim=camera.hr_fim,
+        quota_gb=camera.quota_gb,
+        detector_movimento=camera.detector_movimento or None,
+        onvif_url=camera.onvif_url or None,
     )
     db.add(nova_camera)
     await db.commit()
@@ -83,6 +96,7 @@ async def criar_camera(
     # Dá permissão ao criador
     db.add(CameraRec(id_camera=nova_camera.id, id_usuario=user["id_usuario"]))
     await db.commit()
+    motion.set_kind(nova_camera.id, nova_camera.detector_movimento)
 
     # Registra no MediaMTX
     if nova_camera.habilitada:
@@ -116,11 +130,21 @@ async def atualizar_camera(
         cam.hr_ini = camera.hr_ini
     if camera.hr_fim is not None:
         cam.hr_fim = camera.hr_fim
+    if camera.quota_gb is not None:
+        cam.quota_gb = camera.quota_gb or None  # 0 remove a cota
+    if camera.detector_movimento is not None:
+        _check_detector(camera.detector_movimento)
+        cam.detector_movimento = camera.detector_movimento or None
+    if camera.onvif_url is not None:
+        cam.onvif_url = camera.onvif_url or None
     cam.atualizada_em = datetime.utcnow()
 
     await db.commit()
     await db.refresh(cam)
 
+    # Troca de detector vale no próximo frame analisado
+    motion.set_kind(cam.id, cam.detector_movimento)
+
     # Sincroniza com MediaMTX
     if cam.habilitada:
         await add_camera_path(cam.id, cam.rtsp_url)
@@ -144,11 +168,52 @@ async def deletar_camera(
 
     await db.delete(cam)
     await db.commit()
+    motion_zones.forget(camera_id)
+    motion.set_kind(camera_id, None)
 
     # Remove do MediaMTX
     await remove_camera_path(camera_id)
 
 
+@router.get("/{camera_id}/zonas", response_model=List[ZonaMovimento])
+async def obter_zonas(camera_id: int, db: AsyncSession = Depends(get_db)):
+    """Zonas de movimento (polígonos incluir/excluir) da câmera."""
+    result = await db.execute(select(Camera.zonas_movimento).where(Camera.id == camera_id))
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="Câmera não encontrada")
+    return motion_zones.parse_zones(row.zonas_movimento)
+
+
+@router.put("/{camera_id}/zonas", response_model=List[ZonaMovimento])
+async def atualizar_zonas(
+    camera_id: int,
+    zonas: List[ZonaMovimento],
+    db: AsyncSession = Depends(get_db),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Substitui as zonas de movimento da câmera (lista vazia remove as zonas).
+    A nova máscara vale a partir do próximo frame analisado, sem reiniciar a gravação.
+    """
+    result = await db.execute(select(Camera).where(Camera.id == camera_id))
+    cam = result.scalar_one_or_none()
+    if not cam:
+        raise HTTPException(status_code=404, detail="Câmera não encontrada")
+
+    try:
+        validas = motion_zones.validate_zones([z.model_dump() for z in zonas])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    cam.zonas_movimento = json.dumps(validas) if validas else None
+    cam.atualizada_em = datetime.utcnow()
+    await db.commit()
+
+    motion_zones.update_zones(camera_id, cam.zonas_movimento)
+    return validas
+
+
 @router.patch("/{camera_id}/continuos", response_model=CameraResponse)
 async def toggle_continuos(
     camera_id: int,
@@ -1,10 +1,14 @@
 import os
+import time
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Optional
+from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -12,21 +16,199 @@ from app.database import get_db
 from app.models import Gravacao
 from app.schemas import GravacaoResponse
 from app.config import settings
+from app.services.playlist import build_vod_playlist
+from app.services.cleanup import remove_recording_files
+from app.services import activity, archive, clip_export, thumbnails, volumes
+from app.services.deletion import start_deletion_job, get_job, remove_empty_dirs
+from app.services.motion import MOTION_FPS
+from app.services.recorder import recording_manager
 
 router = APIRouter(prefix="/api/gravacoes", tags=["gravações"])
 logger = logging.getLogger("gravacoes")
 
+# Cache curto id → caminho do arquivo (evita consulta ao banco a cada range request)
+PATH_CACHE_TTL = 30
+PATH_CACHE_MAX = 4096
+_path_cache = {}
+
+# Tail de segmentos em gravação (?follow=true)
+TAIL_CHUNK_SIZE = 256 * 1024
+TAIL_POLL_SECONDS = 0.5
+TAIL_IDLE_TIMEOUT = 30          # Encerra se o arquivo parar de crescer
+
+# Playlist VOD: períodos com mais segmentos que isso são recusados (400), não cortados
+PLAYLIST_MAX_SEGMENTS = 2000
+
+
+async def _resolve_recording_path(gravacao_id: int, db: AsyncSession) -> str:
+    """Resolve o caminho do arquivo de uma gravação (404 se não existir)."""
+    now = time.monotonic()
+    cached = _path_cache.get(gravacao_id)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    result = await db.execute(
+        select(Gravacao.caminho_arquivo).where(Gravacao.id == gravacao_id)
+    )
+    file_path = result.scalar_one_or_none()
+    if not file_path:
+        raise HTTPException(status_code=404, detail="Gravação não encontrada")
+
+    if len(_path_cache) >= PATH_CACHE_MAX:
+        _path_cache.clear()
+    _path_cache[gravacao_id] = (file_path, now + PATH_CACHE_TTL)
+    return file_path
+
+
+def _forget_recording_paths(ids):
+    for gravacao_id in ids:
+        _path_cache.pop(gravacao_id, None)
+
+
+async def _resolve_current_path(gravacao_id: int, db: AsyncSession) -> str:
+    """Como `_resolve_recording_path`, revalidando se o arquivo local sumiu (arquivado)."""
+    file_path = await _resolve_recording_path(gravacao_id, db)
+    if not archive.is_archived(file_path) and not os.path.exists(file_path):
+        _forget_recording_paths([gravacao_id])
+        file_path = await _resolve_recording_path(gravacao_id, db)
+    return file_path
+
+
+def _parse_range(range_header: Optional[str], size: int) -> Optional[tuple]:
+    """Interpreta um cabeçalho Range de faixa única; None se ausente."""
+    if not range_header:
+        return None
+    try:
+        unit, _, spec = range_header.partition("=")
+        if unit.strip() != "bytes" or "," in spec:
+            raise ValueError
+        first, _, last = spec.strip().partition("-")
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+            end = size - 1
+        end = min(end, size - 1)
+        if start > end:
+            raise ValueError
+        return start, end
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail="Range inválido",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+
+async def _tail_recording(file_path: str):
+    """
+    Entrega um fMP4 em crescimento: lê até o fim, aguarda novos fragmentos e
+    continua enquanto o segmento estiver sendo gravado.
+    """
+    with open(file_path, "rb") as f:
+        idle = 0.0
+        while True:
+            chunk = await asyncio.to_thread(f.read, TAIL_CHUNK_SIZE)
+            if chunk:
+                idle = 0.0
+                yield chunk
+                continue
+            if not recording_manager.is_recording_path(file_path):
+                # Segmento finalizado: entrega o que o FFmpeg escreveu por último
+                rest = await asyncio.to_thread(f.read)
+                if rest:
+                    yield rest
+                break
+            idle += TAIL_POLL_SECONDS
+            if idle >= TAIL_IDLE_TIMEOUT:
+                break
+            await asyncio.sleep(TAIL_POLL_SECONDS)
+
+
+async def _serve_archived(uri: str, media_type: str, range_header: Optional[str],
+                          attachment: bool = False):
+    """Repassa a gravação arquivada (range requests via cache local de blocos)."""
+    try:
+        size = await asyncio.to_thread(archive.object_size, uri)
+    except Exception as e:
+        logger.error(f"Erro ao consultar gravação arquivada {uri}: {e}")
+        raise HTTPException(status_code=502, detail="Gravação arquivada indisponível")
+
+    filename = os.path.basename(uri)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'{"attachment" if attachment else "inline"}; filename="{filename}"',
+    }
+    byte_range = _parse_range(range_header, size)
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        archive.iter_range(uri, start, end),
+        status_code=status,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+def _serve_recording(file_path: str, media_type: str, attachment: bool = False):
+    """
+    Entrega o arquivo da gravação.
+
+    Com RECORDINGS_ACCEL_REDIRECT, devolve apenas o cabeçalho X-Accel-Redirect
+    e o nginx do frontend serve o arquivo (range, sendfile e cache); caso
+    contrário o próprio uvicorn envia o arquivo via FileResponse.
+    """
+    filename = os.path.basename(file_path)
+    disposition = f'{"attachment" if attachment else "inline"}; filename="{filename}"'
+
+    volume = volumes.volume_for(file_path) if settings.RECORDINGS_ACCEL_REDIRECT else None
+    if volume is not None:
+        # Volume 0 → /_recordings/, volume N → /_recordings_N/ (um alias por disco no nginx)
+        prefix = settings.RECORDINGS_ACCEL_PREFIX
+        if volume.index > 0:
+            prefix = f"{prefix.rstrip('/')}_{volume.index}/"
+        relative = volumes.relative_path(file_path).replace(os.sep, "/")
+        return Response(
+            headers={
+                "X-Accel-Redirect": prefix + quote(relative),
+                "Content-Type": media_type,
+                "Content-Disposition": disposition,
+            },
+        )
+
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Arquivo de vídeo não encontrado no disco")
+
+    return FileResponse(
+        path=file_path,
+        media_type=media_type,
+        headers={"Content-Disposition": disposition},
+    )
+
 
 @router.get("/", response_model=List[GravacaoResponse])
 async def listar_gravacoes(
     camera_id: Optional[int] = Query(None, description="Filtrar por ID da câmera"),
     data_inicio: Optional[datetime] = Query(None, description="Data/hora inicial"),
     data_fim: Optional[datetime] = Query(None, description="Data/hora final"),
+    atividade_min: Optional[float] = Query(
+        None, ge=0, le=100, description="Atividade de movimento máxima acima de N% dos pixels"
+    ),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
     db: AsyncSession = Depends(get_db),
 ):
-    """Lista gravações com filtros opcionais por câmera e intervalo de datas."""
+    """
+    Lista gravações com filtros opcionais por câmera, intervalo de datas e
+    atividade de movimento (respondido pelos metadados, sem decodificar vídeo).
+    """
     from sqlalchemy.orm import selectinload
     from app.models import Reconhecimento, Pessoa
 
@@ -41,6 +223,8 @@ async def listar_gravacoes(
         conditions.append(Gravacao.data_fim >= data_inicio)
     if data_fim is not None:
         conditions.append(Gravacao.data_inicio <= data_fim)
+    if atividade_min is not None:
+        conditions.append(Gravacao.atividade_max > atividade_min)
 
     if conditions:
         query = query.where(and_(*conditions))
@@ -59,6 +243,125 @@ async def listar_gravacoes(
     return gravacoes
 
 
+@router.get("/playlist.m3u8")
+async def playlist_gravacoes(
+    camera_id: int = Query(..., description="ID da câmera"),
+    data_inicio: datetime = Query(..., description="Data/hora inicial"),
+    data_fim: datetime = Query(..., description="Data/hora final"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Playlist HLS (fMP4) virtual cobrindo as gravações da câmera no intervalo.
+    Os segmentos são faixas de bytes dos próprios arquivos (sem transcodificação).
+    Intervalos com mais de PLAYLIST_MAX_SEGMENTS gravações retornam 400.
+    """
+    if data_fim <= data_inicio:
+        raise HTTPException(status_code=400, detail="data_fim deve ser posterior a data_inicio")
+
+    result = await db.execute(
+        select(Gravacao)
+        .where(and_(
+            Gravacao.id_camera == camera_id,
+            Gravacao.data_fim >= data_inicio,
+            Gravacao.data_inicio <= data_fim,
+        ))
+        .order_by(Gravacao.data_inicio)
+        .limit(PLAYLIST_MAX_SEGMENTS + 1)
+    )
+    gravacoes = result.scalars().all()
+    if not gravacoes:
+        raise HTTPException(status_code=404, detail="Nenhuma gravação encontrada no período")
+    if len(gravacoes) > PLAYLIST_MAX_SEGMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Período com mais de {PLAYLIST_MAX_SEGMENTS} gravações; reduza o intervalo",
+        )
+
+    # Indexação lê arquivos do disco: executa fora do event loop
+    content = await asyncio.to_thread(build_vod_playlist, gravacoes, data_inicio, data_fim)
+    return Response(
+        content=content,
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.get("/export")
+async def exportar_clipe(
+    camera_id: List[int] = Query(..., description="ID(s) da(s) câmera(s)"),
+    data_inicio: datetime = Query(..., description="Data/hora inicial"),
+    data_fim: datetime = Query(..., description="Data/hora final"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Exporta o intervalo como um único MP4 (stream copy, sem re-encoding),
+    concatenando os segmentos. Com várias câmeras, retorna um ZIP.
+    O arquivo é enviado ao cliente enquanto é produzido.
+    """
+    if data_fim <= data_inicio:
+        raise HTTPException(status_code=400, detail="data_fim deve ser posterior a data_inicio")
+    if (data_fim - data_inicio).total_seconds() > clip_export.EXPORT_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Intervalo máximo de exportação: {clip_export.EXPORT_MAX_SECONDS // 3600}h",
+        )
+
+    clips = []
+    for cam_id in dict.fromkeys(camera_id):
+        result = await db.execute(
+            select(Gravacao)
+            .where(and_(
+                Gravacao.id_camera == cam_id,
+                Gravacao.data_fim >= data_inicio,
+                Gravacao.data_inicio <= data_fim,
+            ))
+            .order_by(Gravacao.data_inicio)
+        )
+        gravacoes = [
+            g for g in result.scalars().all()
+            if archive.is_archived(g.caminho_arquivo) or os.path.exists(g.caminho_arquivo)
+        ]
+        if gravacoes:
+            clips.append((cam_id, gravacoes))
+
+    if not clips:
+        raise HTTPException(status_code=404, detail="Nenhuma gravação encontrada no período")
+
+    if len(clips) == 1:
+        cam_id, gravacoes = clips[0]
+        filename = clip_export.clip_filename(cam_id, data_inicio, data_fim)
+        headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+        cached = clip_export.get_cached(
+            clip_export.cache_key(cam_id, data_inicio, data_fim, gravacoes)
+        )
+        if cached is not None:
+            return Response(content=cached, media_type="video/mp4", headers=headers)
+
+        slot = clip_export.try_acquire_slot()
+        if slot is None:
+            raise HTTPException(status_code=429, detail="Muitas exportações em andamento, tente novamente")
+        # A vaga é liberada pelo gerador; a background task cobre o cliente que
+        # desconecta antes do primeiro chunk (gerador nunca iniciado)
+        return StreamingResponse(
+            clip_export.stream_clip(cam_id, gravacoes, data_inicio, data_fim, slot),
+            media_type="video/mp4",
+            headers=headers,
+            background=BackgroundTask(slot.release),
+        )
+
+    slot = clip_export.try_acquire_slot()
+    if slot is None:
+        raise HTTPException(status_code=429, detail="Muitas exportações em andamento, tente novamente")
+    filename = f"export_{data_inicio:%Y%m%d_%H%M%S}-{data_fim:%H%M%S}.zip"
+    return StreamingResponse(
+        clip_export.stream_zip(clips, data_inicio, data_fim, slot),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        background=BackgroundTask(slot.release),
+    )
+
+
 @router.get("/{gravacao_id}", response_model=GravacaoResponse)
 async def obter_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)):
     """Obtém detalhes de uma gravação específica."""
@@ -70,42 +373,136 @@ async def obter_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/{gravacao_id}/stream")
-async def stream_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)):
-    """Serve o arquivo de vídeo da gravação com suporte a range requests."""
+async def stream_gravacao(
+    gravacao_id: int,
+    follow: bool = Query(False, description="Acompanha o arquivo enquanto o segmento é gravado"),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Serve o arquivo de vídeo da gravação com suporte a range requests.
+    Com `follow=true` e o segmento ainda em gravação, o stream acompanha o
+    arquivo em crescimento (poucos segundos atrás do tempo real).
+    """
+    file_path = await _resolve_current_path(gravacao_id, db)
+    if archive.is_archived(file_path):
+        return await _serve_archived(file_path, "video/mp4", range_header)
+    if follow and not range_header and recording_manager.is_recording_path(file_path):
+        return StreamingResponse(
+            _tail_recording(file_path),
+            media_type="video/mp4",
+            headers={"Cache-Control": "no-cache"},
+        )
+    return _serve_recording(file_path, media_type="video/mp4")
+
+
+@router.get("/{gravacao_id}/thumbnails.vtt")
+async def thumbnails_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)):
+    """Trilha WebVTT de miniaturas (scrub preview); gera sob demanda se ausente."""
     result = await db.execute(select(Gravacao).where(Gravacao.id == gravacao_id))
     gravacao = result.scalar_one_or_none()
     if not gravacao:
         raise HTTPException(status_code=404, detail="Gravação não encontrada")
 
+    if gravacao.in_progress:
+        raise HTTPException(status_code=409, detail="Segmento ainda em gravação")
+
     file_path = gravacao.caminho_arquivo
-    if not os.path.exists(file_path):
+    if not archive.is_archived(file_path) and not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Arquivo de vídeo não encontrado no disco")
 
+    if not await asyncio.to_thread(thumbnails.ensure_thumbnails, file_path):
+        raise HTTPException(status_code=500, detail="Não foi possível gerar as miniaturas")
+
     return FileResponse(
-        path=file_path,
-        media_type="video/mp4",
-        filename=os.path.basename(file_path),
+        path=thumbnails.vtt_path(archive.local_path(file_path)),
+        media_type="text/vtt",
+        headers={"Cache-Control": "public, max-age=86400"},
     )
 
 
-@router.get("/{gravacao_id}/download")
-async def download_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)):
-    """Força o download do arquivo de vídeo da gravação."""
+@router.get("/{gravacao_id}/sprite.jpg")
+async def sprite_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)):
+    """Sprite sheet das miniaturas referenciado pela trilha WebVTT."""
     result = await db.execute(select(Gravacao).where(Gravacao.id == gravacao_id))
     gravacao = result.scalar_one_or_none()
     if not gravacao:
         raise HTTPException(status_code=404, detail="Gravação não encontrada")
 
+    if gravacao.in_progress:
+        raise HTTPException(status_code=409, detail="Segmento ainda em gravação")
+
     file_path = gravacao.caminho_arquivo
-    if not os.path.exists(file_path):
+    if not archive.is_archived(file_path) and not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Arquivo de vídeo não encontrado no disco")
 
+    if not await asyncio.to_thread(thumbnails.ensure_thumbnails, file_path):
+        raise HTTPException(status_code=500, detail="Não foi possível gerar as miniaturas")
+
     return FileResponse(
-        path=file_path,
-        media_type="application/octet-stream",
-        filename=os.path.basename(file_path),
-        headers={"Content-Disposition": f'attachment; filename="{os.path.basename(file_path)}"'},
+        path=thumbnails.sprite_path(archive.local_path(file_path)),
+        media_type="image/jpeg",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+
+
+@router.get("/{gravacao_id}/atividade")
+async def atividade_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)):
+    """Série de atividade de movimento do segmento (% de pixels alterados por frame analisado)."""
+    result = await db.execute(
+        select(Gravacao.data_inicio, Gravacao.atividade_max, Gravacao.atividade_media,
+               Gravacao.atividade_serie)
+        .where(Gravacao.id == gravacao_id)
     )
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="Gravação não encontrada")
+    if row.atividade_serie is None:
+        raise HTTPException(status_code=404, detail="Gravação sem dados de atividade")
+
+    return {
+        "id": gravacao_id,
+        "data_inicio": row.data_inicio,
+        "fps": MOTION_FPS,
+        "atividade_max": row.atividade_max,
+        "atividade_media": row.atividade_media,
+        "serie": activity.decode_series(row.atividade_serie),
+    }
+
+
+@router.get("/{gravacao_id}/atividade.png")
+async def mapa_atividade_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)):
+    """Mapa de calor da atividade de movimento do segmento."""
+    result = await db.execute(
+        select(Gravacao.atividade_mapa).where(Gravacao.id == gravacao_id)
+    )
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="Gravação não encontrada")
+
+    png = activity.heatmap_png(row.atividade_mapa) if row.atividade_mapa else None
+    if png is None:
+        raise HTTPException(status_code=404, detail="Gravação sem dados de atividade")
+    return Response(
+        content=png,
+        media_type="image/png",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+
+
+@router.get("/{gravacao_id}/download")
+async def download_gravacao(
+    gravacao_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Força o download do arquivo de vídeo da gravação."""
+    file_path = await _resolve_current_path(gravacao_id, db)
+    if archive.is_archived(file_path):
+        return await _serve_archived(
+            file_path, "application/octet-stream", range_header, attachment=True
+        )
+    return _serve_recording(file_path, media_type="application/octet-stream", attachment=True)
 
 @router.post("/{gravacao_id}/analyze")
 async def analisar_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)):
@@ -115,7 +512,12 @@ async def analisar_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db)
     if not gravacao:
         raise HTTPException(status_code=404, detail="Gravação não encontrada")
 
+    if gravacao.in_progress:
+        raise HTTPException(status_code=409, detail="Segmento ainda em gravação")
+
     file_path = gravacao.caminho_arquivo
+    if archive.is_archived(file_path):
+        raise HTTPException(status_code=409, detail="Gravação arquivada: análise indisponível")
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Arquivo de vídeo não encontrado no disco")
 
@@ -139,20 +541,24 @@ async def deletar_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db))
     gravacao = result.scalar_one_or_none()
     if not gravacao:
         raise HTTPException(status_code=404, detail="Gravação não encontrada")
+    if gravacao.in_progress:
+        raise HTTPException(status_code=409, detail="Segmento ainda em gravação")
 
     bytes_freed = 0
     dir_to_check = None
 
-    if gravacao.caminho_arquivo and os.path.exists(gravacao.caminho_arquivo):
-        bytes_freed = os.path.getsize(gravacao.caminho_arquivo)
-        dir_to_check = os.path.dirname(gravacao.caminho_arquivo)
-        os.remove(gravacao.caminho_arquivo)
+    file_path = gravacao.caminho_arquivo
+    if file_path and (archive.is_archived(file_path) or os.path.exists(file_path)):
+        dir_to_check = os.path.dirname(archive.local_path(file_path))
+        await asyncio.to_thread(remove_recording_files, file_path)
+        bytes_freed = gravacao.tamanho_bytes or 0
 
     await db.delete(gravacao)
     await db.commit()
+    _forget_recording_paths([gravacao_id])
 
     if dir_to_check:
-        _cleanup_empty_dirs({dir_to_check})
+        remove_empty_dirs({dir_to_check})
 
     return {
         "message": "Gravação excluída",
@@ -160,15 +566,17 @@ async def deletar_gravacao(gravacao_id: int, db: AsyncSession = Depends(get_db))
     }
 
 
-@router.delete("/", status_code=200)
+@router.delete("/", status_code=202)
 async def deletar_gravacoes(
     camera_id: Optional[int] = Query(None, description="Filtrar por ID da câmera"),
     data_inicio: Optional[datetime] = Query(None, description="Data/hora inicial"),
     data_fim: Optional[datetime] = Query(None, description="Data/hora final"),
-    db: AsyncSession = Depends(get_db),
 ):
-    """Remove gravações de um período, apaga os arquivos e limpa pastas vazias."""
-    query = select(Gravacao)
+    """
+    Remove gravações de um período em background: linhas apagadas em lotes
+    (DELETE ... RETURNING), arquivos apagados por um pool de threads.
+    Retorna o id do job para acompanhar em /api/gravacoes/jobs/{job_id}.
+    """
     conditions = []
 
     if camera_id is not None:
@@ -178,57 +586,18 @@ async def deletar_gravacoes(
     if data_fim is not None:
         conditions.append(Gravacao.data_inicio <= data_fim)
 
-    if conditions:
-        query = query.where(and_(*conditions))
-
-    result = await db.execute(query)
-    gravacoes = result.scalars().all()
+    descricao = f"camera={camera_id} inicio={data_inicio} fim={data_fim}"
+    job = start_deletion_job(conditions, descricao=descricao)
+    # Ids removidos não são conhecidos aqui: descarta o cache de caminhos
+    _path_cache.clear()
 
-    if not gravacoes:
-        return {"message": "Nenhuma gravação encontrada no período", "deletadas": 0}
+    return {"message": "Exclusão iniciada", **job.to_dict()}
 
-    dirs_to_check = set()
-    files_deleted = 0
-    bytes_freed = 0
-
-    for g in gravacoes:
-        if g.caminho_arquivo and os.path.exists(g.caminho_arquivo):
-            bytes_freed += os.path.getsize(g.caminho_arquivo)
-            os.remove(g.caminho_arquivo)
-            files_deleted += 1
-            dirs_to_check.add(os.path.dirname(g.caminho_arquivo))
-        await db.delete(g)
-
-    await db.commit()
-
-    cleaned_dirs = _cleanup_empty_dirs(dirs_to_check)
-
-    return {
-        "message": f"{files_deleted} gravações removidas",
-        "deletadas": files_deleted,
-        "bytes_liberados": bytes_freed,
-        "pastas_removidas": cleaned_dirs,
-    }
-
-
-def _cleanup_empty_dirs(dirs: set) -> int:
-    """Remove recursivamente diretórios vazios."""
-    removed = 0
-    recordings_root = settings.RECORDINGS_PATH
-
-    sorted_dirs = sorted(dirs, key=lambda d: d.count(os.sep), reverse=True)
-
-    for d in sorted_dirs:
-        current = d
-        while current and current != recordings_root and current.startswith(recordings_root):
-            try:
-                if os.path.isdir(current) and not os.listdir(current):
-                    os.rmdir(current)
-                    removed += 1
-                    current = os.path.dirname(current)
-                else:
-                    break
-            except OSError:
-                break
 
-    return removed
+@router.get("/jobs/{job_id}")
+async def status_exclusao(job_id: str):
+    """Progresso de uma exclusão em massa."""
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.to_dict()
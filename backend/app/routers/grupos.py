@@ -29,6 +29,7 @@ def _build_grupo_response(grupo: Grupo) -> dict:
     return {
         "id_grupo": grupo.id_grupo,
         "no_grupo": grupo.no_grupo,
+        "quota_gb": grupo.quota_gb,
         "criado_em": grupo.criado_em,
         "atualizado_em": grupo.atualizado_em,
         "cameras": cameras_list,
@@ -65,7 +66,7 @@ async def obter_grupo(id_grupo: int, db: AsyncSession = Depends(get_db)):
 @router.post("/", response_model=GrupoResponse, status_code=201)
 async def criar_grupo(grupo: GrupoCreate, db: AsyncSession = Depends(get_db)):
     """Cadastra um novo grupo de câmeras."""
-    novo_grupo = Grupo(no_grupo=grupo.no_grupo)
+    novo_grupo = Grupo(no_grupo=grupo.no_grupo, quota_gb=grupo.quota_gb)
     db.add(novo_grupo)
     await db.flush()
 
@@ -107,6 +108,8 @@ async def atualizar_grupo(
 
     if grupo.no_grupo is not None:
         g.no_grupo = grupo.no_grupo
+    if grupo.quota_gb is not None:
+        g.quota_gb = grupo.quota_gb or None  # 0 remove a cota
 
     # Atualizar câmeras associadas (se fornecido)
     if grupo.camera_ids is not None:
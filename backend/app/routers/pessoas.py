@@ -3,25 +3,26 @@ Router para gerenciamento de Pessoas (cadastro + reconhecimento facial).
 """
 
 import os
+import asyncio
 import logging
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models import Pessoa, Reconhecimento, Camera
 from app.schemas import PessoaCreate, PessoaUpdate, PessoaResponse, ReconhecimentoResponse
-from app.config import settings
+from app.services import visitas
+from app.services.faces import FACES_DIR, count_faces, face_files
 
 logger = logging.getLogger("pessoas")
 
 router = APIRouter(prefix="/api/pessoas", tags=["pessoas"])
 
-FACES_DIR = os.path.join(settings.RECORDINGS_PATH, "faces")
-
 
 def _get_face_dir(id_pessoa: int) -> str:
     """Retorna o diretório de faces de uma pessoa."""
@@ -30,31 +31,64 @@ def _get_face_dir(id_pessoa: int) -> str:
     return dir_path
 
 
-def _count_faces(id_pessoa: int) -> int:
-    """Conta quantas fotos de face uma pessoa tem."""
-    dir_path = os.path.join(FACES_DIR, str(id_pessoa))
-    if not os.path.exists(dir_path):
-        return 0
-    return len([f for f in os.listdir(dir_path) if f.endswith(('.jpg', '.jpeg', '.png'))])
+@router.get("/", response_model=List[PessoaResponse])
+async def listar_pessoas(
+    ao_tipo: Optional[str] = Query(None, description="Filtrar por tipo (S, C, A ou V)"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Tamanho da página (omitido: todas)"),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Lista as pessoas cadastradas com fotos, total de reconhecimentos e o
+    último reconhecimento (câmera e horário), em uma única consulta.
+
+    Sem `limit` retorna todas; os reconhecimentos são agregados só para as
+    pessoas retornadas.
+    """
+    if ao_tipo is not None and ao_tipo not in ('S', 'C', 'A', 'V'):
+        raise HTTPException(status_code=400, detail="Tipo inválido. Use S, C, A ou V.")
 
+    pagina = select(Pessoa.id_pessoa)
+    if ao_tipo:
+        pagina = pagina.where(Pessoa.ao_tipo == ao_tipo)
+    pagina = pagina.order_by(Pessoa.id_pessoa).limit(limit).offset(offset).cte("pagina")
+
+    agregado = (
+        select(
+            Reconhecimento.id_pessoa,
+            func.count().label("total"),
+            func.max(Reconhecimento.dt_registro).label("ultimo"),
+            array_agg(
+                aggregate_order_by(Reconhecimento.id_camera, Reconhecimento.dt_registro.desc())
+            )[1].label("id_camera"),
+        )
+        .where(Reconhecimento.id_pessoa.in_(select(pagina.c.id_pessoa)))
+        .group_by(Reconhecimento.id_pessoa)
+        .subquery()
+    )
 
-@router.get("/", response_model=List[PessoaResponse])
-async def listar_pessoas(db: AsyncSession = Depends(get_db)):
-    """Lista todas as pessoas cadastradas."""
-    result = await db.execute(select(Pessoa).order_by(Pessoa.id_pessoa))
-    pessoas = result.scalars().all()
+    result = await db.execute(
+        select(Pessoa, agregado.c.total, agregado.c.ultimo, agregado.c.id_camera, Camera.nome)
+        .join(pagina, pagina.c.id_pessoa == Pessoa.id_pessoa)
+        .outerjoin(agregado, agregado.c.id_pessoa == Pessoa.id_pessoa)
+        .outerjoin(Camera, Camera.id == agregado.c.id_camera)
+        .order_by(Pessoa.id_pessoa)
+    )
 
     response = []
-    for p in pessoas:
-        pessoa_dict = {
+    for p, total, ultimo, id_camera, camera_nome in result.all():
+        response.append({
             "id_pessoa": p.id_pessoa,
             "no_pessoa": p.no_pessoa,
             "ao_tipo": p.ao_tipo,
             "criada_em": p.criada_em,
             "atualizada_em": p.atualizada_em,
-            "total_fotos": _count_faces(p.id_pessoa),
-        }
-        response.append(pessoa_dict)
+            "total_fotos": p.total_fotos,
+            "total_reconhecimentos": total or 0,
+            "ultimo_reconhecimento": ultimo,
+            "ultima_camera_id": id_camera,
+            "ultima_camera_nome": camera_nome,
+        })
     return response
 
 
@@ -72,7 +106,7 @@ async def obter_pessoa(id_pessoa: int, db: AsyncSession = Depends(get_db)):
         "ao_tipo": pessoa.ao_tipo,
         "criada_em": pessoa.criada_em,
         "atualizada_em": pessoa.atualizada_em,
-        "total_fotos": _count_faces(pessoa.id_pessoa),
+        "total_fotos": pessoa.total_fotos,
     }
 
 
@@ -130,7 +164,7 @@ async def atualizar_pessoa(
         "ao_tipo": p.ao_tipo,
         "criada_em": p.criada_em,
         "atualizada_em": p.atualizada_em,
-        "total_fotos": _count_faces(p.id_pessoa),
+        "total_fotos": p.total_fotos,
     }
 
 
@@ -183,7 +217,9 @@ async def upload_face(
     with open(filepath, "wb") as f:
         f.write(content)
 
-    total = _count_faces(id_pessoa)
+    total = count_faces(id_pessoa)
+    pessoa.total_fotos = total
+    await db.commit()
     logger.info(f"Face salva para pessoa {id_pessoa}: {filename} (total: {total})")
 
     # Invalida cache de reconhecimento facial
@@ -204,14 +240,7 @@ async def listar_faces(id_pessoa: int, db: AsyncSession = Depends(get_db)):
     if not pessoa:
         raise HTTPException(status_code=404, detail="Pessoa não encontrada")
 
-    face_dir = os.path.join(FACES_DIR, str(id_pessoa))
-    if not os.path.exists(face_dir):
-        return {"faces": [], "total": 0}
-
-    faces = sorted([
-        f for f in os.listdir(face_dir)
-        if f.endswith(('.jpg', '.jpeg', '.png'))
-    ])
+    faces = face_files(id_pessoa)
 
     return {
         "faces": [
@@ -239,6 +268,12 @@ async def deletar_face(
     os.remove(filepath)
     logger.info(f"Face removida: pessoa {id_pessoa}, arquivo {filename}")
 
+    result = await db.execute(select(Pessoa).where(Pessoa.id_pessoa == id_pessoa))
+    pessoa = result.scalar_one_or_none()
+    if pessoa:
+        pessoa.total_fotos = count_faces(id_pessoa)
+        await db.commit()
+
     # Invalida cache de reconhecimento facial
     try:
         from app.services.face_recognition_service import invalidate_cache
@@ -254,13 +289,38 @@ async def obter_face_image(id_pessoa: int):
     if not os.path.exists(face_dir):
          raise HTTPException(status_code=404, detail="Diretório de faces não encontrado")
     
-    faces = [f for f in os.listdir(face_dir) if f.endswith(('.jpg', '.jpeg', '.png'))]
+    faces = face_files(id_pessoa)
     if not faces:
         raise HTTPException(status_code=404, detail="Nenhuma foto encontrada")
     
     # Retorna a primeira (geralmente a mais antiga/cadastro)
     from fastapi.responses import FileResponse
-    return FileResponse(os.path.join(face_dir, sorted(faces)[0]))
+    return FileResponse(os.path.join(face_dir, faces[0]))
+
+
+# ---- Busca por foto ----
+
+@router.post("/busca-por-foto")
+async def buscar_por_foto(
+    file: UploadFile = File(...),
+    k: int = Query(10, ge=1, le=100, description="Quantidade máxima de pessoas candidatas"),
+    tolerancia: float = Query(0.6, gt=0, le=1.0, description="Distância máxima entre encodings"),
+    limite_ocorrencias: int = Query(50, ge=1, le=500),
+):
+    """
+    Procura a pessoa da foto na galeria de faces e nos rostos já detectados nas
+    gravações: retorna as pessoas candidatas com a distância e as ocorrências
+    (câmera, horário e gravação), sem cadastrar nada.
+    """
+    from app.services.face_search import face_index
+
+    content = await file.read()
+    try:
+        return await asyncio.to_thread(face_index.search, content, k, tolerancia, limite_ocorrencias)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 # ---- Reconhecimentos ----
@@ -291,6 +351,35 @@ async def listar_reconhecimentos_pessoa(
     return reconhecimentos
 
 
+@router.get("/{id_pessoa}/visitas")
+async def visitas_pessoa(
+    id_pessoa: int,
+    data_inicio: Optional[datetime] = Query(None, description="Data/hora inicial (padrão: 30 dias antes do fim)"),
+    data_fim: Optional[datetime] = Query(None, description="Data/hora final (padrão: agora)"),
+    camera_id: Optional[int] = Query(None, description="Filtrar por ID da câmera"),
+    intervalo_max: Optional[int] = Query(
+        None, ge=1, le=86400,
+        description="Segundos sem reconhecimento que encerram uma visita (padrão: dois segmentos)",
+    ),
+    limit: int = Query(200, ge=1, le=2000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Linha do tempo da pessoa: reconhecimentos consecutivos na mesma câmera
+    agrupados em visitas (primeiro/último reconhecimento, segmentos e links
+    para as gravações).
+    """
+    result = await db.execute(select(Pessoa.id_pessoa).where(Pessoa.id_pessoa == id_pessoa))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Pessoa não encontrada")
+    if data_inicio and data_fim and data_inicio >= data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior a data_fim")
+
+    return await asyncio.to_thread(
+        visitas.timeline, id_pessoa, data_inicio, data_fim, camera_id, intervalo_max, limit
+    )
+
+
 @router.get("/reconhecimentos/recentes", response_model=List[ReconhecimentoResponse])
 async def listar_reconhecimentos_recentes(
     db: AsyncSession = Depends(get_db),
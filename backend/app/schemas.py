@@ -13,6 +13,9 @@ class CameraBase(BaseModel):
     hr_ini: Optional[int] = None
     hr_fim: Optional[int] = None
     recursos: Optional[str] = None
+    quota_gb: Optional[int] = None
+    detector_movimento: Optional[str] = None   # "diferenca", "fundo", "cena", "onvif" ou None (padrão global)
+    onvif_url: Optional[str] = None            # Device service ONVIF (padrão: host da URL RTSP)
 
 
 class CameraCreate(CameraBase):
@@ -26,6 +29,9 @@ class CameraUpdate(BaseModel):
     continuos: Optional[bool] = None
     hr_ini: Optional[int] = None
     hr_fim: Optional[int] = None
+    quota_gb: Optional[int] = None
+    detector_movimento: Optional[str] = None   # "" volta ao padrão global
+    onvif_url: Optional[str] = None            # "" volta ao padrão (host da URL RTSP)
 
 
 class CameraResponse(CameraBase):
@@ -37,6 +43,11 @@ class CameraResponse(CameraBase):
         from_attributes = True
 
 
+class ZonaMovimento(BaseModel):
+    tipo: str                    # "incluir" ou "excluir"
+    pontos: List[List[float]]    # [[x, y], ...] normalizados (0-1)
+
+
 # ---- Pessoa Schemas ----
 
 class PessoaBase(BaseModel):
@@ -58,6 +69,10 @@ class PessoaResponse(PessoaBase):
     criada_em: datetime
     atualizada_em: datetime
     total_fotos: int = 0
+    total_reconhecimentos: int = 0
+    ultimo_reconhecimento: Optional[datetime] = None
+    ultima_camera_id: Optional[int] = None
+    ultima_camera_nome: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -100,6 +115,16 @@ class GravacaoCreate(GravacaoBase):
 class GravacaoResponse(GravacaoBase):
     id: int
     face_analyzed: bool = False
+    perfil_video: Optional[str] = None
+    in_progress: bool = False
+    atividade_max: Optional[float] = None
+    atividade_media: Optional[float] = None
+    duracao_segundos: Optional[float] = None
+    codec_video: Optional[str] = None
+    largura: Optional[int] = None
+    altura: Optional[int] = None
+    bitrate_kbps: Optional[int] = None
+    keyframes: Optional[int] = None
     criada_em: datetime
     reconhecimentos: List[ReconhecimentoResponse] = []
 
@@ -125,6 +150,7 @@ class StreamInfo(BaseModel):
 
 class GrupoBase(BaseModel):
     no_grupo: str
+    quota_gb: Optional[int] = None
 
 
 class GrupoCreate(GrupoBase):
@@ -133,6 +159,7 @@ class GrupoCreate(GrupoBase):
 
 class GrupoUpdate(BaseModel):
     no_grupo: Optional[str] = None
+    quota_gb: Optional[int] = None
     camera_ids: Optional[List[int]] = None
 
 
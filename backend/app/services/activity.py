@@ -0,0 +1,74 @@
+"""
+Atividade de movimento por segmento.
+
+Durante a gravação por movimento, cada frame analisado (160x120, 2 FPS) já
+tem a % de pixels alterados calculada. Em vez de descartá-la, o recorder
+acumula por segmento:
+- série de atividade: 1 byte por frame analisado (0-255 ↔ 0-100%)
+- mapa de calor: fração dos frames em que cada pixel mudou (160x120, uint8)
+
+Ambos ficam na linha de `gravacoes` (atividade_serie / atividade_mapa), junto
+com `atividade_max` e `atividade_media`, para que buscas como "segmentos da
+câmera X com atividade > N% entre t1 e t2" sejam respondidas só pelo banco,
+sem decodificar vídeo.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+HEATMAP_WIDTH = 160
+HEATMAP_HEIGHT = 120
+ACTIVITY_SCALE = 255 / 100      # % → byte
+
+
+class ActivityAccumulator:
+    """Acumula a atividade dos frames analisados de um segmento."""
+
+    def __init__(self):
+        self.series = bytearray()
+        self.counts = np.zeros((HEATMAP_HEIGHT, HEATMAP_WIDTH), dtype=np.uint32)
+
+    def add(self, pct: float, changed):
+        """Registra um frame: % de pixels alterados e máscara booleana dos pixels."""
+        self.series.append(min(int(round(pct * ACTIVITY_SCALE)), 255))
+        if changed is not None and changed.shape == self.counts.shape:
+            self.counts += changed
+
+    def summary(self) -> Optional[dict]:
+        """Valores das colunas de atividade (None se nenhum frame foi analisado)."""
+        frames = len(self.series)
+        if not frames:
+            return None
+        values = np.frombuffer(bytes(self.series), dtype=np.uint8)
+        heatmap = (self.counts * 255 // frames).astype(np.uint8)
+        return {
+            "atividade_serie": bytes(self.series),
+            "atividade_mapa": heatmap.tobytes(),
+            "atividade_max": round(float(values.max()) / ACTIVITY_SCALE, 2),
+            "atividade_media": round(float(values.mean()) / ACTIVITY_SCALE, 2),
+        }
+
+
+def decode_series(data: bytes) -> list:
+    """Série armazenada → lista de % por frame analisado."""
+    return [round(value / ACTIVITY_SCALE, 2) for value in data or b""]
+
+
+def heatmap_png(data: bytes, scale: int = 4) -> Optional[bytes]:
+    """Renderiza o mapa de calor armazenado como PNG colorido (ampliado `scale` vezes)."""
+    import cv2
+
+    if not data or len(data) != HEATMAP_WIDTH * HEATMAP_HEIGHT:
+        return None
+    heatmap = np.frombuffer(data, dtype=np.uint8).reshape((HEATMAP_HEIGHT, HEATMAP_WIDTH))
+    # Estica o contraste para o pico do segmento
+    peak = int(heatmap.max())
+    if peak:
+        heatmap = (heatmap.astype(np.uint16) * 255 // peak).astype(np.uint8)
+    image = cv2.applyColorMap(heatmap, cv2.COLORMAP_JET)
+    image = cv2.resize(
+        image, (HEATMAP_WIDTH * scale, HEATMAP_HEIGHT * scale), interpolation=cv2.INTER_NEAREST
+    )
+    ok, encoded = cv2.imencode(".png", image)
+    return encoded.tobytes() if ok else None
@@ -0,0 +1,408 @@
+"""
+Arquivamento de gravações em object store compatível com S3 (ex.: MinIO).
+
+Gravações com mais de ARCHIVE_AFTER_DAYS dias são enviadas ao bucket
+(upload multipart em streaming, com concorrência limitada), o
+`caminho_arquivo` passa a ser `s3://<bucket>/<camera>/<YYYY-MM-DD>/<arquivo>`
+e o vídeo local é apagado. Os sidecars (índice de fragmentos, sprite e VTT)
+continuam no disco local, no mesmo caminho de antes.
+
+Playback de gravações arquivadas: o backend repassa os range requests ao
+object store em blocos fixos (CACHE_BLOCK_SIZE), guardados em um cache local
+LRU (read-through) limitado a ARCHIVE_CACHE_MAX_GB.
+
+O boto3 é opcional: sem ele o arquivamento fica desabilitado.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from app.config import settings
+from app.services import volumes
+
+logger = logging.getLogger("archive")
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+    ARCHIVE_AVAILABLE = True
+except ImportError:
+    ARCHIVE_AVAILABLE = False
+    if settings.ARCHIVE_ENABLED:
+        logger.warning("boto3 não instalado. Arquivamento em object store DESABILITADO.")
+
+ARCHIVE_SCHEME = "s3://"
+
+# ---- Upload ----
+ARCHIVE_BATCH = 200                        # Gravações por rodada do job
+ARCHIVE_MAX_CONCURRENT_FILES = 2           # Arquivos enviados em paralelo
+ARCHIVE_UPLOAD_CONCURRENCY = 4             # Partes simultâneas por arquivo
+ARCHIVE_MULTIPART_CHUNK = 8 * 1024 * 1024  # Tamanho de cada parte
+
+# ---- Cache de leitura ----
+CACHE_BLOCK_SIZE = 4 * 1024 * 1024
+OBJECT_SIZE_CACHE_MAX = 4096
+
+_client_lock = threading.Lock()
+_client = None
+_bucket_checked = False
+
+_cache_lock = threading.Lock()
+_cache_blocks: "OrderedDict[str, int]" = OrderedDict()
+_cache_bytes = 0
+_cache_loaded = False
+_object_sizes: "OrderedDict[str, int]" = OrderedDict()
+
+
+def is_archived(path: Optional[str]) -> bool:
+    return bool(path) and path.startswith(ARCHIVE_SCHEME)
+
+
+def _split_uri(uri: str) -> tuple:
+    bucket, _, key = uri[len(ARCHIVE_SCHEME):].partition("/")
+    return bucket, key
+
+
+def object_key(path: str) -> str:
+    """Chave no bucket: caminho relativo à raiz do volume de gravação."""
+    relative = volumes.relative_path(path) or os.path.relpath(path, settings.RECORDINGS_PATH)
+    return relative.replace(os.sep, "/")
+
+
+def local_path(path: str) -> str:
+    """
+    Caminho local da gravação (para arquivadas, onde ficam os sidecars):
+    o volume cujo diretório do dia ainda existe, ou o principal.
+    """
+    if not is_archived(path):
+        return path
+    _, key = _split_uri(path)
+    parts = key.split("/")
+    for root in volumes.roots():
+        candidate = os.path.join(root, *parts)
+        if os.path.isdir(os.path.dirname(candidate)):
+            return candidate
+    return os.path.join(settings.RECORDINGS_PATH, *parts)
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = boto3.client(
+                "s3",
+                endpoint_url=settings.S3_ENDPOINT_URL or None,
+                aws_access_key_id=settings.S3_ACCESS_KEY or None,
+                aws_secret_access_key=settings.S3_SECRET_KEY or None,
+                region_name=settings.S3_REGION,
+                config=BotoConfig(
+                    max_pool_connections=ARCHIVE_MAX_CONCURRENT_FILES * ARCHIVE_UPLOAD_CONCURRENCY + 8,
+                    retries={"max_attempts": 5, "mode": "standard"},
+                ),
+            )
+        return _client
+
+
+def _ensure_bucket(client):
+    global _bucket_checked
+    if _bucket_checked:
+        return
+    try:
+        client.head_bucket(Bucket=settings.S3_BUCKET)
+    except ClientError:
+        client.create_bucket(Bucket=settings.S3_BUCKET)
+        logger.info(f"Bucket criado: {settings.S3_BUCKET}")
+    _bucket_checked = True
+
+
+# ---- Arquivamento ----
+
+def _upload(path: str) -> Optional[tuple]:
+    """Envia a gravação ao bucket; retorna (URI, tamanho enviado) ou None em caso de erro."""
+    client = get_client()
+    key = object_key(path)
+    try:
+        size = os.path.getsize(path)
+        client.upload_file(
+            path,
+            settings.S3_BUCKET,
+            key,
+            ExtraArgs={"ContentType": "video/mp4"},
+            Config=TransferConfig(
+                multipart_threshold=ARCHIVE_MULTIPART_CHUNK,
+                multipart_chunksize=ARCHIVE_MULTIPART_CHUNK,
+                max_concurrency=ARCHIVE_UPLOAD_CONCURRENCY,
+            ),
+        )
+        head = client.head_object(Bucket=settings.S3_BUCKET, Key=key)
+        if head["ContentLength"] != size:
+            logger.error(f"Tamanho divergente após upload de {path}")
+            return None
+        return f"{ARCHIVE_SCHEME}{settings.S3_BUCKET}/{key}", size
+    except Exception as e:
+        logger.error(f"Erro ao arquivar {path}: {e}")
+        return None
+
+
+def archive_old_recordings():
+    """
+    Arquiva as gravações locais mais antigas que ARCHIVE_AFTER_DAYS.
+
+    Com o transcoder habilitado, pula as gravações que ele ainda vai tratar
+    (`perfil_video` vazio e sem reconhecimentos), para os dois jobs nunca
+    disputarem o mesmo arquivo. O UPDATE só vale se o caminho e o tamanho no
+    banco ainda são os do arquivo enviado; caso contrário o objeto é removido
+    do bucket e o arquivo local fica.
+    """
+    if not ARCHIVE_AVAILABLE:
+        return
+
+    from sqlalchemy import exists, select, update
+    from app.models import Gravacao, Reconhecimento
+    from app.services import fragment_index
+    from app.services.recorder import SyncSession
+
+    cutoff = datetime.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    session = SyncSession()
+    try:
+        _ensure_bucket(get_client())
+        query = (
+            select(Gravacao.id, Gravacao.caminho_arquivo)
+            .where(
+                Gravacao.data_fim < cutoff,
+                ~Gravacao.caminho_arquivo.startswith(ARCHIVE_SCHEME),
+            )
+            .order_by(Gravacao.data_inicio)
+            .limit(ARCHIVE_BATCH)
+        )
+        if settings.TRANSCODE_ENABLED:
+            # Ainda pendente no transcoder (mesmo critério de Transcoder._candidates):
+            # ele pode trocar o arquivo durante o upload
+            query = query.where(
+                Gravacao.perfil_video.isnot(None)
+                | exists().where(Reconhecimento.id_gravacao == Gravacao.id)
+            )
+        rows = session.execute(query).all()
+        rows = [(gid, path) for gid, path in rows if os.path.exists(path)]
+        if not rows:
+            return
+
+        archived = 0
+        with ThreadPoolExecutor(max_workers=ARCHIVE_MAX_CONCURRENT_FILES,
+                                thread_name_prefix="archive") as pool:
+            for (gid, path), uploaded in zip(rows, pool.map(lambda r: _upload(r[1]), rows)):
+                if uploaded is None:
+                    continue
+                uri, size = uploaded
+                result = session.execute(
+                    update(Gravacao)
+                    .where(
+                        Gravacao.id == gid,
+                        Gravacao.caminho_arquivo == path,
+                        Gravacao.tamanho_bytes == size,
+                    )
+                    .values(caminho_arquivo=uri)
+                )
+                session.commit()
+                if result.rowcount != 1:
+                    # Gravação alterada (ou apagada) durante o upload: o objeto não vale mais
+                    logger.warning(f"Gravação {gid} alterada durante o arquivamento; upload descartado")
+                    try:
+                        delete_object(uri)
+                    except Exception as e:
+                        logger.error(f"Erro ao remover objeto descartado {uri}: {e}")
+                    continue
+                # Índice/miniaturas permanecem locais; só o vídeo sai do disco
+                os.remove(path)
+                fragment_index.invalidate(path)
+                archived += 1
+
+        logger.info(f"Arquivamento: {archived}/{len(rows)} gravações enviadas para {settings.S3_BUCKET}")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erro no arquivamento: {e}")
+    finally:
+        session.close()
+
+
+def delete_object(uri: str):
+    """Remove o objeto arquivado e seus blocos do cache local."""
+    bucket, key = _split_uri(uri)
+    get_client().delete_object(Bucket=bucket, Key=key)
+    _purge_cached(uri)
+
+
+def drop_expired_days(cutoff_day) -> int:
+    """
+    Remove do bucket os prefixos `<camera>/<YYYY-MM-DD>/` anteriores a `cutoff_day`
+    (mesma granularidade por dia da limpeza local). Retorna os objetos removidos.
+    """
+    if not ARCHIVE_AVAILABLE:
+        return 0
+
+    client = get_client()
+    paginator = client.get_paginator("list_objects_v2")
+    removed = 0
+
+    def prefixes(prefix):
+        for page in paginator.paginate(Bucket=settings.S3_BUCKET, Prefix=prefix, Delimiter="/"):
+            for entry in page.get("CommonPrefixes", []):
+                yield entry["Prefix"]
+
+    for camera_prefix in prefixes(""):
+        for day_prefix in prefixes(camera_prefix):
+            try:
+                day = datetime.strptime(day_prefix.rstrip("/").rsplit("/", 1)[-1], "%Y-%m-%d").date()
+            except ValueError:
+                continue
+            if day >= cutoff_day:
+                continue
+            for page in paginator.paginate(Bucket=settings.S3_BUCKET, Prefix=day_prefix):
+                objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+                if objects:
+                    client.delete_objects(Bucket=settings.S3_BUCKET, Delete={"Objects": objects})
+                    removed += len(objects)
+    return removed
+
+
+def presigned_url(uri: str, expires: int = 3600) -> str:
+    """URL temporária para leitura direta do objeto (ex.: pelo FFmpeg)."""
+    bucket, key = _split_uri(uri)
+    return get_client().generate_presigned_url(
+        "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires
+    )
+
+
+# ---- Leitura com cache local (read-through) ----
+
+def _cache_root() -> str:
+    return settings.ARCHIVE_CACHE_PATH
+
+
+def _block_path(uri: str, block: int) -> str:
+    digest = hashlib.sha1(uri.encode()).hexdigest()
+    return os.path.join(_cache_root(), digest[:2], f"{digest}_{block}")
+
+
+def _load_cache_state():
+    """Reconstrói o estado do LRU a partir do diretório (uma vez por processo)."""
+    global _cache_loaded, _cache_bytes
+    if _cache_loaded:
+        return
+    entries = []
+    for dirpath, _, filenames in os.walk(_cache_root()):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_atime, path, st.st_size))
+    for _, path, size in sorted(entries):
+        _cache_blocks[path] = size
+        _cache_bytes += size
+    _cache_loaded = True
+
+
+def _register_block(path: str, size: int):
+    global _cache_bytes
+    limit = settings.ARCHIVE_CACHE_MAX_GB * 1024 ** 3
+    with _cache_lock:
+        _load_cache_state()
+        if path not in _cache_blocks:
+            _cache_bytes += size
+        _cache_blocks[path] = size
+        _cache_blocks.move_to_end(path)
+        while _cache_bytes > limit and len(_cache_blocks) > 1:
+            evicted, evicted_size = _cache_blocks.popitem(last=False)
+            _cache_bytes -= evicted_size
+            try:
+                os.remove(evicted)
+            except OSError:
+                pass
+
+
+def _purge_cached(uri: str):
+    global _cache_bytes
+    digest = hashlib.sha1(uri.encode()).hexdigest()
+    directory = os.path.join(_cache_root(), digest[:2])
+    with _cache_lock:
+        _object_sizes.pop(uri, None)
+        if not os.path.isdir(directory):
+            return
+        for name in os.listdir(directory):
+            if name.startswith(digest + "_"):
+                path = os.path.join(directory, name)
+                _cache_bytes -= _cache_blocks.pop(path, 0)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def object_size(uri: str) -> int:
+    with _cache_lock:
+        size = _object_sizes.get(uri)
+        if size is not None:
+            return size
+    bucket, key = _split_uri(uri)
+    size = get_client().head_object(Bucket=bucket, Key=key)["ContentLength"]
+    with _cache_lock:
+        _object_sizes[uri] = size
+        while len(_object_sizes) > OBJECT_SIZE_CACHE_MAX:
+            _object_sizes.popitem(last=False)
+    return size
+
+
+def _read_block(uri: str, block: int, total: int) -> bytes:
+    path = _block_path(uri, block)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        with _cache_lock:
+            if path in _cache_blocks:
+                _cache_blocks.move_to_end(path)
+        return data
+    except FileNotFoundError:
+        pass
+
+    start = block * CACHE_BLOCK_SIZE
+    end = min(start + CACHE_BLOCK_SIZE, total) - 1
+    bucket, key = _split_uri(uri)
+    response = get_client().get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
+    data = response["Body"].read()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        _register_block(path, len(data))
+    except OSError as e:
+        logger.warning(f"Erro ao gravar bloco em cache {path}: {e}")
+    return data
+
+
+def iter_range(uri: str, start: int, end: int) -> Iterator[bytes]:
+    """Bytes [start, end] (inclusive) do objeto, bloco a bloco via cache local."""
+    total = object_size(uri)
+    end = min(end, total - 1)
+    position = start
+    while position <= end:
+        block = position // CACHE_BLOCK_SIZE
+        data = _read_block(uri, block, total)
+        offset = position - block * CACHE_BLOCK_SIZE
+        chunk = data[offset:offset + (end - position + 1)]
+        if not chunk:
+            break
+        yield chunk
+        position += len(chunk)
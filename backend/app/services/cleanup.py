@@ -3,93 +3,135 @@ Serviço de limpeza automática de gravações antigas.
 
 Remove arquivos de vídeo e registros do banco de dados
 que excedem o tempo de retenção configurado (padrão: 30 dias).
+
+A retenção é por dia: as gravações ficam em /recordings/{camera_id}/YYYY-MM-DD/,
+então os diretórios de dias expirados são removidos inteiros e as linhas são
+apagadas por intervalo (`data_inicio < corte`) em um único DELETE. Com as
+tabelas particionadas por mês, meses expirados saem com DROP PARTITION.
+O custo depende do número de dias, não do número de arquivos.
 """
 
 import os
+import shutil
 import logging
 from datetime import datetime, timedelta
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import delete
 
 from app.config import settings
-from app.models import Gravacao
+from app.models import Gravacao, Reconhecimento
+from app.services import archive, fragment_index, partitions, rollups, thumbnails, volumes
 
 logger = logging.getLogger("cleanup")
 
-# Sync engine para uso no scheduler
-_sync_db_url = settings.DATABASE_URL.replace("+asyncpg", "").replace(
-    "postgresql://", "postgresql+psycopg2://"
-)
-if "asyncpg" in _sync_db_url:
-    _sync_db_url = _sync_db_url.replace("asyncpg", "psycopg2")
-
-sync_engine = create_engine(_sync_db_url, pool_size=2)
-SyncSession = sessionmaker(bind=sync_engine)
-
 
 def cleanup_old_recordings():
-    """Remove gravações mais antigas que RETENTION_DAYS."""
-    cutoff_date = datetime.utcnow() - timedelta(days=settings.RETENTION_DAYS)
+    """Remove os dias de gravação anteriores a RETENTION_DAYS."""
+    from app.services.recorder import SyncSession
+
+    cutoff_day = (datetime.now() - timedelta(days=settings.RETENTION_DAYS)).date()
+    cutoff = datetime.combine(cutoff_day, datetime.min.time())
     logger.info(
-        f"Iniciando limpeza de gravações anteriores a "
-        f"{cutoff_date.strftime('%Y-%m-%d %H:%M:%S')} "
+        f"Iniciando limpeza de gravações anteriores a {cutoff_day.isoformat()} "
         f"({settings.RETENTION_DAYS} dias de retenção)"
     )
 
     session = SyncSession()
     try:
-        gravacoes = (
-            session.query(Gravacao)
-            .filter(Gravacao.data_fim < cutoff_date)
-            .all()
-        )
-
-        deleted_files = 0
-        deleted_bytes = 0
-        errors = 0
-
-        for grav in gravacoes:
-            if os.path.exists(grav.caminho_arquivo):
-                try:
-                    file_size = os.path.getsize(grav.caminho_arquivo)
-                    os.remove(grav.caminho_arquivo)
-                    deleted_files += 1
-                    deleted_bytes += file_size
-                except OSError as e:
-                    logger.error(f"Erro ao remover {grav.caminho_arquivo}: {e}")
-                    errors += 1
-
-            session.delete(grav)
-
+        dropped = partitions.drop_expired_partitions(session, cutoff)
+        partitions.ensure_partitions(session)
+
+        deleted = session.execute(
+            delete(Gravacao)
+            .where(Gravacao.data_inicio < cutoff, Gravacao.in_progress.is_not(True))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        # Sem FK para gravacoes (tabela particionada), o CASCADE não se aplica
+        if partitions.is_partitioned(session, "reconhecimentos"):
+            session.execute(
+                delete(Reconhecimento)
+                .where(Reconhecimento.dt_registro < cutoff)
+                .execution_options(synchronize_session=False)
+            )
         session.commit()
-
-        _cleanup_empty_dirs(settings.RECORDINGS_PATH)
-
-        logger.info(
-            f"Limpeza concluída: {deleted_files} arquivos removidos "
-            f"({deleted_bytes / 1024 / 1024 / 1024:.2f} GB liberados), "
-            f"{errors} erros"
-        )
-
+        rollups.prune(session)
     except Exception as e:
-        logger.error(f"Erro durante a limpeza: {e}")
         session.rollback()
+        logger.error(f"Erro na limpeza do banco: {e}")
+        return
     finally:
         session.close()
 
+    free_before = volumes.distinct_usage()[2]
+    days_removed = sum(_drop_expired_day_dirs(root, cutoff_day) for root in volumes.roots())
+    freed = volumes.distinct_usage()[2] - free_before
+
+    if settings.ARCHIVE_ENABLED:
+        try:
+            archived_removed = archive.drop_expired_days(cutoff_day)
+            logger.info(f"Arquivo: {archived_removed} objetos expirados removidos do bucket")
+        except Exception as e:
+            logger.error(f"Erro ao limpar o bucket de arquivamento: {e}")
+
+    logger.info(
+        f"Limpeza concluída: {len(dropped)} partições, {deleted} gravações e "
+        f"{days_removed} diretórios de dia removidos "
+        f"({max(freed, 0) / 1024 / 1024 / 1024:.2f} GB liberados)"
+    )
 
-def _cleanup_empty_dirs(root_path: str):
-    """Remove diretórios vazios recursivamente."""
+
+def _drop_expired_day_dirs(root_path: str, cutoff_day) -> int:
+    """
+    Remove os diretórios /{camera_id}/YYYY-MM-DD anteriores a `cutoff_day`.
+    Só entra nos diretórios de câmera (numéricos): faces/ não é visitado.
+    """
     if not os.path.exists(root_path):
-        return
+        return 0
 
-    for dirpath, dirnames, filenames in os.walk(root_path, topdown=False):
-        if dirpath == root_path:
+    removed = 0
+    for camera_dir in os.scandir(root_path):
+        if not camera_dir.is_dir() or not camera_dir.name.isdigit():
             continue
+        for day_dir in os.scandir(camera_dir.path):
+            try:
+                day = datetime.strptime(day_dir.name, "%Y-%m-%d").date()
+            except ValueError:
+                continue
+            if day >= cutoff_day or not day_dir.is_dir():
+                continue
+            shutil.rmtree(
+                day_dir.path,
+                onerror=lambda func, path, exc: logger.error(f"Erro ao remover {path}: {exc[1]}"),
+            )
+            removed += 1
+            logger.debug(f"Diretório expirado removido: {day_dir.path}")
+    return removed
+
+
+def _sidecar_paths(path: str) -> list:
+    """Arquivos auxiliares gerados junto de uma gravação."""
+    return [
+        fragment_index.index_path(path),
+        thumbnails.sprite_path(path),
+        thumbnails.vtt_path(path),
+    ]
+
+
+def remove_recording_files(path: str):
+    """
+    Remove o arquivo de vídeo (local ou arquivado) e seus sidecars locais.
+    Erros ao remover o vídeo são propagados.
+    """
+    if archive.is_archived(path):
+        archive.delete_object(path)
+    else:
+        os.remove(path)
+    fragment_index.invalidate(path)
+
+    for sidecar in _sidecar_paths(archive.local_path(path)):
         try:
-            if not os.listdir(dirpath):
-                os.rmdir(dirpath)
-                logger.debug(f"Diretório vazio removido: {dirpath}")
-        except OSError:
+            os.remove(sidecar)
+        except FileNotFoundError:
             pass
+        except OSError as e:
+            logger.warning(f"Erro ao remover {sidecar}: {e}")
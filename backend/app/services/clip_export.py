@@ -0,0 +1,256 @@
+"""
+Exportação de trechos de gravação (clipes) por intervalo de tempo.
+
+Dado "câmera X, de T1 a T2", o serviço:
+1. Recebe os segmentos (gravacoes) que cobrem o intervalo
+2. Monta uma lista do concat demuxer do FFmpeg com inpoint/outpoint por arquivo
+   (inpoint alinhado ao keyframe anterior via índice de fragmentos)
+3. Executa FFmpeg com `-c copy` (sem re-encoding), lendo a lista pelo stdin
+   e escrevendo MP4 fragmentado no stdout
+4. Repassa os bytes ao cliente à medida que são produzidos (sem arquivos temporários)
+
+Exportações de várias câmeras são entregues como um ZIP também em streaming.
+O número de exportações simultâneas é limitado e os clipes recentes ficam em
+um pequeno cache LRU em memória.
+"""
+
+import asyncio
+import logging
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from app.services import archive, fragment_index
+
+logger = logging.getLogger("clip_export")
+
+# ---- Limites ----
+EXPORT_MAX_CONCURRENT = 2              # FFmpegs de exportação simultâneos
+EXPORT_MAX_SECONDS = 4 * 3600          # Maior intervalo aceito por exportação
+EXPORT_CHUNK_SIZE = 256 * 1024         # Bytes lidos do FFmpeg por vez
+
+# ---- Cache LRU de clipes recentes ----
+EXPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+EXPORT_CACHE_MAX_CLIP_BYTES = 64 * 1024 * 1024
+
+_slots_lock = threading.Lock()
+_active_exports = 0
+_cache_lock = threading.Lock()
+_clip_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_clip_cache_bytes = 0
+
+
+class ExportSlot:
+    """Vaga de exportação reservada pela requisição; `release` pode ser chamado mais de uma vez."""
+
+    def __init__(self):
+        self._released = False
+
+    def release(self):
+        global _active_exports
+        with _slots_lock:
+            if self._released:
+                return
+            self._released = True
+            _active_exports -= 1
+
+
+def try_acquire_slot() -> Optional[ExportSlot]:
+    """Reserva uma vaga sem esperar; None se todas estão ocupadas."""
+    global _active_exports
+    with _slots_lock:
+        if _active_exports >= EXPORT_MAX_CONCURRENT:
+            return None
+        _active_exports += 1
+    return ExportSlot()
+
+
+def cache_key(camera_id: int, inicio: datetime, fim: datetime, gravacoes) -> tuple:
+    """Chave do cache: intervalo + identidade/tamanho dos segmentos usados."""
+    return (
+        camera_id,
+        inicio.isoformat(),
+        fim.isoformat(),
+        tuple((g.id, g.tamanho_bytes) for g in gravacoes),
+    )
+
+
+def get_cached(key: tuple) -> Optional[bytes]:
+    with _cache_lock:
+        data = _clip_cache.get(key)
+        if data is not None:
+            _clip_cache.move_to_end(key)
+        return data
+
+
+def _put_cached(key: tuple, data: bytes):
+    global _clip_cache_bytes
+    if len(data) > EXPORT_CACHE_MAX_CLIP_BYTES:
+        return
+    with _cache_lock:
+        if key in _clip_cache:
+            return
+        _clip_cache[key] = data
+        _clip_cache_bytes += len(data)
+        while _clip_cache_bytes > EXPORT_CACHE_MAX_BYTES and _clip_cache:
+            _, evicted = _clip_cache.popitem(last=False)
+            _clip_cache_bytes -= len(evicted)
+
+
+def build_concat_list(gravacoes, inicio: datetime, fim: datetime) -> str:
+    """
+    Monta a lista ffconcat para os segmentos (ordenados por data_inicio),
+    recortando o primeiro e o último no intervalo pedido.
+    """
+    lines = ["ffconcat version 1.0"]
+    for g in gravacoes:
+        duracao = (g.data_fim - g.data_inicio).total_seconds()
+        inpoint = max(0.0, (inicio - g.data_inicio).total_seconds())
+        outpoint = min(duracao, (fim - g.data_inicio).total_seconds())
+        if outpoint <= inpoint:
+            continue
+
+        # Alinha o início ao keyframe anterior: stream copy sempre começa num GOP completo
+        if inpoint > 0:
+            seek = fragment_index.seek_offset(g.caminho_arquivo, inpoint)
+            if seek is not None:
+                inpoint = seek[1]
+
+        # Arquivadas: o FFmpeg lê direto do object store via URL pré-assinada
+        source = g.caminho_arquivo
+        if archive.is_archived(source):
+            source = archive.presigned_url(source)
+        path = source.replace("'", "'\\''")
+        lines.append(f"file '{path}'")
+        if inpoint > 0:
+            lines.append(f"inpoint {inpoint:.3f}")
+        if outpoint < duracao:
+            lines.append(f"outpoint {outpoint:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+async def _run_ffmpeg(concat_list: str) -> AsyncIterator[bytes]:
+    """Executa o FFmpeg de exportação e entrega a saída em chunks."""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "concat", "-safe", "0",
+        "-protocol_whitelist", "file,pipe,http,https,tcp,tls,crypto",
+        "-i", "pipe:0",
+        "-map", "0", "-c", "copy",
+        "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+        "-f", "mp4", "pipe:1",
+    ]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        proc.stdin.write(concat_list.encode())
+        await proc.stdin.drain()
+        proc.stdin.close()
+
+        while True:
+            chunk = await proc.stdout.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+        returncode = await proc.wait()
+        if returncode != 0:
+            raise RuntimeError(f"FFmpeg de exportação retornou código {returncode}")
+    finally:
+        # Cliente desconectou ou erro: não deixa FFmpeg órfão
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+
+
+async def _clip_chunks(gravacoes, inicio: datetime, fim: datetime, key: tuple) -> AsyncIterator[bytes]:
+    """Chunks de um clipe, servindo do cache ou gerando (e guardando) via FFmpeg."""
+    cached = get_cached(key)
+    if cached is not None:
+        for pos in range(0, len(cached), EXPORT_CHUNK_SIZE):
+            yield cached[pos:pos + EXPORT_CHUNK_SIZE]
+        return
+
+    # Lê índices de fragmentos (e pode gravar o .idx): fora do event loop
+    concat_list = await asyncio.to_thread(build_concat_list, gravacoes, inicio, fim)
+    buffer = bytearray()
+    cacheable = True
+    async for chunk in _run_ffmpeg(concat_list):
+        if cacheable:
+            buffer.extend(chunk)
+            if len(buffer) > EXPORT_CACHE_MAX_CLIP_BYTES:
+                cacheable = False
+                buffer = bytearray()
+        yield chunk
+
+    if cacheable and buffer:
+        _put_cached(key, bytes(buffer))
+
+
+async def stream_clip(camera_id: int, gravacoes, inicio: datetime, fim: datetime,
+                      slot: ExportSlot) -> AsyncIterator[bytes]:
+    """Stream MP4 de um clipe de uma câmera; libera `slot` ao terminar."""
+    key = cache_key(camera_id, inicio, fim, gravacoes)
+    try:
+        logger.info(
+            f"[Cam {camera_id}] Exportando {inicio:%Y-%m-%d %H:%M:%S} → {fim:%H:%M:%S} "
+            f"({len(gravacoes)} segmento(s))"
+        )
+        async for chunk in _clip_chunks(gravacoes, inicio, fim, key):
+            yield chunk
+    finally:
+        slot.release()
+
+
+class _ZipSink:
+    """Destino não-seekable para o zipfile: acumula bytes até serem drenados."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        self.buffer.extend(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+async def stream_zip(clips, inicio: datetime, fim: datetime, slot: ExportSlot) -> AsyncIterator[bytes]:
+    """
+    Stream ZIP (sem compressão) com um MP4 por câmera.
+    `clips` é uma lista de (camera_id, gravacoes). As câmeras são exportadas
+    em sequência, ocupando a única vaga `slot` (liberada ao terminar).
+    """
+    sink = _ZipSink()
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+            for camera_id, gravacoes in clips:
+                name = clip_filename(camera_id, inicio, fim)
+                key = cache_key(camera_id, inicio, fim, gravacoes)
+                with zf.open(name, "w", force_zip64=True) as entry:
+                    async for chunk in _clip_chunks(gravacoes, inicio, fim, key):
+                        entry.write(chunk)
+                        yield sink.drain()
+                yield sink.drain()
+        yield sink.drain()
+    finally:
+        slot.release()
+
+
+def clip_filename(camera_id: int, inicio: datetime, fim: datetime) -> str:
+    return f"cam{camera_id}_{inicio:%Y%m%d_%H%M%S}-{fim:%H%M%S}.mp4"
@@ -0,0 +1,209 @@
+"""
+Exclusão em massa de gravações.
+
+Em vez de carregar cada `Gravacao` como objeto ORM e apagar linha a linha,
+as linhas são removidas em lotes com
+`DELETE ... WHERE id IN (SELECT id ... LIMIT n) RETURNING caminho_arquivo, tamanho_bytes`
+(um commit por lote), e os arquivos são apagados por um pool limitado de
+threads em background. Os bytes liberados vêm de `tamanho_bytes`, sem `stat`.
+
+Exclusões pedidas pela API rodam como jobs com id consultável
+(progresso em `/api/gravacoes/jobs/{job_id}`); a retenção contínua usa os
+mesmos lotes de forma síncrona.
+"""
+
+import os
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+from app.models import Gravacao
+from app.services import archive, volumes
+
+logger = logging.getLogger("deletion")
+
+DELETE_CHUNK_SIZE = 1000        # Linhas removidas por DELETE/commit
+UNLINK_WORKERS = 4              # Threads apagando arquivos
+UNLINK_MAX_PENDING = 4096       # Arquivos aguardando no pool (limita memória)
+JOBS_MAX = 100                  # Jobs mantidos para consulta
+
+_unlink_pool = ThreadPoolExecutor(max_workers=UNLINK_WORKERS, thread_name_prefix="unlink")
+_unlink_slots = threading.BoundedSemaphore(UNLINK_MAX_PENDING)
+
+_jobs_lock = threading.Lock()
+_jobs: "OrderedDict[str, DeletionJob]" = OrderedDict()
+
+
+class DeletionJob:
+    """Progresso de uma exclusão em massa."""
+
+    def __init__(self, descricao: str = ""):
+        self.id = uuid.uuid4().hex
+        self.descricao = descricao
+        self.status = "executando"
+        self.deletadas = 0
+        self.arquivos_removidos = 0
+        self.bytes_liberados = 0
+        self.erros = 0
+        self.pastas_removidas = 0
+        self.iniciado_em = datetime.now()
+        self.concluido_em = None
+        self._lock = threading.Lock()
+        self._dirs = set()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "descricao": self.descricao,
+            "status": self.status,
+            "deletadas": self.deletadas,
+            "arquivos_removidos": self.arquivos_removidos,
+            "bytes_liberados": self.bytes_liberados,
+            "erros": self.erros,
+            "pastas_removidas": self.pastas_removidas,
+            "iniciado_em": self.iniciado_em,
+            "concluido_em": self.concluido_em,
+        }
+
+
+def _unlink(job: DeletionJob, path: str, size: int):
+    """Apaga o arquivo e seus sidecars (executa no pool)."""
+    from app.services.cleanup import remove_recording_files
+
+    try:
+        remove_recording_files(path)
+        with job._lock:
+            job.arquivos_removidos += 1
+            job.bytes_liberados += size or 0
+            job._dirs.add(os.path.dirname(archive.local_path(path)))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Erro ao remover {path}: {e}")
+        with job._lock:
+            job.erros += 1
+    finally:
+        _unlink_slots.release()
+
+
+def delete_chunk(session, conditions, job: DeletionJob, order_by=None,
+                 limit: int = DELETE_CHUNK_SIZE) -> tuple:
+    """
+    Remove um lote de até `limit` gravações (na ordem `order_by`) e enfileira
+    a remoção dos arquivos no pool. Segmentos ainda em gravação nunca são
+    removidos. Retorna (linhas, futures).
+    """
+    ids = (
+        select(Gravacao.id)
+        .where(*conditions, Gravacao.in_progress.is_not(True))
+        .order_by(order_by if order_by is not None else Gravacao.id)
+        .limit(limit)
+        .scalar_subquery()
+    )
+    rows = session.execute(
+        delete(Gravacao)
+        .where(Gravacao.id.in_(ids))
+        .returning(Gravacao.id, Gravacao.caminho_arquivo, Gravacao.tamanho_bytes)
+        .execution_options(synchronize_session=False)
+    ).all()
+    session.commit()
+
+    futures = []
+    job.deletadas += len(rows)
+    for _, path, size in rows:
+        if not path:
+            continue
+        _unlink_slots.acquire()
+        futures.append(_unlink_pool.submit(_unlink, job, path, size))
+    return rows, futures
+
+
+def delete_rows_chunked(session, conditions, job: DeletionJob):
+    """
+    Remove todas as gravações que atendem `conditions` em lotes, enfileirando
+    a remoção dos arquivos no pool. Retorna a lista de futures de unlink.
+    """
+    futures = []
+    while True:
+        rows, chunk_futures = delete_chunk(session, conditions, job)
+        futures.extend(chunk_futures)
+        if len(rows) < DELETE_CHUNK_SIZE:
+            break
+    return futures
+
+
+def remove_empty_dirs(dirs: set) -> int:
+    """Remove diretórios vazios subindo até a raiz do volume de gravação."""
+    removed = 0
+
+    sorted_dirs = sorted(dirs, key=lambda d: d.count(os.sep), reverse=True)
+
+    for d in sorted_dirs:
+        volume = volumes.volume_for(d)
+        if volume is None:
+            continue
+        current = os.path.abspath(d)
+        while current and current != volume.path and current.startswith(volume.path):
+            try:
+                if os.path.isdir(current) and not os.listdir(current):
+                    os.rmdir(current)
+                    removed += 1
+                    current = os.path.dirname(current)
+                else:
+                    break
+            except OSError:
+                break
+
+    return removed
+
+
+def run_deletion(conditions, job: DeletionJob):
+    """Executa a exclusão completa (linhas + arquivos + pastas vazias)."""
+    from app.services.recorder import SyncSession
+
+    session = SyncSession()
+    try:
+        futures = delete_rows_chunked(session, conditions, job)
+        for future in futures:
+            future.result()
+        job.pastas_removidas = remove_empty_dirs(job._dirs)
+        job.status = "concluido"
+        logger.info(
+            f"Exclusão {job.id[:8]} concluída: {job.deletadas} gravações, "
+            f"{job.bytes_liberados / 1024 / 1024:.1f} MB liberados, {job.erros} erros"
+        )
+    except Exception as e:
+        session.rollback()
+        job.status = "erro"
+        logger.error(f"Erro na exclusão {job.id[:8]}: {e}")
+    finally:
+        job.concluido_em = datetime.now()
+        session.close()
+    return job
+
+
+def start_deletion_job(conditions, descricao: str = "") -> DeletionJob:
+    """Inicia a exclusão em background e retorna o job para acompanhamento."""
+    job = DeletionJob(descricao)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        while len(_jobs) > JOBS_MAX:
+            _jobs.popitem(last=False)
+
+    threading.Thread(
+        target=run_deletion,
+        args=(conditions, job),
+        daemon=True,
+        name=f"delete_job_{job.id[:8]}",
+    ).start()
+    return job
+
+
+def get_job(job_id: str):
+    with _jobs_lock:
+        return _jobs.get(job_id)
@@ -42,6 +42,7 @@ FACES_DIR = os.path.join(settings.RECORDINGS_PATH, "faces")
 _encodings_cache = {}
 _encodings_cache_time = 0
 CACHE_TTL = 60  # Recarrega encodings a cada 60 segundos
+_file_encodings = {}  # caminho → (mtime, encoding ou None): só fotos novas/alteradas são recalculadas
 
 # Parâmetros de qualidade para auto-registro de visitantes
 MIN_FACE_WIDTH = 20
@@ -109,13 +110,14 @@ def _load_known_encodings():
     Carrega os encodings faciais de todas as pessoas cadastradas.
     Retorna: dict {id_pessoa: [list of face encodings]}
     """
-    global _encodings_cache, _encodings_cache_time
+    global _encodings_cache, _encodings_cache_time, _file_encodings
 
     now = time.time()
     if _encodings_cache and (now - _encodings_cache_time) < CACHE_TTL:
         return _encodings_cache
 
     encodings = {}
+    file_encodings = {}
 
     if not os.path.exists(FACES_DIR):
         logger.info(f"Diretório de faces não existe: {FACES_DIR}")
@@ -138,10 +140,15 @@ def _load_known_encodings():
 
             img_path = os.path.join(pessoa_dir, img_file)
             try:
-                image = face_recognition.load_image_file(img_path)
-                face_encs = face_recognition.face_encodings(image)
-                if face_encs:
-                    pessoa_encodings.append(face_encs[0])
+                mtime = os.path.getmtime(img_path)
+                cached = _file_encodings.get(img_path)
+                if cached is None or cached[0] != mtime:
+                    image = face_recognition.load_image_file(img_path)
+                    face_encs = face_recognition.face_encodings(image)
+                    cached = (mtime, face_encs[0] if face_encs else None)
+                file_encodings[img_path] = cached
+                if cached[1] is not None:
+                    pessoa_encodings.append(cached[1])
             except Exception as e:
                 logger.warning(f"Erro ao processar face {img_path}: {e}")
                 continue
@@ -150,6 +157,7 @@ def _load_known_encodings():
             encodings[pessoa_id] = pessoa_encodings
             logger.debug(f"Pessoa {pessoa_id}: {len(pessoa_encodings)} encoding(s) carregados")
 
+    _file_encodings = file_encodings
     _encodings_cache = encodings
     _encodings_cache_time = now
     logger.info(f"Encodings faciais carregados: {len(encodings)} pessoas")
@@ -314,6 +322,11 @@ def _get_next_visitor_number():
         session.close()
 
 
+def encoding_bytes(face_encoding) -> bytes:
+    """Encoding (128 floats) no formato da coluna `reconhecimentos.encoding` (float32)."""
+    return np.asarray(face_encoding, dtype=np.float32).tobytes()
+
+
 def _create_visitor(face_encoding, face_image_bgr, camera_id, gravacao_id=None):
     """Cria um novo registro de visitante no banco e salva a imagem do rosto."""
     from app.services.recorder import SyncSession
@@ -340,13 +353,15 @@ def _create_visitor(face_encoding, face_image_bgr, camera_id, gravacao_id=None):
         filename = f"face_{timestamp}.jpg"
         filepath = os.path.join(face_dir, filename)
 
-        cv2.imwrite(filepath, face_image_bgr, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if cv2.imwrite(filepath, face_image_bgr, [cv2.IMWRITE_JPEG_QUALITY, 90]):
+            nova_pessoa.total_fotos = 1
 
         rec = Reconhecimento(
             id_pessoa=pessoa_id,
             id_camera=camera_id,
             id_gravacao=gravacao_id,
             dt_registro=datetime.now(),
+            encoding=encoding_bytes(face_encoding),
         )
         session.add(rec)
         session.commit()
@@ -381,12 +396,26 @@ def _save_additional_face(pessoa_id, face_image_bgr):
     filename = f"face_{timestamp}.jpg"
     filepath = os.path.join(face_dir, filename)
 
-    cv2.imwrite(filepath, face_image_bgr, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    if not cv2.imwrite(filepath, face_image_bgr, [cv2.IMWRITE_JPEG_QUALITY, 90]):
+        return
     logger.debug(f"Face adicional salva para pessoa {pessoa_id}: {filename}")
 
+    from app.services.recorder import SyncSession
+    from app.services.faces import store_face_count
+
+    session = SyncSession()
+    try:
+        store_face_count(session, pessoa_id)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erro ao atualizar contagem de fotos da pessoa {pessoa_id}: {e}")
+    finally:
+        session.close()
+
 
-def _save_recognition(pessoa_id: int, camera_id: int, gravacao_id: int = None):
-    """Salva um reconhecimento facial no banco de dados."""
+def _save_recognition(pessoa_id: int, camera_id: int, gravacao_id: int = None, encoding=None):
+    """Salva um reconhecimento facial no banco de dados (com o encoding do rosto detectado)."""
     from app.services.recorder import SyncSession
     from app.models import Reconhecimento
 
@@ -397,6 +426,7 @@ def _save_recognition(pessoa_id: int, camera_id: int, gravacao_id: int = None):
             id_camera=camera_id,
             id_gravacao=gravacao_id,
             dt_registro=datetime.now(),
+            encoding=encoding_bytes(encoding) if encoding is not None else None,
         )
         session.add(rec)
         session.commit()
@@ -556,7 +586,7 @@ def _process_video_internal(video_path: str, camera_id: int, gravacao_id: int =
                                 f"[Cam {camera_id}] MATCH: Pessoa {pessoa_id} "
                                 f"(distância: {face_distances[best_match_idx]:.3f})"
                             )
-                            _save_recognition(pessoa_id, camera_id, gravacao_id=gravacao_id)
+                            _save_recognition(pessoa_id, camera_id, gravacao_id=gravacao_id, encoding=face_enc)
                             break
 
                 if matched_known:
@@ -580,7 +610,7 @@ def _process_video_internal(video_path: str, camera_id: int, gravacao_id: int =
 
                 if already_seen_id is not None:
                     logger.info(f"[Cam {camera_id}] Mesmo desconhecido já visto (pessoa {already_seen_id})")
-                    _save_recognition(already_seen_id, camera_id, gravacao_id=gravacao_id)
+                    _save_recognition(already_seen_id, camera_id, gravacao_id=gravacao_id, encoding=face_enc)
                     face_img = _extract_face_image(frame_original, face_loc)
                     if face_img is not None:
                         _save_additional_face(already_seen_id, face_img)
@@ -0,0 +1,302 @@
+"""
+Busca por foto: "essa pessoa já passou por aqui? onde e quando?"
+
+O encoding da foto enviada é calculado uma única vez e comparado, em memória,
+com duas matrizes numpy (float32, normas pré-calculadas):
+
+- galeria: as fotos de face cadastradas (o mesmo cache de encodings usado no
+  processamento dos vídeos), agrupadas por pessoa para obter a menor distância
+  de cada uma com `np.minimum.reduceat`;
+- histórico: os rostos detectados nas gravações (`reconhecimentos.encoding`),
+  carregados de forma incremental por id a cada busca e recarregados por
+  completo pelo scheduler (remove as linhas apagadas pela retenção).
+
+As k menores distâncias saem de `np.argpartition`, sem ordenar tudo; o banco
+só é consultado para os nomes e as gravações dos resultados. Para dezenas de
+milhares de encodings a comparação leva poucos milissegundos — o custo da
+busca é dominado pela detecção do rosto na foto.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+logger = logging.getLogger("face_search")
+
+ENCODING_SIZE = 128
+ENCODING_BYTES = ENCODING_SIZE * 4      # float32
+DEFAULT_TOLERANCE = 0.6                 # Mesma tolerância do reconhecimento nos vídeos
+QUERY_MAX_SIDE = 1024                   # Fotos maiores são reduzidas antes da detecção
+HISTORY_REBUILD_MINUTES = 30            # Recarga completa do histórico (scheduler)
+_NO_RECORDING = 0                       # id_gravacao ausente na matriz de metadados
+
+
+def _top_k(distances: np.ndarray, k: int) -> np.ndarray:
+    """Índices das k menores distâncias, em ordem crescente."""
+    if len(distances) > k:
+        idx = np.argpartition(distances, k)[:k]
+    else:
+        idx = np.arange(len(distances))
+    return idx[np.argsort(distances[idx], kind="stable")]
+
+
+class _Matrix:
+    """Encodings empilhados com as normas ao quadrado pré-calculadas."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        self.sq_norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def distances(self, query: np.ndarray) -> np.ndarray:
+        """Distância euclidiana de `query` a cada linha (|a|² - 2a·b + |b|²)."""
+        squared = self.sq_norms - 2 * (self.vectors @ query) + float(query @ query)
+        return np.sqrt(np.maximum(squared, 0, out=squared), out=squared)
+
+    def append(self, vectors: np.ndarray) -> "_Matrix":
+        return _Matrix(np.concatenate([self.vectors, vectors.reshape(-1, ENCODING_SIZE)]))
+
+
+def _empty_history() -> tuple:
+    """(matriz, metadados [id, id_pessoa, id_camera, id_gravacao], datas)."""
+    return (
+        _Matrix(np.empty((0, ENCODING_SIZE), dtype=np.float32)),
+        np.empty((0, 4), dtype=np.int64),
+        np.empty(0, dtype="datetime64[us]"),
+    )
+
+
+def encode_photo(image_bytes: bytes) -> tuple:
+    """(encoding float32, rostos encontrados) do maior rosto da foto."""
+    import cv2
+    from app.services import face_recognition_service as frs
+
+    if not frs.FACE_RECOGNITION_AVAILABLE:
+        raise RuntimeError("Biblioteca face_recognition não disponível")
+
+    frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Imagem inválida")
+    scale = QUERY_MAX_SIDE / max(frame.shape[:2])
+    if scale < 1:
+        frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    locations = frs.face_recognition.face_locations(rgb, model=frs._get_detection_model())
+    if not locations:
+        raise ValueError("Nenhum rosto encontrado na imagem")
+    largest = max(locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]))
+    encoding = frs.face_recognition.face_encodings(rgb, [largest])[0]
+    return np.asarray(encoding, dtype=np.float32), len(locations)
+
+
+class FaceIndex:
+    """Matrizes de encodings da galeria e do histórico, compartilhadas entre as buscas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gallery_source = None
+        self._gallery = (_Matrix(np.empty((0, ENCODING_SIZE))), np.empty(0, np.intp), np.empty(0, np.int64))
+        self._history = _empty_history()
+        self._last_id = 0
+
+    # ---- Carga ----
+
+    def _refresh_gallery(self):
+        """Refaz a matriz da galeria quando o cache de encodings é recarregado."""
+        from app.services.face_recognition_service import _load_known_encodings
+
+        encodings = _load_known_encodings()
+        if encodings is self._gallery_source:
+            return
+        vectors, starts, people = [], [], []
+        for id_pessoa, person_encodings in encodings.items():
+            if not person_encodings:
+                continue
+            starts.append(len(vectors))
+            people.append(id_pessoa)
+            vectors.extend(person_encodings)
+        gallery = (
+            _Matrix(np.asarray(vectors, dtype=np.float32)),
+            np.asarray(starts, dtype=np.intp),
+            np.asarray(people, dtype=np.int64),
+        )
+        with self._lock:
+            self._gallery, self._gallery_source = gallery, encodings
+
+    @staticmethod
+    def _fetch_history(session, since_id: int) -> tuple:
+        rows = session.execute(
+            text(
+                "SELECT id, id_pessoa, id_camera, id_gravacao, dt_registro, encoding FROM reconhecimentos "
+                "WHERE id > :since AND encoding IS NOT NULL ORDER BY id"
+            ),
+            {"since": since_id},
+        ).all()
+        rows = [row for row in rows if len(row.encoding) == ENCODING_BYTES]
+        vectors = np.frombuffer(b"".join(bytes(row.encoding) for row in rows), dtype=np.float32)
+        meta = np.array(
+            [(row.id, row.id_pessoa, row.id_camera, row.id_gravacao or _NO_RECORDING) for row in rows],
+            dtype=np.int64,
+        ).reshape(-1, 4)
+        dates = np.array([row.dt_registro for row in rows], dtype="datetime64[us]")
+        return vectors, meta, dates
+
+    def refresh_history(self, session):
+        """Acrescenta os reconhecimentos com encoding salvos desde a última carga."""
+        vectors, meta, dates = self._fetch_history(session, self._last_id)
+        if not len(meta):
+            return
+        with self._lock:
+            matrix, old_meta, old_dates = self._history
+            if len(old_meta) and meta[0, 0] <= old_meta[-1, 0]:
+                return   # Outra busca já carregou estas linhas
+            self._history = (
+                matrix.append(vectors),
+                np.concatenate([old_meta, meta]),
+                np.concatenate([old_dates, dates]),
+            )
+            self._last_id = int(meta[-1, 0])
+
+    def rebuild(self):
+        """Recarga completa do histórico e da galeria (job do scheduler)."""
+        from app.services.face_recognition_service import FACE_RECOGNITION_AVAILABLE
+        from app.services.recorder import SyncSession
+
+        if not FACE_RECOGNITION_AVAILABLE:
+            return
+        self._refresh_gallery()
+
+        session = SyncSession()
+        try:
+            t0 = time.perf_counter()
+            vectors, meta, dates = self._fetch_history(session, 0)
+        except Exception as e:
+            logger.warning(f"Erro ao recarregar encodings do histórico: {e}")
+            return
+        finally:
+            session.close()
+        with self._lock:
+            self._history = (_Matrix(vectors), meta, dates)
+            self._last_id = int(meta[-1, 0]) if len(meta) else 0
+        logger.info(f"Índice de busca por foto: {len(meta)} rostos do histórico em {time.perf_counter() - t0:.2f}s")
+
+    # ---- Busca ----
+
+    def search(self, image_bytes: bytes, k: int = 10, tolerancia: float = DEFAULT_TOLERANCE,
+               limite_ocorrencias: int = 50) -> dict:
+        """
+        Pessoas candidatas (menor distância na galeria ou no histórico) e as
+        ocorrências do histórico dentro da tolerância, com as gravações.
+        """
+        from app.services.recorder import SyncSession
+
+        t0 = time.perf_counter()
+        query, faces = encode_photo(image_bytes)
+        t_encode = time.perf_counter()
+
+        self._refresh_gallery()
+        session = SyncSession()
+        try:
+            self.refresh_history(session)
+            with self._lock:
+                gallery, starts, people = self._gallery
+                history, meta, dates = self._history
+
+            best = {}   # id_pessoa → (distância, origem)
+            if len(gallery):
+                per_person = np.minimum.reduceat(gallery.distances(query), starts)
+                for i in _top_k(per_person, k):
+                    if per_person[i] <= tolerancia:
+                        best[int(people[i])] = (float(per_person[i]), "galeria")
+
+            ocorrencias = []
+            if len(history):
+                distances = history.distances(query)
+                for i in _top_k(distances, limite_ocorrencias):
+                    distance = float(distances[i])
+                    if distance > tolerancia:
+                        break
+                    id_rec, id_pessoa, id_camera, id_gravacao = (int(v) for v in meta[i])
+                    ocorrencias.append({
+                        "id_reconhecimento": id_rec,
+                        "id_pessoa": id_pessoa,
+                        "id_camera": id_camera,
+                        "id_gravacao": id_gravacao or None,
+                        "dt_registro": dates[i].astype(object),
+                        "distancia": round(distance, 4),
+                    })
+                    if distance < best.get(id_pessoa, (float("inf"),))[0]:
+                        best[id_pessoa] = (distance, "historico")
+            t_search = time.perf_counter()
+
+            pessoas, cameras, gravacoes = self._details(session, best, ocorrencias)
+        finally:
+            session.close()
+
+        candidatos = [
+            {**pessoas[id_pessoa], "distancia": round(distance, 4), "origem": origem}
+            for id_pessoa, (distance, origem) in sorted(best.items(), key=lambda item: item[1][0])
+            if id_pessoa in pessoas
+        ][:k]
+
+        resultado_ocorrencias = []
+        for ocorrencia in ocorrencias:
+            if ocorrencia["id_pessoa"] not in pessoas:
+                continue   # Pessoa removida desde a última carga
+            gravacao = gravacoes.get(ocorrencia["id_gravacao"])
+            resultado_ocorrencias.append({
+                **ocorrencia,
+                "no_pessoa": pessoas[ocorrencia["id_pessoa"]]["no_pessoa"],
+                "camera_nome": cameras.get(ocorrencia["id_camera"]),
+                "gravacao": gravacao,
+            })
+
+        return {
+            "rostos_na_foto": faces,
+            "candidatos": candidatos,
+            "ocorrencias": resultado_ocorrencias,
+            "comparados": {"galeria": len(gallery), "historico": len(history)},
+            "tempo_ms": {
+                "encoding": round((t_encode - t0) * 1000, 1),
+                "busca": round((t_search - t_encode) * 1000, 1),
+                "total": round((time.perf_counter() - t0) * 1000, 1),
+            },
+        }
+
+    @staticmethod
+    def _details(session, best: dict, ocorrencias: list) -> tuple:
+        """Nomes das pessoas/câmeras e intervalos das gravações dos resultados."""
+        pessoas, cameras, gravacoes = {}, {}, {}
+        if best:
+            for id_pessoa, nome, tipo, fotos in session.execute(
+                text("SELECT id_pessoa, no_pessoa, ao_tipo, total_fotos FROM pessoas WHERE id_pessoa = ANY(:ids)"),
+                {"ids": list(best)},
+            ):
+                pessoas[id_pessoa] = {"id_pessoa": id_pessoa, "no_pessoa": nome, "ao_tipo": tipo, "total_fotos": fotos}
+        if ocorrencias:
+            cameras = dict(session.execute(
+                text("SELECT id, nome FROM cameras WHERE id = ANY(:ids)"),
+                {"ids": list({o["id_camera"] for o in ocorrencias})},
+            ).all())
+            ids = list({o["id_gravacao"] for o in ocorrencias if o["id_gravacao"]})
+            if ids:
+                for gravacao_id, inicio, fim in session.execute(
+                    text("SELECT id, data_inicio, data_fim FROM gravacoes WHERE id = ANY(:ids)"),
+                    {"ids": ids},
+                ):
+                    gravacoes[gravacao_id] = {
+                        "id": gravacao_id,
+                        "data_inicio": inicio,
+                        "data_fim": fim,
+                        "url": f"/api/gravacoes/{gravacao_id}/stream",
+                    }
+        return pessoas, cameras, gravacoes
+
+
+face_index = FaceIndex()
@@ -0,0 +1,67 @@
+"""
+Fotos de face das pessoas (/recordings/faces/{id_pessoa}/) e o contador
+`pessoas.total_fotos`.
+
+A listagem de pessoas lê só a coluna; o diretório é contado apenas quando
+uma foto é adicionada/removida (e uma vez no startup, para corrigir contagens
+de fotos copiadas ou apagadas direto no disco).
+"""
+
+import logging
+import os
+
+from sqlalchemy import text
+
+from app.config import settings
+
+logger = logging.getLogger("faces")
+
+FACES_DIR = os.path.join(settings.RECORDINGS_PATH, "faces")
+FACE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def face_files(id_pessoa: int) -> list:
+    """Nomes das fotos de face de uma pessoa, em ordem."""
+    dir_path = os.path.join(FACES_DIR, str(id_pessoa))
+    try:
+        return sorted(f for f in os.listdir(dir_path) if f.endswith(FACE_EXTENSIONS))
+    except FileNotFoundError:
+        return []
+
+
+def count_faces(id_pessoa: int) -> int:
+    """Conta quantas fotos de face uma pessoa tem no disco."""
+    return len(face_files(id_pessoa))
+
+
+def store_face_count(session, id_pessoa: int) -> int:
+    """Recontagem do diretório gravada em `pessoas.total_fotos` (sem commit)."""
+    total = count_faces(id_pessoa)
+    session.execute(
+        text("UPDATE pessoas SET total_fotos = :total WHERE id_pessoa = :id AND total_fotos <> :total"),
+        {"total": total, "id": id_pessoa},
+    )
+    return total
+
+
+def sync_face_counts(session) -> int:
+    """Acerta `total_fotos` de todas as pessoas pelo disco; retorna quantas mudaram."""
+    counts = {}
+    if os.path.isdir(FACES_DIR):
+        for entry in os.scandir(FACES_DIR):
+            if entry.is_dir() and entry.name.isdigit():
+                counts[int(entry.name)] = count_faces(int(entry.name))
+
+    stored = dict(session.execute(text("SELECT id_pessoa, total_fotos FROM pessoas")).all())
+    changed = [
+        {"id": id_pessoa, "total": counts.get(id_pessoa, 0)}
+        for id_pessoa, total in stored.items()
+        if counts.get(id_pessoa, 0) != total
+    ]
+    if changed:
+        session.execute(
+            text("UPDATE pessoas SET total_fotos = :total WHERE id_pessoa = :id"),
+            changed,
+        )
+    session.commit()
+    return len(changed)
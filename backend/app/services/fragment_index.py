@@ -0,0 +1,425 @@
+"""
+Índice de fragmentos de gravações MP4 fragmentado (fMP4).
+
+O recorder grava com `-movflags frag_keyframe+empty_moov+default_base_moof`,
+então cada arquivo é:
+
+    ftyp + moov (init segment)  |  moof + mdat  |  moof + mdat  | ...
+
+e cada fragmento começa em um keyframe. Este módulo percorre apenas os
+cabeçalhos das caixas (o payload das `mdat` é pulado com seek) e monta uma
+lista de fragmentos com PTS, offset e tamanho em bytes da trilha de vídeo.
+
+O índice é calculado uma vez por arquivo: o recorder grava um sidecar
+binário compacto (`<arquivo>.idx`) na finalização do segmento, e leituras
+posteriores usam o sidecar ou o cache em memória (chave: caminho + mtime +
+tamanho). Buscas tempo→offset são O(log n) sobre o índice. Gravações
+arquivadas no object store mantêm o sidecar no caminho local original.
+
+Formato do sidecar (big-endian):
+    cabeçalho: magic "FIDX", versão (u8), timescale (u32), init_size (u32), n (u32)
+    n entradas: pts (u64), offset (u64), size (u32), duration (u32), keyframe (u8)
+"""
+
+import os
+import bisect
+import struct
+import logging
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from app.services import archive
+
+logger = logging.getLogger("fragment_index")
+
+# Máximo de índices mantidos em memória
+INDEX_CACHE_MAX = 512
+
+# Bit "sample_is_non_sync_sample" das sample flags (ISO/IEC 14496-12)
+_NON_SYNC_SAMPLE = 0x00010000
+
+# Caixas-contêiner que precisam ser percorridas
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"mvex", b"moof", b"traf"}
+
+# Sidecar em disco
+INDEX_SUFFIX = ".idx"
+_SIDECAR_MAGIC = b"FIDX"
+_SIDECAR_VERSION = 1
+_SIDECAR_HEADER = struct.Struct(">4sBIII")
+_SIDECAR_ENTRY = struct.Struct(">QQIIB")
+
+
+class Fragment(NamedTuple):
+    pts: int          # baseMediaDecodeTime do vídeo (em timescale)
+    offset: int       # Offset do início da moof no arquivo
+    size: int         # Bytes de moof + mdat
+    duration: int     # Duração do fragmento (em timescale)
+    keyframe: bool    # Primeira amostra é sync sample
+
+
+class FragmentIndex(NamedTuple):
+    timescale: int
+    init_size: int            # Bytes do init segment (ftyp + moov)
+    fragments: list           # Lista de Fragment, em ordem de arquivo
+
+    @property
+    def duration_seconds(self) -> float:
+        if not self.fragments or not self.timescale:
+            return 0.0
+        first = self.fragments[0]
+        last = self.fragments[-1]
+        return (last.pts + last.duration - first.pts) / self.timescale
+
+
+# ---- Cache em memória ----
+_cache_lock = threading.Lock()
+_index_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def _iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None):
+    """Itera (tipo, offset_payload, fim) das caixas contidas em `data`."""
+    pos = start
+    end = len(data) if end is None else end
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _parse_moov(data: bytes) -> dict:
+    """
+    Extrai, da moov, informações das trilhas:
+    {track_id: {"timescale", "handler", "default_duration", "default_flags"}}
+    """
+    tracks = {}
+    trex = {}
+
+    def walk(start, end, current):
+        for box_type, payload, box_end in _iter_boxes(data, start, end):
+            if box_type == b"trak":
+                track = {}
+                walk(payload, box_end, track)
+                if "track_id" in track:
+                    tracks[track["track_id"]] = track
+            elif box_type in _CONTAINERS:
+                walk(payload, box_end, current)
+            elif box_type == b"tkhd":
+                version = data[payload]
+                off = payload + (20 if version == 1 else 12)
+                current["track_id"] = struct.unpack_from(">I", data, off)[0]
+            elif box_type == b"mdhd":
+                version = data[payload]
+                off = payload + (20 if version == 1 else 12)
+                current["timescale"] = struct.unpack_from(">I", data, off)[0]
+            elif box_type == b"hdlr":
+                current["handler"] = data[payload + 8:payload + 12]
+            elif box_type == b"trex":
+                track_id, _, duration, _, flags = struct.unpack_from(">IIIII", data, payload + 4)
+                trex[track_id] = (duration, flags)
+
+    walk(0, len(data), {})
+
+    for track_id, (duration, flags) in trex.items():
+        if track_id in tracks:
+            tracks[track_id]["default_duration"] = duration
+            tracks[track_id]["default_flags"] = flags
+    return tracks
+
+
+def _parse_traf(data: bytes, start: int, end: int, tracks: dict):
+    """Retorna (track_id, base_decode_time, duração, keyframe) de uma traf."""
+    track_id = None
+    default_duration = 0
+    default_flags = 0
+    base_time = 0
+    duration = 0
+    keyframe = True
+    first_trun = True
+
+    for box_type, payload, _ in _iter_boxes(data, start, end):
+        if box_type == b"tfhd":
+            flags = struct.unpack_from(">I", data, payload)[0] & 0xFFFFFF
+            track_id = struct.unpack_from(">I", data, payload + 4)[0]
+            track = tracks.get(track_id, {})
+            default_duration = track.get("default_duration", 0)
+            default_flags = track.get("default_flags", 0)
+            off = payload + 8
+            if flags & 0x01:
+                off += 8
+            if flags & 0x02:
+                off += 4
+            if flags & 0x08:
+                default_duration = struct.unpack_from(">I", data, off)[0]
+                off += 4
+            if flags & 0x10:
+                off += 4
+            if flags & 0x20:
+                default_flags = struct.unpack_from(">I", data, off)[0]
+        elif box_type == b"tfdt":
+            version = data[payload]
+            if version == 1:
+                base_time = struct.unpack_from(">Q", data, payload + 4)[0]
+            else:
+                base_time = struct.unpack_from(">I", data, payload + 4)[0]
+        elif box_type == b"trun":
+            flags = struct.unpack_from(">I", data, payload)[0] & 0xFFFFFF
+            sample_count = struct.unpack_from(">I", data, payload + 4)[0]
+            off = payload + 8
+            if flags & 0x01:
+                off += 4
+            first_flags = None
+            if flags & 0x04:
+                first_flags = struct.unpack_from(">I", data, off)[0]
+                off += 4
+
+            per_sample = [
+                bit for bit in (0x100, 0x200, 0x400, 0x800) if flags & bit
+            ]
+            check_keyframe = first_trun
+            first_trun = False
+            if 0x100 not in per_sample:
+                duration += default_duration * sample_count
+                if 0x400 not in per_sample:
+                    if check_keyframe:
+                        sample_flags = first_flags if first_flags is not None else default_flags
+                        keyframe = not (sample_flags & _NON_SYNC_SAMPLE)
+                    continue
+
+            for i in range(sample_count):
+                sample_flags = default_flags
+                for bit in per_sample:
+                    value = struct.unpack_from(">I", data, off)[0]
+                    off += 4
+                    if bit == 0x100:
+                        duration += value
+                    elif bit == 0x400:
+                        sample_flags = value
+                if i == 0 and check_keyframe:
+                    if first_flags is not None:
+                        sample_flags = first_flags
+                    keyframe = not (sample_flags & _NON_SYNC_SAMPLE)
+
+    return track_id, base_time, duration, keyframe
+
+
+def build_index(path: str) -> Optional[FragmentIndex]:
+    """
+    Lê os cabeçalhos das caixas de um fMP4 e monta o índice de fragmentos.
+
+    Lê integralmente apenas moov/moof (alguns KB); o conteúdo das mdat é
+    pulado. Fragmentos incompletos no final (arquivo ainda crescendo) são
+    ignorados. Retorna None se o arquivo não for um fMP4 válido.
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            tracks = None
+            video_track = None
+            timescale = 0
+            init_size = 0
+            fragments = []
+            pending = None  # (offset, moof_size, pts, duration, keyframe)
+            pos = 0
+
+            while pos + 8 <= file_size:
+                f.seek(pos)
+                header = f.read(16)
+                if len(header) < 8:
+                    break
+                size, box_type = struct.unpack_from(">I4s", header, 0)
+                header_size = 8
+                if size == 1:
+                    if len(header) < 16:
+                        break
+                    size = struct.unpack_from(">Q", header, 8)[0]
+                    header_size = 16
+                elif size == 0:
+                    size = file_size - pos
+                if size < header_size or pos + size > file_size:
+                    break
+
+                if box_type == b"moov":
+                    f.seek(pos)
+                    tracks = _parse_moov(f.read(size))
+                    for track_id, track in tracks.items():
+                        if track.get("handler") == b"vide":
+                            video_track = track_id
+                            timescale = track.get("timescale", 0)
+                            break
+                    init_size = pos + size
+
+                elif box_type == b"moof" and tracks is not None:
+                    f.seek(pos)
+                    moof = f.read(size)
+                    pending = None
+                    for child, payload, child_end in _iter_boxes(moof, header_size):
+                        if child != b"traf":
+                            continue
+                        track_id, pts, duration, keyframe = _parse_traf(
+                            moof, payload, child_end, tracks
+                        )
+                        if track_id == video_track:
+                            pending = (pos, size, pts, duration, keyframe)
+                            break
+
+                elif box_type == b"mdat" and pending is not None:
+                    offset, moof_size, pts, duration, keyframe = pending
+                    fragments.append(Fragment(
+                        pts=pts,
+                        offset=offset,
+                        size=moof_size + size,
+                        duration=duration,
+                        keyframe=keyframe,
+                    ))
+                    pending = None
+
+                pos += size
+
+        if not timescale or not init_size:
+            return None
+        return FragmentIndex(timescale=timescale, init_size=init_size, fragments=fragments)
+
+    except (OSError, struct.error, IndexError) as e:
+        logger.warning(f"Erro ao indexar {path}: {e}")
+        return None
+
+
+def index_path(path: str) -> str:
+    """Caminho do sidecar de índice de uma gravação."""
+    return path + INDEX_SUFFIX
+
+
+def write_sidecar(path: str, index: Optional[FragmentIndex] = None) -> Optional[FragmentIndex]:
+    """
+    Grava o sidecar de índice da gravação (escrita atômica via arquivo temporário).
+    Se `index` não for informado, ele é montado a partir dos cabeçalhos do arquivo.
+    """
+    if index is None:
+        index = build_index(path)
+        if index is None:
+            return None
+
+    target = index_path(path)
+    tmp = target + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_SIDECAR_HEADER.pack(
+                _SIDECAR_MAGIC, _SIDECAR_VERSION,
+                index.timescale, index.init_size, len(index.fragments),
+            ))
+            for frag in index.fragments:
+                f.write(_SIDECAR_ENTRY.pack(
+                    frag.pts, frag.offset, frag.size, frag.duration, int(frag.keyframe)
+                ))
+        os.replace(tmp, target)
+    except OSError as e:
+        logger.warning(f"Erro ao gravar índice {target}: {e}")
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+    return index
+
+
+def load_sidecar(path: str, check_mtime: bool = True) -> Optional[FragmentIndex]:
+    """Lê o sidecar de índice da gravação; None se ausente, inválido ou desatualizado."""
+    target = index_path(path)
+    try:
+        if check_mtime and os.path.getmtime(target) < os.path.getmtime(path):
+            return None
+        with open(target, "rb") as f:
+            data = f.read()
+        magic, version, timescale, init_size, count = _SIDECAR_HEADER.unpack_from(data, 0)
+        if magic != _SIDECAR_MAGIC or version != _SIDECAR_VERSION:
+            return None
+        if len(data) != _SIDECAR_HEADER.size + count * _SIDECAR_ENTRY.size:
+            return None
+        fragments = [
+            Fragment(pts, offset, size, duration, bool(keyframe))
+            for pts, offset, size, duration, keyframe
+            in _SIDECAR_ENTRY.iter_unpack(data[_SIDECAR_HEADER.size:])
+        ]
+        return FragmentIndex(timescale=timescale, init_size=init_size, fragments=fragments)
+    except (OSError, struct.error):
+        return None
+
+
+def get_index(path: str) -> Optional[FragmentIndex]:
+    """
+    Retorna o índice de fragmentos do arquivo.
+    Ordem: cache em memória → sidecar em disco → leitura dos cabeçalhos do MP4.
+    Para gravações arquivadas (`s3://...`) apenas o sidecar local é usado.
+    """
+    archived = archive.is_archived(path)
+    local = archive.local_path(path)
+    try:
+        st = os.stat(index_path(local) if archived else path)
+    except OSError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+
+    with _cache_lock:
+        cached = _index_cache.get(path)
+        if cached and cached[0] == key:
+            _index_cache.move_to_end(path)
+            return cached[1]
+
+    index = load_sidecar(local, check_mtime=not archived)
+    if index is None and archived:
+        return None
+    if index is None:
+        # Gravações antigas (sem sidecar): indexa e persiste uma única vez
+        index = write_sidecar(path)
+        if index is None:
+            return None
+
+    with _cache_lock:
+        _index_cache[path] = (key, index)
+        _index_cache.move_to_end(path)
+        while len(_index_cache) > INDEX_CACHE_MAX:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def lookup(index: FragmentIndex, seconds: float) -> Optional[Fragment]:
+    """
+    Retorna o fragmento (iniciado por keyframe) que contém o instante `seconds`,
+    relativo ao início da gravação. Busca binária sobre os PTS.
+    """
+    if not index.fragments:
+        return None
+    base = index.fragments[0].pts
+    target = base + int(max(seconds, 0) * index.timescale)
+    pos = bisect.bisect_right(index.fragments, target, key=lambda frag: frag.pts)
+    return index.fragments[max(pos - 1, 0)]
+
+
+def seek_offset(path: str, seconds: float) -> Optional[tuple]:
+    """
+    Offset em bytes e instante (s) do keyframe mais próximo antes de `seconds`.
+    Retorna None se o arquivo não puder ser indexado.
+    """
+    index = get_index(path)
+    if index is None:
+        return None
+    frag = lookup(index, seconds)
+    if frag is None:
+        return None
+    return frag.offset, (frag.pts - index.fragments[0].pts) / index.timescale
+
+
+def invalidate(path: str):
+    """Remove o índice de um arquivo do cache (arquivo apagado/substituído)."""
+    with _cache_lock:
+        _index_cache.pop(path, None)
@@ -0,0 +1,209 @@
+"""
+Telemetria do recorder no formato de exposição do Prometheus (`GET /metrics`).
+
+O loop de cada câmera só incrementa contadores e buckets de histograma em um
+CameraTelemetry (atributos simples, sem locks nem alocação por frame). Todo o
+resto — FPS, razão de movimento, CPU/RSS dos FFmpeg filhos lidos de /proc — é
+calculado na hora do scrape.
+
+Métricas por câmera (label `camera`):
+- recorder_frames_analyzed_total / recorder_motion_frames_total
+- recorder_analysis_fps, recorder_motion_ratio
+- recorder_decision_latency_seconds (histograma: leitura → decisão)
+- recorder_consecutive_failures, recorder_motion_restarts_total
+- recorder_stream_stalls_total (label `process`: pipe/gravação sem dados no prazo)
+- recorder_segments_total, recorder_segments_discarded_total
+- recorder_segment_bytes, recorder_segment_finalize_seconds (histogramas)
+- recorder_ffmpeg_cpu_seconds_total, recorder_ffmpeg_rss_bytes (label `process`)
+- recorder_running, recorder_recording
+"""
+
+import os
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+SEGMENT_BYTES_BUCKETS = tuple(mb * 1024 * 1024 for mb in (1, 5, 10, 25, 50, 100, 250, 500))
+FINALIZE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FPS_EWMA_ALPHA = 0.1            # Suavização do intervalo entre frames
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class Histogram:
+    """Histograma de buckets fixos (limites superiores, semântica `le`)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class CameraTelemetry:
+    """Contadores de uma câmera, atualizados pelo loop do recorder."""
+
+    def __init__(self):
+        self.frames = 0
+        self.motion_frames = 0
+        self.frame_interval = None   # EWMA do intervalo entre amostras (s)
+        self.consecutive_failures = 0
+        self.motion_restarts = 0
+        self.motion_stalls = 0
+        self.recording_stalls = 0
+        self.segments = 0
+        self.segments_discarded = 0
+        self.decision_latency = Histogram(LATENCY_BUCKETS)
+        self.segment_bytes = Histogram(SEGMENT_BYTES_BUCKETS)
+        self.finalize_seconds = Histogram(FINALIZE_BUCKETS)
+        self._last_frame_at = None
+
+    def frame(self, read_at: float, has_motion: bool):
+        """Amostra analisada: `read_at` é o perf_counter logo após a leitura."""
+        now = time.perf_counter()
+        self.frames += 1
+        if has_motion:
+            self.motion_frames += 1
+        self.decision_latency.observe(now - read_at)
+        if self._last_frame_at is not None:
+            interval = read_at - self._last_frame_at
+            if self.frame_interval is None:
+                self.frame_interval = interval
+            else:
+                self.frame_interval += FPS_EWMA_ALPHA * (interval - self.frame_interval)
+        self._last_frame_at = read_at
+
+    def stream_restarted(self):
+        self.motion_restarts += 1
+        self._last_frame_at = None
+
+    def segment(self, size: int, finalize_seconds: float):
+        self.segments += 1
+        self.segment_bytes.observe(size)
+        self.finalize_seconds.observe(finalize_seconds)
+
+    @property
+    def fps(self) -> float:
+        return 1 / self.frame_interval if self.frame_interval else 0.0
+
+
+def process_usage(pid) -> tuple:
+    """(segundos de CPU, RSS em bytes) de um processo via /proc (None se indisponível)."""
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            # Campos após o nome do comando (que pode conter espaços/parênteses)
+            fields = f.read().rsplit(b")", 1)[1].split()
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            resident = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    cpu = (int(fields[11]) + int(fields[12])) / _CLK_TCK   # utime + stime
+    return cpu, resident * _PAGE_SIZE
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in labels.items()
+    )
+    return "{" + body + "}"
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class Exposition:
+    """Monta o texto de exposição, agrupando amostras por família."""
+
+    def __init__(self):
+        self._families = {}
+
+    def add(self, name: str, kind: str, help_text: str, labels: dict, value):
+        family = self._families.setdefault(name, (kind, help_text, []))
+        family[2].append((labels, value))
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text, samples) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind == "histogram":
+                    lines.extend(self._histogram_lines(name, labels, value))
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram_lines(name: str, labels: dict, histogram: Histogram) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': _format(float(bound))})} {cumulative}")
+        cumulative += histogram.counts[-1]
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {_format(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return lines
+
+
+def render_recorders(recorders: dict) -> str:
+    """Texto de exposição para as câmeras em `recorders` (camera_id → CameraRecorder)."""
+    out = Exposition()
+    for camera_id, rec in list(recorders.items()):
+        t = rec.telemetry
+        cam = {"camera": camera_id}
+
+        out.add("recorder_running", "gauge", "Thread de gravação da câmera ativa", cam, int(rec.is_alive()))
+        out.add("recorder_recording", "gauge", "Câmera gravando no momento", cam, int(rec.is_recording))
+        out.add("recorder_frames_analyzed_total", "counter", "Amostras analisadas pela detecção", cam, t.frames)
+        out.add("recorder_motion_frames_total", "counter", "Amostras com movimento", cam, t.motion_frames)
+        out.add("recorder_analysis_fps", "gauge", "Amostras analisadas por segundo (média móvel)", cam,
+                round(t.fps, 3))
+        out.add("recorder_motion_ratio", "gauge", "Fração das amostras com movimento", cam,
+                round(t.motion_frames / t.frames, 4) if t.frames else 0.0)
+        out.add("recorder_decision_latency_seconds", "histogram",
+                "Tempo entre a leitura da amostra e a decisão de movimento", cam, t.decision_latency)
+        out.add("recorder_consecutive_failures", "gauge", "Falhas de leitura consecutivas da detecção", cam,
+                t.consecutive_failures)
+        out.add("recorder_motion_restarts_total", "counter", "Reinícios da fonte de detecção", cam,
+                t.motion_restarts)
+        for process_name, stalls in (("motion", t.motion_stalls), ("recording", t.recording_stalls)):
+            out.add("recorder_stream_stalls_total", "counter", "FFmpeg encerrado por falta de dados/progresso",
+                    {**cam, "process": process_name}, stalls)
+        out.add("recorder_segments_total", "counter", "Segmentos finalizados", cam, t.segments)
+        out.add("recorder_segments_discarded_total", "counter", "Segmentos descartados (arquivo inválido)", cam,
+                t.segments_discarded)
+        out.add("recorder_segment_bytes", "histogram", "Tamanho dos segmentos finalizados", cam, t.segment_bytes)
+        out.add("recorder_segment_finalize_seconds", "histogram",
+                "Tempo de finalização do segmento (índice + banco)", cam, t.finalize_seconds)
+
+        for process_name, process in (("motion", rec.motion_process), ("recording", rec.recording_process)):
+            if process is None or getattr(process, "pid", None) is None or process.poll() is not None:
+                continue
+            usage = process_usage(process.pid)
+            if usage is None:
+                continue
+            labels = {**cam, "process": process_name}
+            out.add("recorder_ffmpeg_cpu_seconds_total", "counter", "CPU (user+sys) do FFmpeg filho", labels,
+                    round(usage[0], 2))
+            out.add("recorder_ffmpeg_rss_bytes", "gauge", "Memória residente do FFmpeg filho", labels, usage[1])
+    return out.render()
@@ -0,0 +1,346 @@
+"""
+Detectores de movimento plugáveis.
+
+Cada detector define a saída do FFmpeg de detecção (ffmpeg_output), como ler
+uma amostra dela (read_sample) e como medi-la (process):
+
+- "diferenca": diferença entre frames consecutivos com thresholds fixos
+  (MOTION_PIXEL_THRESHOLD / MOTION_THRESHOLD_PCT), o comportamento original.
+- "fundo": modelo de fundo por média móvel com variância por pixel (gaussiana
+  única por pixel, no espírito do MOG). Um pixel é primeiro plano quando se
+  afasta do fundo mais que BG_K_SIGMA desvios; o fundo se adapta rápido onde
+  não há movimento e devagar onde há. Pega objetos lentos (que quase não
+  mudam entre dois frames) e absorve ruído de câmeras noturnas/IR, cuja
+  variância alta passa a fazer parte do próprio modelo.
+- "cena": a detecção roda dentro do FFmpeg (filtro select/scene) e só o
+  score de mudança de cada frame chega ao Python, pelo log; sem transferir
+  frames pelo pipe nem processar com NumPy. Não usa zonas de movimento nem
+  gera mapa de calor (só a série de atividade).
+- "onvif": sem decodificação nenhuma; o estado de movimento vem dos eventos
+  da própria câmera (PullPoint, services/onvif.py). Se a assinatura falhar,
+  o recorder usa o detector do servidor (fallback_kind) por um tempo.
+
+"diferenca" e "fundo" recebem frames 160x120 em escala de cinza.
+
+No detector de fundo, o threshold de % de área também é calibrado por câmera:
+enquanto a câmera está ociosa (sem gravar), a % de primeiro plano é
+acumulada como ruído (média/desvio exponenciais), e o threshold passa a ser
+média + CALIBRATION_SIGMAS desvios, limitado a [MIN, MAX].
+
+O detector de cada câmera vem de `cameras.detector_movimento` (ou
+MOTION_DETECTOR global) e pode ser trocado em tempo real (set_kind).
+
+As leituras do FFmpeg têm prazo (MOTION_READ_TIMEOUT, via services/pipes.py):
+uma câmera que para de enviar sem fechar a conexão gera PipeStalled em vez de
+travar a thread do recorder.
+"""
+
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.pipes import PipeReader
+
+DETECTOR_DIFERENCA = "diferenca"
+DETECTOR_FUNDO = "fundo"
+DETECTOR_CENA = "cena"
+DETECTOR_ONVIF = "onvif"
+DETECTOR_KINDS = (DETECTOR_DIFERENCA, DETECTOR_FUNDO, DETECTOR_CENA, DETECTOR_ONVIF)
+
+# ---- Frames de análise ----
+MOTION_FPS = 2                  # FPS para análise de movimento
+MOTION_WIDTH = 160              # Largura do frame para análise
+MOTION_HEIGHT = 120             # Altura do frame para análise
+MOTION_FRAME_SIZE = MOTION_WIDTH * MOTION_HEIGHT  # Bytes por frame (grayscale)
+MOTION_READ_TIMEOUT = 15        # Segundos sem dados do FFmpeg = stream travado
+
+# ---- Diferença entre frames ----
+MOTION_THRESHOLD_PCT = 1.5      # % de pixels que devem mudar para considerar movimento
+MOTION_PIXEL_THRESHOLD = 25     # Diferença mínima de intensidade por pixel (0-255)
+
+# ---- Modelo de fundo ----
+BG_ALPHA = 0.02                 # Taxa de aprendizado do fundo (pixels parados)
+BG_ALPHA_FOREGROUND = 0.002     # Taxa onde há primeiro plano (objeto parado vira fundo devagar)
+BG_VAR_ALPHA = 0.005            # Taxa de aprendizado da variância (mais lenta que a média)
+BG_VAR_CLIP_SIGMA = 2.0         # Desvios acima disso não inflam a variância (objetos lentos)
+BG_K_SIGMA = 3.0                # Desvios do fundo para considerar primeiro plano
+BG_MIN_DIFF = 10                # Diferença mínima de intensidade, mesmo com variância baixa
+BG_INITIAL_STD = 15             # Desvio inicial (antes do modelo aprender)
+BG_MIN_STD = 2
+BG_WARMUP_FRAMES = 20           # Frames para o modelo estabilizar antes de detectar
+
+# ---- Calibração do threshold (detector de fundo) ----
+CALIBRATION_ALPHA = 0.01        # Peso de cada frame ocioso na estatística de ruído
+CALIBRATION_MIN_FRAMES = 120    # Frames ociosos antes de usar o threshold calibrado (~1 min)
+CALIBRATION_SIGMAS = 4.0
+THRESHOLD_MIN_PCT = 0.3
+THRESHOLD_MAX_PCT = 10.0
+
+# ---- Score de cena (FFmpeg) ----
+SCENE_THRESHOLD_PCT = 0.5       # Score de cena (0-1) x 100 acima disso = movimento
+SCENE_SCORE_KEY = b"lavfi.scene_score="
+
+
+class MotionDetector(ABC):
+    """Interface: read_sample() lê do FFmpeg, process() mede, is_motion() decide."""
+
+    kind = None
+    reads_log = False   # True: amostras vêm do log do FFmpeg (stderr) em vez de frames no stdout
+
+    def open(self, camera_id: int, rtsp_url: str):
+        """Inicia a fonte de amostras (por padrão, o FFmpeg de detecção)."""
+        reads_log = self.reads_log
+        process = subprocess.Popen(
+            ["ffmpeg", "-rtsp_transport", "tcp", "-i", rtsp_url, *self.ffmpeg_output()],
+            stdout=subprocess.DEVNULL if reads_log else subprocess.PIPE,
+            stderr=subprocess.PIPE if reads_log else subprocess.DEVNULL,
+            bufsize=0,
+        )
+        process.reader = PipeReader(process.stderr if reads_log else process.stdout)
+        return process
+
+    def ffmpeg_output(self) -> list:
+        """Argumentos de saída do FFmpeg de detecção (após `-i`)."""
+        return [
+            "-f", "rawvideo",
+            "-pix_fmt", "gray",       # Grayscale (1 byte/pixel)
+            "-r", str(MOTION_FPS),    # FPS baixo
+            "-vf", f"scale={MOTION_WIDTH}:{MOTION_HEIGHT}",
+            "-an",                    # Sem áudio
+            "-",                      # Saída para stdout
+        ]
+
+    def read_sample(self, process):
+        """Lê um frame do stdout do FFmpeg (None se o stream acabou)."""
+        raw = process.reader.read_exact(MOTION_FRAME_SIZE, MOTION_READ_TIMEOUT)
+        if raw is None:
+            return None
+        return np.frombuffer(raw, dtype=np.uint8).reshape((MOTION_HEIGHT, MOTION_WIDTH))
+
+    def reset(self):
+        """Descarta o estado dependente do stream (chamado quando o FFmpeg reinicia)."""
+
+    @abstractmethod
+    def process(self, sample, zone=None) -> tuple:
+        """Retorna (% da área ativa em movimento, máscara booleana ou None)."""
+
+    def is_motion(self, pct: float, idle: bool = False) -> bool:
+        return pct > self.threshold_pct
+
+    @property
+    def threshold_pct(self) -> float:
+        return MOTION_THRESHOLD_PCT
+
+    def stats(self) -> dict:
+        return {"detector": self.kind, "threshold_pct": round(float(self.threshold_pct), 2)}
+
+    @staticmethod
+    def _measure(mask, zone) -> tuple:
+        """Aplica a zona de movimento e calcula a % sobre a área ativa."""
+        if zone is not None and zone.shape == mask.shape:
+            mask &= zone
+            total = np.count_nonzero(zone)
+        else:
+            total = mask.size
+        pct = np.count_nonzero(mask) / total * 100 if total else 0.0
+        return pct, mask
+
+
+class FrameDiffDetector(MotionDetector):
+    """Diferença absoluta entre frames consecutivos com thresholds fixos."""
+
+    kind = DETECTOR_DIFERENCA
+
+    def __init__(self):
+        self.prev_frame = None
+
+    def reset(self):
+        self.prev_frame = None
+
+    def process(self, frame, zone=None) -> tuple:
+        if self.prev_frame is None:
+            self.prev_frame = frame
+            return 0.0, None
+
+        delta = np.abs(frame.astype(np.int16) - self.prev_frame.astype(np.int16))
+        self.prev_frame = frame
+        return self._measure(delta > MOTION_PIXEL_THRESHOLD, zone)
+
+
+class BackgroundModelDetector(MotionDetector):
+    """Modelo de fundo adaptativo com threshold calibrado pelo ruído da câmera."""
+
+    kind = DETECTOR_FUNDO
+
+    def __init__(self):
+        self.mean = None
+        self.var = None
+        self.frames = 0
+        self.noise_mean = 0.0
+        self.noise_var = 0.0
+        self.noise_frames = 0
+
+    def reset(self):
+        # Refaz o modelo de fundo; a calibração de ruído da câmera é mantida
+        self.mean = None
+        self.var = None
+        self.frames = 0
+
+    def process(self, frame, zone=None) -> tuple:
+        current = frame.astype(np.float32)
+        if self.mean is None:
+            self.mean = current.copy()
+            self.var = np.full(current.shape, BG_INITIAL_STD ** 2, dtype=np.float32)
+            return 0.0, None
+
+        diff = current - self.mean
+        diff2 = diff * diff
+        foreground = diff2 > np.maximum(self.var * BG_K_SIGMA ** 2, BG_MIN_DIFF ** 2)
+
+        alpha = np.where(foreground, BG_ALPHA_FOREGROUND, BG_ALPHA).astype(np.float32)
+        self.mean += alpha * diff
+        # Variância só com pixels de fundo e desvio limitado: um objeto lento
+        # não "some" por inflar a variância antes de virar primeiro plano
+        clipped = np.minimum(diff2, self.var * BG_VAR_CLIP_SIGMA ** 2)
+        self.var += np.where(foreground, 0, BG_VAR_ALPHA * (clipped - self.var))
+        np.maximum(self.var, BG_MIN_STD ** 2, out=self.var)
+
+        self.frames += 1
+        if self.frames < BG_WARMUP_FRAMES:
+            return 0.0, None
+        return self._measure(foreground, zone)
+
+    def is_motion(self, pct: float, idle: bool = False) -> bool:
+        threshold = self.threshold_pct
+        if idle and pct <= threshold:
+            # Frame ocioso: alimenta a estatística de ruído da câmera
+            delta = pct - self.noise_mean
+            self.noise_mean += CALIBRATION_ALPHA * delta
+            self.noise_var = (1 - CALIBRATION_ALPHA) * (self.noise_var + CALIBRATION_ALPHA * delta * delta)
+            self.noise_frames += 1
+        return pct > threshold
+
+    @property
+    def calibrated(self) -> bool:
+        return self.noise_frames >= CALIBRATION_MIN_FRAMES
+
+    @property
+    def threshold_pct(self) -> float:
+        if not self.calibrated:
+            return MOTION_THRESHOLD_PCT
+        threshold = self.noise_mean + CALIBRATION_SIGMAS * self.noise_var ** 0.5
+        return min(max(threshold, THRESHOLD_MIN_PCT), THRESHOLD_MAX_PCT)
+
+    def stats(self) -> dict:
+        result = super().stats()
+        result.update({
+            "calibrado": self.calibrated,
+            "ruido_pct": round(float(self.noise_mean), 3),
+        })
+        return result
+
+
+class SceneScoreDetector(MotionDetector):
+    """Score de mudança de cena calculado pelo próprio FFmpeg."""
+
+    kind = DETECTOR_CENA
+    reads_log = True
+
+    def ffmpeg_output(self) -> list:
+        return [
+            "-hide_banner", "-nostats", "-loglevel", "info",
+            "-an",
+            "-vf", (
+                f"fps={MOTION_FPS},scale={MOTION_WIDTH}:{MOTION_HEIGHT},"
+                "select='gte(scene,0)',metadata=print:key=lavfi.scene_score"
+            ),
+            "-f", "null", "-",
+        ]
+
+    def read_sample(self, process):
+        """Próximo score de cena impresso pelo filtro metadata (None se o stream acabou)."""
+        while True:
+            line = process.reader.readline(MOTION_READ_TIMEOUT)
+            if not line:
+                return None
+            pos = line.find(SCENE_SCORE_KEY)
+            if pos < 0:
+                continue
+            try:
+                return float(line[pos + len(SCENE_SCORE_KEY):].strip())
+            except ValueError:
+                continue
+
+    def process(self, sample, zone=None) -> tuple:
+        return sample * 100, None
+
+    @property
+    def threshold_pct(self) -> float:
+        return SCENE_THRESHOLD_PCT
+
+
+class OnvifDetector(MotionDetector):
+    """Estado de movimento dos eventos ONVIF da câmera (sem decodificar vídeo)."""
+
+    kind = DETECTOR_ONVIF
+
+    def open(self, camera_id: int, rtsp_url: str):
+        from app.services import onvif
+        return onvif.subscribe(camera_id, rtsp_url)
+
+    def ffmpeg_output(self) -> list:
+        return []
+
+    def read_sample(self, process):
+        state = process.read_state(1 / MOTION_FPS)
+        return None if state is None else float(state)
+
+    def process(self, sample, zone=None) -> tuple:
+        return sample * 100, None
+
+    @property
+    def threshold_pct(self) -> float:
+        return 50.0
+
+
+_DETECTORS = {
+    DETECTOR_DIFERENCA: FrameDiffDetector,
+    DETECTOR_FUNDO: BackgroundModelDetector,
+    DETECTOR_CENA: SceneScoreDetector,
+    DETECTOR_ONVIF: OnvifDetector,
+}
+
+_kinds: dict = {}   # camera_id → tipo configurado na câmera
+_lock = threading.Lock()
+
+
+def default_kind() -> str:
+    kind = settings.MOTION_DETECTOR
+    return kind if kind in DETECTOR_KINDS else DETECTOR_DIFERENCA
+
+
+def fallback_kind() -> str:
+    """Detector do servidor usado quando a fonte ONVIF falha."""
+    kind = default_kind()
+    return kind if kind != DETECTOR_ONVIF else DETECTOR_DIFERENCA
+
+
+def create(kind: str) -> MotionDetector:
+    return _DETECTORS.get(kind, FrameDiffDetector)()
+
+
+def set_kind(camera_id: int, kind: Optional[str]):
+    """Define o detector da câmera (None = padrão global); vale no próximo frame."""
+    with _lock:
+        if kind in DETECTOR_KINDS:
+            _kinds[camera_id] = kind
+        else:
+            _kinds.pop(camera_id, None)
+
+
+def kind_for(camera_id: int) -> str:
+    return _kinds.get(camera_id) or default_kind()
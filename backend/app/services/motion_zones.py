@@ -0,0 +1,124 @@
+"""
+Zonas de movimento por câmera.
+
+`cameras.zonas_movimento` guarda (JSON) uma lista de polígonos:
+
+    [{"tipo": "incluir" | "excluir", "pontos": [[x, y], ...]}, ...]
+
+com coordenadas normalizadas (0-1), independentes da resolução da câmera.
+Sem zonas de inclusão, o frame inteiro é considerado; zonas de exclusão são
+removidas por último (árvores, rua, TV...).
+
+Os polígonos são rasterizados uma única vez para uma máscara booleana na
+resolução da detecção (160x120) e mantidos em cache por câmera. O recorder
+consulta o cache a cada frame, então uma edição (update_zones) vale no
+próximo frame, sem reiniciar a gravação.
+"""
+
+import json
+import logging
+import threading
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger("motion_zones")
+
+MASK_WIDTH = 160
+MASK_HEIGHT = 120
+ZONE_TYPES = ("incluir", "excluir")
+MAX_ZONES = 16
+MAX_POINTS = 64
+
+_masks: dict = {}   # camera_id → máscara (None = frame inteiro)
+_lock = threading.Lock()
+
+
+def validate_zones(zones) -> list:
+    """Normaliza e valida a lista de zonas; levanta ValueError se inválida."""
+    if not zones:
+        return []
+    if len(zones) > MAX_ZONES:
+        raise ValueError(f"Máximo de {MAX_ZONES} zonas por câmera")
+
+    result = []
+    for zone in zones:
+        tipo = zone.get("tipo")
+        pontos = zone.get("pontos") or []
+        if tipo not in ZONE_TYPES:
+            raise ValueError(f"Tipo de zona inválido: {tipo!r} (use 'incluir' ou 'excluir')")
+        if not 3 <= len(pontos) <= MAX_POINTS:
+            raise ValueError(f"Zona deve ter entre 3 e {MAX_POINTS} pontos")
+        points = []
+        for point in pontos:
+            if len(point) != 2 or not all(0 <= float(v) <= 1 for v in point):
+                raise ValueError("Pontos devem ser pares [x, y] normalizados entre 0 e 1")
+            points.append([round(float(point[0]), 4), round(float(point[1]), 4)])
+        result.append({"tipo": tipo, "pontos": points})
+    return result
+
+
+def parse_zones(raw: Optional[str]) -> list:
+    """Zonas armazenadas em `cameras.zonas_movimento` (lista vazia se ausente/inválido)."""
+    if not raw:
+        return []
+    try:
+        return validate_zones(json.loads(raw))
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Zonas de movimento inválidas ignoradas: {e}")
+        return []
+
+
+def _polygon_mask(points, xs, ys) -> np.ndarray:
+    """Pixels (centros) dentro do polígono, regra par-ímpar."""
+    inside = np.zeros(xs.shape, dtype=bool)
+    x_prev, y_prev = points[-1]
+    for x, y in points:
+        crosses = (y > ys) != (y_prev > ys)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = (x_prev - x) * (ys - y) / (y_prev - y) + x
+        inside ^= crosses & (xs < x_cross)
+        x_prev, y_prev = x, y
+    return inside
+
+
+def build_mask(zones: list) -> Optional[np.ndarray]:
+    """Rasteriza as zonas em uma máscara MASK_HEIGHT x MASK_WIDTH (None = frame inteiro)."""
+    if not zones:
+        return None
+
+    ys, xs = np.mgrid[0:MASK_HEIGHT, 0:MASK_WIDTH]
+    xs = (xs + 0.5) / MASK_WIDTH
+    ys = (ys + 0.5) / MASK_HEIGHT
+
+    includes = [z["pontos"] for z in zones if z["tipo"] == "incluir"]
+    excludes = [z["pontos"] for z in zones if z["tipo"] == "excluir"]
+
+    mask = np.zeros((MASK_HEIGHT, MASK_WIDTH), dtype=bool) if includes else \
+        np.ones((MASK_HEIGHT, MASK_WIDTH), dtype=bool)
+    for points in includes:
+        mask |= _polygon_mask(points, xs, ys)
+    for points in excludes:
+        mask &= ~_polygon_mask(points, xs, ys)
+    return mask
+
+
+def update_zones(camera_id: int, raw: Optional[str]):
+    """Recalcula e publica a máscara da câmera (aplicada no próximo frame analisado)."""
+    mask = build_mask(parse_zones(raw))
+    with _lock:
+        _masks[camera_id] = mask
+    if mask is not None:
+        logger.info(
+            f"[Cam {camera_id}] Zonas de movimento aplicadas "
+            f"({mask.mean() * 100:.0f}% do frame ativo)"
+        )
+
+
+def get_mask(camera_id: int) -> Optional[np.ndarray]:
+    return _masks.get(camera_id)
+
+
+def forget(camera_id: int):
+    with _lock:
+        _masks.pop(camera_id, None)
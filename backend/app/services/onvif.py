@@ -0,0 +1,299 @@
+"""
+Eventos de movimento ONVIF (PullPoint) como fonte de movimento.
+
+A maioria das câmeras já faz a análise de movimento embarcada. Com o detector
+"onvif", o recorder não decodifica vídeo: assina os eventos da câmera
+(CreatePullPointSubscription) e uma thread faz long-poll de PullMessages,
+mantendo o estado atual de movimento (tópicos com "Motion", item IsMotion /
+State). A assinatura é renovada antes de expirar.
+
+Endereço: `cameras.onvif_url` (device service) ou, se vazio,
+`http://{host da URL RTSP}/onvif/device_service`. Credenciais vêm da URL RTSP
+e vão no cabeçalho WS-Security (UsernameToken digest), com HTTP Digest como
+alternativa para câmeras que exigem.
+
+Para testes sem câmera: backend/scripts/mock_onvif.py.
+"""
+
+import base64
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+import httpx
+
+logger = logging.getLogger("onvif")
+
+ONVIF_TIMEOUT = 10              # Timeout das requisições SOAP (s)
+PULL_TIMEOUT_SECONDS = 5        # Long-poll do PullMessages
+PULL_MESSAGE_LIMIT = 32
+SUBSCRIPTION_SECONDS = 60       # Duração pedida para a assinatura
+RENEW_MARGIN_SECONDS = 20       # Renova quando faltar menos que isso
+UNSUBSCRIBE_TIMEOUT = 2         # Cancelamento é best-effort: não segura o stop do recorder
+MOTION_ITEM_NAMES = ("IsMotion", "State", "Motion")
+
+NS_SOAP = "http://www.w3.org/2003/05/soap-envelope"
+NS_WSA = "http://www.w3.org/2005/08/addressing"
+NS_WSSE = "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd"
+NS_WSU = "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-utility-1.0.xsd"
+NS_TDS = "http://www.onvif.org/ver10/device/wsdl"
+NS_TEV = "http://www.onvif.org/ver10/events/wsdl"
+NS_WSNT = "http://docs.oasis-open.org/wsn/b-2"
+NS_TT = "http://www.onvif.org/ver10/schema"
+
+ACTION_GET_CAPABILITIES = "http://www.onvif.org/ver10/device/wsdl/GetCapabilities"
+ACTION_CREATE_PULLPOINT = (
+    "http://www.onvif.org/ver10/events/wsdl/EventPortType/CreatePullPointSubscriptionRequest"
+)
+ACTION_PULL_MESSAGES = (
+    "http://www.onvif.org/ver10/events/wsdl/PullPointSubscription/PullMessagesRequest"
+)
+ACTION_RENEW = "http://docs.oasis-open.org/wsn/bw-2/SubscriptionManager/RenewRequest"
+ACTION_UNSUBSCRIBE = "http://docs.oasis-open.org/wsn/bw-2/SubscriptionManager/UnsubscribeRequest"
+
+PASSWORD_DIGEST = (
+    "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-username-token-profile-1.0#PasswordDigest"
+)
+NONCE_ENCODING = (
+    "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-soap-message-security-1.0#Base64Binary"
+)
+
+
+class OnvifError(Exception):
+    """Falha de comunicação ou SOAP Fault da câmera."""
+
+
+def _escape(value: str) -> str:
+    return (value.replace("&", "&amp;").replace("<", "&lt;")
+            .replace(">", "&gt;").replace('"', "&quot;"))
+
+
+def _security_header(username: str, password: str) -> str:
+    """UsernameToken com PasswordDigest = base64(sha1(nonce + created + senha))."""
+    nonce = os.urandom(16)
+    created = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    digest = base64.b64encode(
+        hashlib.sha1(nonce + created.encode() + password.encode()).digest()
+    ).decode()
+    return (
+        f'<wsse:Security xmlns:wsse="{NS_WSSE}" xmlns:wsu="{NS_WSU}" s:mustUnderstand="1">'
+        f"<wsse:UsernameToken>"
+        f"<wsse:Username>{_escape(username)}</wsse:Username>"
+        f'<wsse:Password Type="{PASSWORD_DIGEST}">{digest}</wsse:Password>'
+        f'<wsse:Nonce EncodingType="{NONCE_ENCODING}">{base64.b64encode(nonce).decode()}</wsse:Nonce>'
+        f"<wsu:Created>{created}</wsu:Created>"
+        f"</wsse:UsernameToken></wsse:Security>"
+    )
+
+
+def _envelope(action: str, to: str, body: str, username: str, password: str) -> str:
+    security = _security_header(username, password) if username else ""
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>'
+        f'<s:Envelope xmlns:s="{NS_SOAP}" xmlns:wsa="{NS_WSA}">'
+        f"<s:Header>{security}"
+        f"<wsa:Action>{action}</wsa:Action>"
+        f"<wsa:MessageID>urn:uuid:{uuid.uuid4()}</wsa:MessageID>"
+        f"<wsa:To>{_escape(to)}</wsa:To>"
+        f"</s:Header><s:Body>{body}</s:Body></s:Envelope>"
+    )
+
+
+def device_url_from_rtsp(rtsp_url: str, onvif_url: Optional[str] = None) -> tuple:
+    """(URL do device service, usuário, senha) a partir da URL RTSP da câmera."""
+    parsed = urlparse(rtsp_url)
+    username = unquote(parsed.username or "")
+    password = unquote(parsed.password or "")
+    if onvif_url:
+        return onvif_url, username, password
+    return f"http://{parsed.hostname}/onvif/device_service", username, password
+
+
+def parse_motion(root) -> Optional[bool]:
+    """Último estado de movimento nas NotificationMessages (None se não houver evento de movimento)."""
+    state = None
+    for message in root.iter(f"{{{NS_WSNT}}}NotificationMessage"):
+        topic = message.find(f"{{{NS_WSNT}}}Topic")
+        if topic is None or "motion" not in (topic.text or "").lower():
+            continue
+        for item in message.iter(f"{{{NS_TT}}}SimpleItem"):
+            if item.get("Name") in MOTION_ITEM_NAMES and item.get("Value") is not None:
+                # Itens de Source (tokens) não têm esses nomes; o de Data define o estado
+                state = item.get("Value").strip().lower() in ("true", "1")
+    return state
+
+
+class PullPointSubscription:
+    """
+    Assinatura PullPoint com thread de long-poll.
+
+    Expõe poll()/terminate()/kill() como o Popen do FFmpeg de detecção, para
+    que o recorder trate as duas fontes da mesma forma.
+    """
+
+    def __init__(self, camera_id: int, device_url: str, username: str, password: str):
+        self.camera_id = camera_id
+        self.device_url = device_url
+        self.username = username
+        self.password = password
+        self.address = None
+        self.motion = False
+        self._expires_at = 0.0
+        self._running = False
+        self._thread = None
+        self._client = httpx.Client(
+            timeout=ONVIF_TIMEOUT + PULL_TIMEOUT_SECONDS,
+            auth=httpx.DigestAuth(username, password) if username else None,
+        )
+
+    # ---- SOAP ----
+
+    def _call(self, url: str, action: str, body: str, timeout: Optional[float] = None):
+        envelope = _envelope(action, url, body, self.username, self.password)
+        try:
+            response = self._client.post(
+                url,
+                content=envelope.encode(),
+                headers={"Content-Type": f'application/soap+xml; charset=utf-8; action="{action}"'},
+                timeout=timeout or self._client.timeout,
+            )
+        except httpx.HTTPError as e:
+            raise OnvifError(f"{url}: {e}") from e
+        try:
+            root = ET.fromstring(response.content)
+        except ET.ParseError as e:
+            raise OnvifError(f"{url}: resposta inválida (HTTP {response.status_code})") from e
+        fault = root.find(f".//{{{NS_SOAP}}}Fault")
+        if fault is not None or response.status_code >= 400:
+            reason = "".join(fault.itertext()).strip() if fault is not None else ""
+            raise OnvifError(f"{url}: HTTP {response.status_code} {reason[:200]}")
+        return root
+
+    def _events_url(self) -> str:
+        root = self._call(
+            self.device_url,
+            ACTION_GET_CAPABILITIES,
+            f'<tds:GetCapabilities xmlns:tds="{NS_TDS}"><tds:Category>Events</tds:Category></tds:GetCapabilities>',
+        )
+        xaddr = root.find(f".//{{{NS_TT}}}Events/{{{NS_TT}}}XAddr")
+        if xaddr is None or not (xaddr.text or "").strip():
+            raise OnvifError("Câmera não anuncia serviço de eventos")
+        return xaddr.text.strip()
+
+    def open(self):
+        """Cria a assinatura e inicia a thread de long-poll."""
+        root = self._call(
+            self._events_url(),
+            ACTION_CREATE_PULLPOINT,
+            f'<tev:CreatePullPointSubscription xmlns:tev="{NS_TEV}">'
+            f"<tev:InitialTerminationTime>PT{SUBSCRIPTION_SECONDS}S</tev:InitialTerminationTime>"
+            f"</tev:CreatePullPointSubscription>",
+        )
+        address = root.find(f".//{{{NS_TEV}}}SubscriptionReference/{{{NS_WSA}}}Address")
+        if address is None or not (address.text or "").strip():
+            raise OnvifError("CreatePullPointSubscription sem endereço de assinatura")
+        self.address = address.text.strip()
+        self._expires_at = time.monotonic() + SUBSCRIPTION_SECONDS
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._pull_loop, daemon=True, name=f"onvif_cam_{self.camera_id}"
+        )
+        self._thread.start()
+        logger.info(f"[Cam {self.camera_id}] Assinatura ONVIF criada: {self.address}")
+        return self
+
+    def _renew(self):
+        self._call(
+            self.address,
+            ACTION_RENEW,
+            f'<wsnt:Renew xmlns:wsnt="{NS_WSNT}">'
+            f"<wsnt:TerminationTime>PT{SUBSCRIPTION_SECONDS}S</wsnt:TerminationTime></wsnt:Renew>",
+        )
+        self._expires_at = time.monotonic() + SUBSCRIPTION_SECONDS
+
+    def _pull(self):
+        root = self._call(
+            self.address,
+            ACTION_PULL_MESSAGES,
+            f'<tev:PullMessages xmlns:tev="{NS_TEV}">'
+            f"<tev:Timeout>PT{PULL_TIMEOUT_SECONDS}S</tev:Timeout>"
+            f"<tev:MessageLimit>{PULL_MESSAGE_LIMIT}</tev:MessageLimit></tev:PullMessages>",
+        )
+        state = parse_motion(root)
+        if state is not None:
+            self.motion = state
+
+    def _pull_loop(self):
+        try:
+            while self._running:
+                if self._expires_at - time.monotonic() < RENEW_MARGIN_SECONDS:
+                    self._renew()
+                self._pull()
+        except Exception as e:
+            if self._running:
+                logger.warning(f"[Cam {self.camera_id}] Assinatura ONVIF perdida: {e}")
+        finally:
+            self._running = False
+
+    def read_state(self, interval: float) -> Optional[bool]:
+        """Estado de movimento amostrado a cada `interval` s (None se a assinatura caiu)."""
+        time.sleep(interval)
+        if not self._running:
+            return None
+        return self.motion
+
+    # ---- Interface do processo de detecção ----
+
+    def poll(self):
+        return None if self._running else 0
+
+    def terminate(self):
+        """Não-bloqueante: o Unsubscribe sai em uma thread própria (best-effort)."""
+        was_running = self._running
+        self._running = False
+        threading.Thread(
+            target=self._unsubscribe, args=(was_running,), daemon=True,
+            name=f"onvif_unsub_cam_{self.camera_id}",
+        ).start()
+
+    kill = terminate
+
+    def _unsubscribe(self, was_running: bool):
+        if was_running and self.address:
+            try:
+                self._call(
+                    self.address, ACTION_UNSUBSCRIBE,
+                    f'<wsnt:Unsubscribe xmlns:wsnt="{NS_WSNT}"/>', timeout=UNSUBSCRIBE_TIMEOUT,
+                )
+            except Exception:
+                pass
+        # Encerra também o long-poll em andamento (a thread de pull sai sem aviso)
+        self._client.close()
+
+
+def subscribe(camera_id: int, rtsp_url: str) -> PullPointSubscription:
+    """Abre a assinatura de eventos da câmera; levanta OnvifError se não for possível."""
+    from app.models import Camera
+    from app.services.recorder import SyncSession
+
+    session = SyncSession()
+    try:
+        camera = session.get(Camera, camera_id)
+        onvif_url = camera.onvif_url if camera else None
+    finally:
+        session.close()
+
+    device_url, username, password = device_url_from_rtsp(rtsp_url, onvif_url)
+    subscription = PullPointSubscription(camera_id, device_url, username, password)
+    try:
+        return subscription.open()
+    except Exception:
+        subscription.terminate()
+        raise
@@ -0,0 +1,105 @@
+"""
+Particionamento mensal de `gravacoes` e `reconhecimentos` (opcional).
+
+Quando o banco foi convertido com `database/partitioning.sql`, as tabelas são
+particionadas por RANGE mensal (`gravacoes.data_inicio`,
+`reconhecimentos.dt_registro`) com partições `<tabela>_pYYYYMM`. Este módulo:
+- cria antecipadamente as partições dos próximos meses
+- remove (DETACH + DROP) as partições inteiramente anteriores ao corte da
+  retenção, sem varrer linha a linha (e recalcula os rollups de uso do mês,
+  já que o DROP não dispara os triggers de services/rollups.py)
+
+Em bancos não particionados todas as funções são no-op.
+"""
+
+import re
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from app.services import rollups
+
+logger = logging.getLogger("partitions")
+
+# Tabela particionada → coluna de particionamento
+PARTITIONED_TABLES = {
+    "reconhecimentos": "dt_registro",
+    "gravacoes": "data_inicio",
+}
+PARTITION_MONTHS_AHEAD = 2      # Partições futuras mantidas criadas
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def _next_month(d: date) -> date:
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def is_partitioned(session, table: str) -> bool:
+    return session.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"),
+        {"t": table},
+    ).first() is not None
+
+
+def _list_partitions(session, table: str) -> list:
+    """Partições mensais da tabela como (nome, início do mês)."""
+    names = session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:t)"
+        ),
+        {"t": table},
+    ).scalars().all()
+
+    result = []
+    for name in names:
+        match = _PARTITION_NAME.search(name)
+        if match and name.startswith(f"{table}_p"):
+            result.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(result, key=lambda p: p[1])
+
+
+def ensure_partitions(session, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """Cria as partições do mês atual e dos próximos `months_ahead` meses."""
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(session, table):
+            continue
+        month = date.today().replace(day=1)
+        for _ in range(months_ahead + 1):
+            name = f"{table}_p{month:%Y%m}"
+            upper = _next_month(month)
+            try:
+                session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+                ))
+                session.commit()
+            except Exception as e:
+                # Ex.: linhas do intervalo já caíram na partição DEFAULT
+                session.rollback()
+                logger.warning(f"Não foi possível criar a partição {name}: {e}")
+            month = upper
+
+
+def drop_expired_partitions(session, cutoff: datetime) -> list:
+    """
+    Remove as partições mensais que terminam antes de `cutoff`.
+    Retorna os nomes das partições removidas.
+    """
+    dropped = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(session, table):
+            continue
+        for name, month in _list_partitions(session, table):
+            if datetime.combine(_next_month(month), datetime.min.time()) > cutoff:
+                break
+            session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            session.execute(text(f"DROP TABLE {name}"))
+            session.commit()
+            rollups.rebuild(session, month, _next_month(month))
+            dropped.append(name)
+            logger.info(f"Partição expirada removida: {name}")
+    return dropped
@@ -0,0 +1,84 @@
+"""
+Leitura com timeout dos pipes dos processos FFmpeg.
+
+`process.stdout.read(n)` / `readline()` bloqueiam para sempre quando a câmera
+para de enviar dados sem fechar o socket. O PipeReader lê o descritor direto
+(select + os.read, com buffer próprio) e levanta PipeStalled quando nenhum
+byte chega dentro do prazo, para o recorder reiniciar o processo.
+
+O processo deve ser criado com `bufsize=0`, senão o buffer do objeto de
+arquivo do Python pode guardar dados que o select não enxerga.
+"""
+
+import os
+import select
+import time
+from typing import Optional
+
+READ_CHUNK = 64 * 1024
+
+
+class PipeStalled(Exception):
+    """Nenhum dado chegou no pipe dentro do timeout."""
+
+
+class PipeReader:
+    """Leitor de um pipe (stdout/stderr de um Popen) com prazo por leitura."""
+
+    def __init__(self, stream):
+        self.fd = stream.fileno()
+        self.eof = False
+        self._buf = bytearray()
+
+    def _fill(self, timeout: float) -> bool:
+        """Lê o que houver no pipe; False se nada chegou em `timeout` s."""
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return False
+        data = os.read(self.fd, READ_CHUNK)
+        if data:
+            self._buf += data
+        else:
+            self.eof = True
+        return True
+
+    def _fill_until(self, deadline: float, timeout: float):
+        if not self._fill(deadline - time.monotonic()):
+            raise PipeStalled(f"sem dados por {timeout:.0f}s")
+
+    def read_exact(self, size: int, timeout: float) -> Optional[bytes]:
+        """Exatamente `size` bytes (None se o pipe fechou antes)."""
+        deadline = time.monotonic() + timeout
+        while len(self._buf) < size:
+            if self.eof:
+                return None
+            self._fill_until(deadline, timeout)
+        data = bytes(self._buf[:size])
+        del self._buf[:size]
+        return data
+
+    def readline(self, timeout: float) -> Optional[bytes]:
+        """Próxima linha, com o `\\n` (None se o pipe fechou)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            end = self._buf.find(b"\n")
+            if end >= 0:
+                line = bytes(self._buf[:end + 1])
+                del self._buf[:end + 1]
+                return line
+            if self.eof:
+                if not self._buf:
+                    return None
+                line = bytes(self._buf)
+                self._buf.clear()
+                return line
+            self._fill_until(deadline, timeout)
+
+    def read_available_lines(self) -> list:
+        """Linhas completas já disponíveis, sem bloquear."""
+        for _ in range(16):
+            if self.eof or not self._fill(0):
+                break
+        *lines, rest = bytes(self._buf).split(b"\n")
+        self._buf = bytearray(rest)
+        return lines
@@ -0,0 +1,112 @@
+"""
+Playlists HLS (fMP4) virtuais sobre as gravações existentes.
+
+Monta, sob demanda, uma media playlist VOD que referencia faixas de bytes
+(EXT-X-BYTERANGE) dos próprios arquivos de segmento, servidos por
+`/api/gravacoes/{id}/stream` com suporte a range requests. Nada é
+transcodificado nem copiado.
+
+Cada arquivo tem seu próprio init segment e timestamps iniciando do zero,
+então cada troca de arquivo é marcada com EXT-X-DISCONTINUITY + EXT-X-MAP;
+EXT-X-PROGRAM-DATE-TIME ancora cada arquivo no horário real, deixando os
+buracos entre gravações visíveis para o player.
+
+Se a janela inclui um segmento ainda em gravação (`in_progress`), a playlist
+é do tipo EVENT, sem EXT-X-ENDLIST: o player recarrega e recebe os novos
+fragmentos do arquivo em crescimento, poucos segundos atrás do tempo real.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+from app.services.fragment_index import build_index, get_index
+
+# Duração alvo dos segmentos HLS (fragmentos consecutivos são agrupados)
+HLS_TARGET_SEGMENT_SECONDS = 4.0
+
+
+def _group_fragments(index, inicio: datetime, janela_ini: datetime, janela_fim: datetime):
+    """
+    Agrupa fragmentos contíguos em segmentos de ~HLS_TARGET_SEGMENT_SECONDS,
+    descartando os que ficam inteiramente fora da janela pedida.
+    Retorna lista de (offset, tamanho, duração_s, horário_início).
+    """
+    segments = []
+    if not index.fragments:
+        return segments
+
+    timescale = index.timescale
+    base_pts = index.fragments[0].pts
+    current = None
+
+    for frag in index.fragments:
+        frag_ini = inicio + timedelta(seconds=(frag.pts - base_pts) / timescale)
+        frag_dur = frag.duration / timescale
+        frag_fim = frag_ini + timedelta(seconds=frag_dur)
+        if frag_fim < janela_ini or frag_ini > janela_fim:
+            if current:
+                segments.append(current)
+                current = None
+            continue
+
+        if current and current[0] + current[1] == frag.offset \
+                and current[2] < HLS_TARGET_SEGMENT_SECONDS:
+            current = (current[0], current[1] + frag.size, current[2] + frag_dur, current[3])
+        else:
+            if current:
+                segments.append(current)
+            current = (frag.offset, frag.size, frag_dur, frag_ini)
+
+    if current:
+        segments.append(current)
+    return segments
+
+
+def build_vod_playlist(gravacoes, janela_ini: datetime, janela_fim: datetime) -> str:
+    """
+    Gera o texto da playlist para as gravações (ordenadas por data_inicio).
+    Gravações sem índice válido (arquivo ausente/corrompido) são ignoradas.
+    """
+    body = []
+    max_duration = 1.0
+    first = True
+    live = False
+
+    for g in gravacoes:
+        if g.in_progress:
+            # Arquivo crescendo: indexa os fragmentos completos sem persistir sidecar
+            live = True
+            index = build_index(g.caminho_arquivo)
+        else:
+            index = get_index(g.caminho_arquivo)
+        if index is None:
+            continue
+        segments = _group_fragments(index, g.data_inicio, janela_ini, janela_fim)
+        if not segments:
+            continue
+
+        uri = f"{g.id}/stream"
+        if not first:
+            body.append("#EXT-X-DISCONTINUITY")
+        first = False
+        body.append(f'#EXT-X-MAP:URI="{uri}",BYTERANGE="{index.init_size}@0"')
+        body.append(f"#EXT-X-PROGRAM-DATE-TIME:{segments[0][3].astimezone().isoformat(timespec='milliseconds')}")
+
+        for offset, size, duration, _ in segments:
+            max_duration = max(max_duration, duration)
+            body.append(f"#EXTINF:{duration:.3f},")
+            body.append(f"#EXT-X-BYTERANGE:{size}@{offset}")
+            body.append(uri)
+
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        f"#EXT-X-TARGETDURATION:{math.ceil(max_duration)}",
+        f"#EXT-X-PLAYLIST-TYPE:{'EVENT' if live else 'VOD'}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+    ]
+    lines.extend(body)
+    if not live:
+        lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
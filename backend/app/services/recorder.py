@@ -8,24 +8,64 @@ Cada câmera roda uma thread que:
 4. Para a gravação quando não há mais movimento
 5. Segmenta gravações no máximo a cada SEGMENT_DURATION_SECONDS
 
+A linha em `gravacoes` é criada no início do segmento (`in_progress`), com
+`data_fim`/`tamanho_bytes` avançados a cada IN_PROGRESS_UPDATE_SECONDS, para
+que o trecho em gravação já apareça no playback.
+
+A % de pixels alterados de cada frame analisado durante o segmento é
+acumulada (série + mapa de calor, ver services/activity.py) e salva com a
+gravação. Só os pixels dentro das zonas de movimento da câmera contam
+(services/motion_zones.py), e o threshold é relativo à área ativa.
+
+O detector (diferença entre frames, modelo de fundo ou score de cena no
+próprio FFmpeg) é escolhido por câmera, ver services/motion.py.
+
+Nenhuma leitura de pipe do FFmpeg bloqueia sem prazo: a detecção usa leituras
+com timeout (services/pipes.py) e a gravação é vigiada pelo `-progress` do
+FFmpeg (sem avanço por RECORDING_STALL_SECONDS = processo morto e segmento
+finalizado). Reinícios de câmeras que caíram usam espera exponencial com
+jitter, até RESTART_BACKOFF_MAX, para câmeras mortas não gastarem CPU e
+conexões.
+
+Duração de mídia, codec, resolução, bitrate e keyframes de cada segmento vêm
+da saída do próprio FFmpeg de gravação e do índice de fragmentos montado na
+finalização (services/segment_meta.py), sem ffprobe nem leitura extra; o
+`data_fim` salvo é `data_inicio` + duração de mídia.
+
+Parada coordenada (RecordingManager.stop_all): todos os recorders são
+sinalizados de uma vez (SIGINT no FFmpeg de gravação, para fechar o arquivo),
+finalizam os segmentos em paralelo dentro de um prazo global
+(SHUTDOWN_DEADLINE_SECONDS) e as linhas finais são salvas em uma única
+transação. restart_all() só reinicia câmeras novas, alteradas ou paradas;
+streams já conectados continuam como estão.
+
+Contadores e histogramas por câmera (FPS analisado, latência de decisão,
+reinícios, segmentos) ficam em `telemetry` e são expostos em `/metrics`,
+ver services/metrics.py.
+
 Isso economiza disco e CPU significativamente em comparação com gravação contínua.
 """
 
 import os
+import random
 import signal
 import threading
 import time
 import logging
 import subprocess
-from datetime import datetime
-
-import numpy as np
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, update
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
 from app.models import Gravacao, Camera
+from app.services import fragment_index, motion, motion_zones, volumes
+from app.services.metrics import CameraTelemetry, render_recorders
+from app.services.pipes import PipeReader, PipeStalled
+from app.services.segment_meta import SegmentMeta
+from app.services.activity import ActivityAccumulator
 
 logger = logging.getLogger("recorder")
 
@@ -40,15 +80,68 @@ sync_engine = create_engine(_sync_db_url, pool_size=5)
 SyncSession = sessionmaker(bind=sync_engine)
 
 # ---- Parâmetros de detecção de movimento ----
-MOTION_FPS = 2                  # FPS para análise de movimento
-MOTION_WIDTH = 160              # Largura do frame para análise
-MOTION_HEIGHT = 120             # Altura do frame para análise
-MOTION_FRAME_SIZE = MOTION_WIDTH * MOTION_HEIGHT  # Bytes por frame (grayscale)
-MOTION_THRESHOLD_PCT = 1.5      # % de pixels que devem mudar para considerar movimento
-MOTION_PIXEL_THRESHOLD = 25     # Diferença mínima de intensidade por pixel (0-255)
+# (FPS/resolução dos frames de análise ficam em services/motion.py)
 MOTION_COOLDOWN = 15            # Segundos para continuar gravando após último movimento
 MOTION_BLUR_KERNEL = 21         # Tamanho do kernel de blur para suavizar ruído
 
+# ---- Segmento em gravação ----
+IN_PROGRESS_UPDATE_SECONDS = 5  # Intervalo de atualização de data_fim do segmento em gravação
+MIN_SEGMENT_BYTES = 1000        # Abaixo disso o arquivo é considerado corrompido
+
+MOTION_FALLBACK_SECONDS = 300   # Tempo no detector do servidor antes de tentar a fonte ONVIF de novo
+
+# ---- Vigilância e reconexão ----
+RECORDING_STALL_SECONDS = 30    # Sem avanço no -progress do FFmpeg de gravação = travado
+MOTION_MAX_READ_FAILURES = 10   # Leituras inválidas seguidas antes de reiniciar a detecção
+RESTART_BACKOFF_BASE = 2        # Espera da 1ª reconexão (s), dobrando a cada falha
+RESTART_BACKOFF_MAX = 300       # Teto da espera entre reconexões (s)
+
+# ---- Parada ----
+STOP_FLUSH_TIMEOUT = 10         # Espera máxima pelo FFmpeg fechar o arquivo após SIGINT
+SHUTDOWN_DEADLINE_SECONDS = 15  # Prazo global da parada coordenada de todas as câmeras
+
+# ---- Estatísticas de detecção ----
+FALSE_TRIGGER_MAX_FRAMES = 2    # Evento com movimento em até N frames (~1s) = disparo falso
+
+
+class FinishedSegment(NamedTuple):
+    """Segmento finalizado pronto para ser salvo em `gravacoes`."""
+    camera_id: int
+    path: str
+    inicio: datetime
+    fim: datetime
+    gravacao_id: Optional[int]
+    activity: Optional[dict]
+    media: Optional[dict]
+
+
+class SegmentBatch:
+    """Segmentos finalizados durante a parada coordenada, salvos juntos pelo manager."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._segments = []
+        self._closed = False
+
+    def add(self, segment: FinishedSegment) -> bool:
+        """False se o lote já foi salvo (o recorder salva o segmento sozinho)."""
+        with self._lock:
+            if self._closed:
+                return False
+            self._segments.append(segment)
+            return True
+
+    def close(self) -> list:
+        with self._lock:
+            self._closed = True
+            return list(self._segments)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Espera exponencial com jitter: metade fixa, metade aleatória."""
+    delay = min(RESTART_BACKOFF_BASE * 2 ** attempt, RESTART_BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
 
 class CameraRecorder(threading.Thread):
     """Thread que gerencia detecção de movimento e gravação de uma câmera."""
@@ -59,6 +152,8 @@ class CameraRecorder(threading.Thread):
         self.camera_nome = camera_nome
         self.rtsp_url = rtsp_url
         self.running = True
+        self.stop_deadline = None    # Prazo (monotonic) da parada coordenada
+        self.shutdown_batch = None   # SegmentBatch da parada coordenada
 
         # Processos FFmpeg
         self.motion_process = None   # FFmpeg para ler frames (detecção)
@@ -69,94 +164,193 @@ class CameraRecorder(threading.Thread):
         self.last_motion_time = 0
         self.recording_start = None
         self.recording_path = None
+        self.recording_id = None     # Linha `in_progress` do segmento atual
         self.segment_start_time = 0
+        self._last_progress_update = 0
+        self.segment_meta = None       # SegmentMeta do segmento atual (-progress + log do FFmpeg)
+        self._interrupted = False      # SIGINT já enviado ao FFmpeg de gravação
+        self._progress_at = 0.0        # Instante do último avanço do -progress
+        self._recording_attempts = 0
+        self._recording_retry_at = 0.0
 
         # Estado de detecção
-        self.prev_frame = None
-
-    def stop(self):
-        """Para todos os processos imediatamente (não-bloqueante)."""
+        self.detector = motion.create(motion.kind_for(camera_id))
+        self.last_changed = None     # Máscara de pixels alterados do último frame
+        self.last_activity_pct = 0.0
+        self.activity = None         # ActivityAccumulator do segmento atual
+
+        # Estatísticas do modo movimento
+        self.motion_events = 0       # Gravações disparadas por movimento
+        self.false_triggers = 0      # ... com movimento em até FALSE_TRIGGER_MAX_FRAMES frames
+        self.monitored_seconds = 0.0
+        self.recorded_seconds = 0.0
+        self._event_motion_frames = 0
+        self._last_tick = None
+        self._fallback_until = 0.0   # Fonte configurada falhou: usa fallback até este instante
+        self._motion_attempts = 0
+        self._motion_retry_at = 0.0
+
+        self.telemetry = CameraTelemetry()
+
+    def stop(self, deadline: Optional[float] = None, batch: Optional[SegmentBatch] = None):
+        """
+        Sinaliza a parada (não-bloqueante): mata a detecção e pede ao FFmpeg de
+        gravação que feche o arquivo (SIGINT); a thread finaliza o segmento ao
+        sair. Na parada coordenada, `deadline` limita a espera e o segmento vai
+        para `batch` em vez de ser salvo individualmente.
+        """
+        self.stop_deadline = deadline
+        self.shutdown_batch = batch
         self.running = False
 
-        # Mata o detector de movimento imediatamente
+        # SIGINT primeiro: a finalização do MP4 começa antes de qualquer outra coisa
+        self._interrupt_recording()
+
+        # Mata o detector de movimento imediatamente (desbloqueia a leitura)
         if self.motion_process and self.motion_process.poll() is None:
             try:
                 self.motion_process.kill()
             except Exception:
                 pass
 
-        # Mata a gravação imediatamente
-        if self.recording_process and self.recording_process.poll() is None:
+        logger.info(f"[Cam {self.camera_id}] Stop sinalizado")
+
+    def _interrupt_recording(self):
+        """SIGINT (uma vez) para o FFmpeg finalizar o MP4; um segundo sinal abortaria a escrita."""
+        process = self.recording_process
+        if process and process.poll() is None and not self._interrupted:
+            self._interrupted = True
             try:
-                self.recording_process.kill()
+                process.send_signal(signal.SIGINT)
             except Exception:
                 pass
 
-        logger.info(f"[Cam {self.camera_id}] Stop sinalizado")
+    def _stop_timeout(self) -> float:
+        if self.stop_deadline is None:
+            return STOP_FLUSH_TIMEOUT
+        return min(max(self.stop_deadline - time.monotonic(), 0.1), STOP_FLUSH_TIMEOUT)
 
     def _start_motion_detector(self):
-        """Inicia FFmpeg para ler frames a baixa resolução para detecção de movimento."""
-        cmd = [
-            "ffmpeg",
-            "-rtsp_transport", "tcp",
-            "-i", self.rtsp_url,
-            "-f", "rawvideo",
-            "-pix_fmt", "gray",       # Grayscale (1 byte/pixel)
-            "-r", str(MOTION_FPS),     # FPS baixo
-            "-vf", f"scale={MOTION_WIDTH}:{MOTION_HEIGHT}",
-            "-an",                      # Sem áudio
-            "-",                        # Saída para stdout
-        ]
-
-        self.motion_process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            bufsize=MOTION_FRAME_SIZE * 4,
+        """
+        Inicia a fonte de detecção: FFmpeg com frames a baixa resolução no
+        stdout (ou só scores no log, detector de cena) ou a assinatura de
+        eventos ONVIF. Se a fonte falhar, usa o detector do servidor por
+        MOTION_FALLBACK_SECONDS.
+        """
+        try:
+            self.motion_process = self.detector.open(self.camera_id, self.rtsp_url)
+        except Exception as e:
+            fallback = motion.fallback_kind()
+            logger.warning(
+                f"[Cam {self.camera_id}] Fonte de movimento {self.detector.kind} indisponível ({e}); "
+                f"usando {fallback} por {MOTION_FALLBACK_SECONDS}s"
+            )
+            self.detector = motion.create(fallback)
+            self._fallback_until = time.monotonic() + MOTION_FALLBACK_SECONDS
+            self.motion_process = self.detector.open(self.camera_id, self.rtsp_url)
+        self.detector.reset()
+        self._last_tick = None
+        logger.info(
+            f"[Cam {self.camera_id}] Detector de movimento iniciado ({self.detector.kind})"
         )
-        self.prev_frame = None
-        logger.info(f"[Cam {self.camera_id}] Detector de movimento iniciado")
 
     def _read_motion_frame(self):
-        """Lê um frame do stream de detecção de movimento."""
+        """Lê uma amostra (frame ou score) do stream de detecção de movimento."""
         try:
-            raw = self.motion_process.stdout.read(MOTION_FRAME_SIZE)
-            if len(raw) != MOTION_FRAME_SIZE:
-                return None
-            return np.frombuffer(raw, dtype=np.uint8).reshape(
-                (MOTION_HEIGHT, MOTION_WIDTH)
+            return self.detector.read_sample(self.motion_process)
+        except PipeStalled as e:
+            self.telemetry.motion_stalls += 1
+            delay = self._schedule_motion_restart()
+            logger.warning(
+                f"[Cam {self.camera_id}] Stream de detecção travado ({e}), "
+                f"nova tentativa em {delay:.0f}s"
             )
+            return None
         except Exception:
             return None
 
+    def _schedule_motion_restart(self) -> float:
+        """Encerra a fonte de detecção e agenda o reinício com backoff."""
+        if self.motion_process:
+            try:
+                self.motion_process.kill()
+            except Exception:
+                pass
+        self.motion_process = None
+        delay = backoff_delay(self._motion_attempts)
+        self._motion_attempts += 1
+        self._motion_retry_at = time.monotonic() + delay
+        self.telemetry.stream_restarted()
+        return delay
+
+    def _sync_detector(self):
+        """Aplica a troca de detector da câmera; reinicia o FFmpeg se a saída muda."""
+        kind = motion.kind_for(self.camera_id)
+        if kind == self.detector.kind:
+            self._fallback_until = 0.0
+            return
+        if time.monotonic() < self._fallback_until:
+            return
+        logger.info(f"[Cam {self.camera_id}] Detector de movimento: {self.detector.kind} → {kind}")
+        previous = self.detector
+        self.detector = motion.create(kind)
+        if self.motion_process and (
+            previous.kind == motion.DETECTOR_ONVIF
+            or self.detector.kind == motion.DETECTOR_ONVIF
+            or previous.ffmpeg_output() != self.detector.ffmpeg_output()
+        ):
+            self.motion_process.terminate()
+            self.motion_process = None
+
     def _detect_motion(self, current_frame):
         """
-        Compara o frame atual com o anterior para detectar movimento.
+        Mede a amostra com o detector da câmera e decide se há movimento.
 
-        Usa diferença absoluta entre frames + threshold para identificar
-        pixels que mudaram significativamente. Se a % de pixels alterados
-        exceder MOTION_THRESHOLD_PCT, há movimento.
+        Com zonas de movimento, só os pixels da máscara são considerados e a %
+        é calculada sobre a área ativa. Frames analisados sem gravação em
+        curso alimentam a calibração de ruído do detector.
         """
-        if self.prev_frame is None:
-            self.prev_frame = current_frame
-            return False
-
-        # Calcula diferença absoluta
-        delta = np.abs(
-            current_frame.astype(np.int16) - self.prev_frame.astype(np.int16)
-        )
-
-        # Pixels que mudaram mais que o threshold
-        changed = np.count_nonzero(delta > MOTION_PIXEL_THRESHOLD)
-        total = current_frame.shape[0] * current_frame.shape[1]
-        pct = (changed / total) * 100
+        pct, mask = self.detector.process(current_frame, motion_zones.get_mask(self.camera_id))
+        self.last_changed = mask
+        self.last_activity_pct = pct
+        return self.detector.is_motion(pct, idle=not self.is_recording)
+
+    def _tick_motion_stats(self):
+        """Acumula o tempo monitorado em modo movimento e o tempo efetivamente gravado."""
+        now = time.monotonic()
+        if self._last_tick is not None:
+            elapsed = min(now - self._last_tick, 5.0)
+            self.monitored_seconds += elapsed
+            if self.is_recording:
+                self.recorded_seconds += elapsed
+        self._last_tick = now
 
-        self.prev_frame = current_frame
+    def _end_motion_event(self):
+        if self._event_motion_frames <= FALSE_TRIGGER_MAX_FRAMES:
+            self.false_triggers += 1
+        self._event_motion_frames = 0
 
-        return pct > MOTION_THRESHOLD_PCT
+    def motion_stats(self) -> dict:
+        hours_saved = max(self.monitored_seconds - self.recorded_seconds, 0) / 3600
+        return {
+            **self.detector.stats(),
+            "fallback": time.monotonic() < self._fallback_until,
+            "eventos": self.motion_events,
+            "disparos_falsos": self.false_triggers,
+            "taxa_disparos_falsos": (
+                round(self.false_triggers / self.motion_events, 3) if self.motion_events else None
+            ),
+            "horas_monitoradas": round(self.monitored_seconds / 3600, 2),
+            "horas_gravadas": round(self.recorded_seconds / 3600, 2),
+            "horas_economizadas": round(hours_saved, 2),
+        }
 
     def _start_recording(self):
         """Inicia gravação FFmpeg com codec copy (sem re-encoding)."""
+        if not self.running:
+            # Parada sinalizada: não abre um segmento novo
+            self.is_recording = False
+            return
         self.recording_start = datetime.now()
         output_dir = self._get_output_dir(self.recording_start)
         filename = f"{self.recording_start.strftime('%Y%m%d_%H%M%S')}.mp4"
@@ -165,24 +359,37 @@ class CameraRecorder(threading.Thread):
         duration = settings.SEGMENT_DURATION_SECONDS
 
         command = [
-            "ffmpeg", "-y",
+            "ffmpeg", "-y", "-nostdin",
             "-rtsp_transport", "tcp",
             "-i", self.rtsp_url,
             "-c", "copy",
             "-t", str(duration),
             "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            "-nostats", "-loglevel", "info",
+            "-progress", "pipe:1",
             self.recording_path,
         ]
 
+        # Progresso no stdout e log (info do stream) no stderr, os dois lidos
+        # sem bloquear em _read_recording_output: nenhum PIPE fica sem leitor
+        # (encheria e travaria o FFmpeg)
         self.recording_process = subprocess.Popen(
             command,
-            stdout=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
+            bufsize=0,
         )
+        self.recording_process.reader = PipeReader(self.recording_process.stdout)
+        self.recording_process.log = PipeReader(self.recording_process.stderr)
+        self.segment_meta = SegmentMeta()
+        self._progress_at = time.monotonic()
+        self._interrupted = False
 
         self.is_recording = True
+        self.activity = ActivityAccumulator()
         self.segment_start_time = time.time()
+        self._last_progress_update = self.segment_start_time
+        self.recording_id = self._insert_in_progress(self.recording_path, self.recording_start)
 
         # Detecta modo para log personalizado
         try:
@@ -199,16 +406,13 @@ class CameraRecorder(threading.Thread):
     def _stop_recording(self):
         """Para a gravação graciosamente (SIGINT para FFmpeg finalizar o arquivo)."""
         if self.recording_process and self.recording_process.poll() is None:
-            try:
-                # SIGINT permite ao FFmpeg finalizar o moov atom do MP4
-                self.recording_process.send_signal(signal.SIGINT)
-            except Exception:
-                pass
+            # SIGINT permite ao FFmpeg finalizar o moov atom do MP4
+            self._interrupt_recording()
             # Espera o FFmpeg finalizar o arquivo
             try:
-                self.recording_process.wait(timeout=10)
+                self.recording_process.wait(timeout=self._stop_timeout())
             except subprocess.TimeoutExpired:
-                # Se não finalizou em 10s, força o encerramento
+                # Se não finalizou no prazo, força o encerramento
                 try:
                     self.recording_process.kill()
                     self.recording_process.wait(timeout=3)
@@ -218,34 +422,115 @@ class CameraRecorder(threading.Thread):
         self._finalize_segment()
         self.is_recording = False
 
-    def _finalize_segment(self):
-        """Salva o segmento finalizado no banco e aciona reconhecimento facial."""
+    def _watch_recording(self):
+        """
+        Consome o `-progress` do FFmpeg de gravação e mata o processo se
+        out_time/total_size não avançam por RECORDING_STALL_SECONDS (câmera
+        travada sem fechar a conexão). O loop então finaliza o segmento.
+        """
+        process = self.recording_process
+        if process is None or process.poll() is not None:
+            return
+        now = time.monotonic()
+        if self._read_recording_output():
+            self._progress_at = now
+
+        if now - self._progress_at > RECORDING_STALL_SECONDS:
+            logger.warning(
+                f"[Cam {self.camera_id}] Gravação sem progresso por "
+                f"{RECORDING_STALL_SECONDS}s, encerrando FFmpeg"
+            )
+            self.telemetry.recording_stalls += 1
+            try:
+                process.kill()
+                process.wait(timeout=3)
+            except Exception:
+                pass
+
+    def _read_recording_output(self) -> bool:
+        """Drena stdout (-progress) e stderr do FFmpeg de gravação; True se avançou."""
+        process = self.recording_process
+        meta = self.segment_meta
+        if process is None or meta is None or not hasattr(process, "reader"):
+            return False
+        try:
+            advanced = meta.feed_progress(process.reader.read_available_lines())
+            meta.feed_log(process.log.read_available_lines())
+        except OSError:
+            return False
+        return advanced
+
+    def _recording_failed(self):
+        """Segmento sem arquivo válido: agenda nova tentativa de gravação com backoff."""
+        self.is_recording = False
+        delay = backoff_delay(self._recording_attempts)
+        self._recording_attempts += 1
+        self._recording_retry_at = time.monotonic() + delay
+        logger.warning(
+            f"[Cam {self.camera_id}] Gravação falhou (sem arquivo válido), "
+            f"nova tentativa em {delay:.0f}s"
+        )
+
+    def _can_start_recording(self) -> bool:
+        return time.monotonic() >= self._recording_retry_at
+
+    def _finalize_segment(self) -> bool:
+        """
+        Salva o segmento finalizado no banco e aciona reconhecimento facial.
+        Retorna False se não havia arquivo válido.
+        """
+        started = time.perf_counter()
         # Guard contra dupla finalização
         path = self.recording_path
         start = self.recording_start
+        gravacao_id = self.recording_id
+        activity = self.activity.summary() if self.activity else None
+        self._read_recording_output()   # Últimas linhas de progresso do FFmpeg que saiu
+        meta = self.segment_meta
         self.recording_path = None
         self.recording_start = None
+        self.recording_id = None
+        self.activity = None
+        self.segment_meta = None
 
         if not path or not os.path.exists(path):
-            return
+            self._discard_in_progress(gravacao_id)
+            return False
 
         file_size = os.path.getsize(path)
 
-        if file_size < 1000:
+        if file_size < MIN_SEGMENT_BYTES:
             # Arquivo muito pequeno, provavelmente corrompido
             try:
                 os.remove(path)
             except Exception:
                 pass
-            return
+            self._discard_in_progress(gravacao_id)
+            self.telemetry.segments_discarded += 1
+            return False
+
+        volumes.record_segment(path, file_size)
+
+        # Índice de fragmentos/keyframes (sidecar .idx) para seek, export e playlists
+        index = fragment_index.write_sidecar(path)
+
+        media = (meta or SegmentMeta()).columns(file_size, index)
+        if media["duracao_segundos"] and start:
+            data_fim = start + timedelta(seconds=media["duracao_segundos"])
+        else:
+            data_fim = datetime.now()
 
-        data_fim = datetime.now()
-        self._save_to_db(path, start, data_fim)
+        segment = FinishedSegment(self.camera_id, path, start, data_fim, gravacao_id, activity, media)
+        if self.shutdown_batch is None or not self.shutdown_batch.add(segment):
+            save_segments([segment])
+        self.telemetry.segment(file_size, time.perf_counter() - started)
+        self._recording_attempts = 0
+        return True
 
     def _get_output_dir(self, dt: datetime) -> str:
-        """Gera o diretório base: /recordings/{camera_id}/YYYY-MM-DD/"""
+        """Gera o diretório base: {volume}/{camera_id}/YYYY-MM-DD/"""
         dir_path = os.path.join(
-            settings.RECORDINGS_PATH,
+            volumes.choose_root(self.camera_id),
             str(self.camera_id),
             dt.strftime("%Y-%m-%d"),
         )
@@ -277,6 +562,8 @@ class CameraRecorder(threading.Thread):
         consecutive_failures = 0
 
         while self.running:
+            self._advance_in_progress()
+
             from app.main import is_continuous_recording_active
             is_continuous = is_continuous_recording_active(self.camera_id)
 
@@ -286,46 +573,70 @@ class CameraRecorder(threading.Thread):
                     self.motion_process.terminate()
                     self.motion_process = None
                 
-                if not self.is_recording:
+                if not self.is_recording and self._can_start_recording():
                     self._start_recording()
                 
                 if self.is_recording:
+                    self._watch_recording()
                     if self.recording_process and self.recording_process.poll() is not None:
-                        self._finalize_segment()
-                        self._start_recording() # Inicia novo segmento imediatamente
+                        if self._finalize_segment():
+                            self._start_recording() # Inicia novo segmento imediatamente
+                        else:
+                            self._recording_failed()
                 
                 time.sleep(1)
                 continue
 
             # --- MODO MOVIMENTO ---
+            self._sync_detector()
             if self.motion_process is None:
+                wait = self._motion_retry_at - time.monotonic()
+                if wait > 0:
+                    # Backoff de reconexão: dorme em passos curtos para atender stop()
+                    time.sleep(min(wait, 1.0))
+                    continue
                 self._start_motion_detector()
                 consecutive_failures = 0
 
             frame = self._read_motion_frame()
+            read_at = time.perf_counter()
 
             if frame is None:
+                if self.motion_process is None:
+                    # Travou: reinício já agendado em _read_motion_frame
+                    consecutive_failures = 0
+                    continue
                 consecutive_failures += 1
-                if consecutive_failures > 10:
+                self.telemetry.consecutive_failures = consecutive_failures
+                if (consecutive_failures > MOTION_MAX_READ_FAILURES
+                        or self.motion_process.poll() is not None):
+                    delay = self._schedule_motion_restart()
                     logger.warning(
-                        f"[Cam {self.camera_id}] Stream de detecção caiu, reiniciando..."
+                        f"[Cam {self.camera_id}] Stream de detecção caiu, "
+                        f"nova tentativa em {delay:.0f}s"
                     )
-                    if self.motion_process:
-                        self.motion_process.terminate()
-                    time.sleep(3)
-                    self._start_motion_detector()
                     consecutive_failures = 0
                 continue
 
             consecutive_failures = 0
+            self._motion_attempts = 0
+            self.telemetry.consecutive_failures = 0
+            self._tick_motion_stats()
             has_motion = self._detect_motion(frame)
+            self.telemetry.frame(read_at, has_motion)
 
             if has_motion:
                 self.last_motion_time = time.time()
 
-                if not self.is_recording:
+                if not self.is_recording and self._can_start_recording():
                     # INÍCIO: movimento detectado, começar a gravar
+                    self.motion_events += 1
+                    self._event_motion_frames = 0
                     self._start_recording()
+                self._event_motion_frames += 1
+
+            if self.is_recording and self.activity is not None:
+                self.activity.add(self.last_activity_pct, self.last_changed)
 
             # Verificações do estado de gravação
             if self.is_recording:
@@ -333,10 +644,13 @@ class CameraRecorder(threading.Thread):
                 time_since_motion = now - self.last_motion_time
 
                 # Verificar se o segmento FFmpeg terminou (atingiu duração máxima)
+                self._watch_recording()
                 if self.recording_process and self.recording_process.poll() is not None:
-                    self._finalize_segment()
+                    if not self._finalize_segment():
+                        self._recording_failed()
+                        self._end_motion_event()
 
-                    if time_since_motion < MOTION_COOLDOWN:
+                    elif time_since_motion < MOTION_COOLDOWN:
                         # Ainda há movimento recente, iniciar novo segmento
                         logger.info(
                             f"[Cam {self.camera_id}] Segmento concluído, "
@@ -346,6 +660,7 @@ class CameraRecorder(threading.Thread):
                     else:
                         # Sem movimento, não iniciar novo segmento
                         self.is_recording = False
+                        self._end_motion_event()
                         logger.info(
                             f"[Cam {self.camera_id}] ⬛ Gravação parada "
                             f"(sem movimento por {time_since_motion:.0f}s)"
@@ -358,65 +673,203 @@ class CameraRecorder(threading.Thread):
                         f"{MOTION_COOLDOWN}s, parando gravação"
                     )
                     self._stop_recording()
+                    self._end_motion_event()
 
-    def _save_to_db(self, path, inicio, fim):
-        """Salva o segmento no banco de dados e aciona reconhecimento facial."""
+    def _insert_in_progress(self, path, inicio):
+        """Cria a linha do segmento que está começando; retorna o id (None em erro)."""
         session = SyncSession()
         try:
-            file_size = os.path.getsize(path)
             gravacao = Gravacao(
                 id_camera=self.camera_id,
                 caminho_arquivo=path,
                 data_inicio=inicio,
-                data_fim=fim,
-                tamanho_bytes=file_size,
+                data_fim=inicio,
+                tamanho_bytes=0,
+                in_progress=True,
             )
             session.add(gravacao)
             session.commit()
+            return gravacao.id
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"[Cam {self.camera_id}] Erro ao registrar segmento em gravação: {e}")
+            return None
+        finally:
+            session.close()
 
-            duration_secs = (fim - inicio).total_seconds()
-            logger.info(
-                f"[Cam {self.camera_id}] Segmento salvo: {os.path.basename(path)} "
-                f"({file_size/1024/1024:.1f} MB, {duration_secs:.0f}s)"
-            )
+    def _advance_in_progress(self):
+        """Avança data_fim/tamanho do segmento em gravação (no máximo a cada IN_PROGRESS_UPDATE_SECONDS)."""
+        if not self.recording_id or not self.recording_path:
+            return
+        now = time.time()
+        if now - self._last_progress_update < IN_PROGRESS_UPDATE_SECONDS:
+            return
+        self._last_progress_update = now
 
-            # Processar reconhecimento facial em background (apenas se ativo)
-            try:
-                from app.main import is_face_recognition_active
-                if is_face_recognition_active():
-                    from app.services.face_recognition_service import process_video_async
-                    process_video_async(path, self.camera_id, gravacao_id=gravacao.id)
-                else:
-                    logger.debug(
-                        f"[Cam {self.camera_id}] Reconhecimento facial desativado, pulando análise"
-                    )
-            except Exception as e:
-                logger.warning(
-                    f"[Cam {self.camera_id}] Erro ao iniciar reconhecimento facial: {e}"
-                )
+        try:
+            size = os.path.getsize(self.recording_path)
+        except OSError:
+            return
+        session = SyncSession()
+        try:
+            session.execute(
+                update(Gravacao)
+                .where(Gravacao.id == self.recording_id)
+                .values(data_fim=datetime.now(), tamanho_bytes=size)
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.debug(f"[Cam {self.camera_id}] Erro ao atualizar segmento em gravação: {e}")
+        finally:
+            session.close()
 
+    def _discard_in_progress(self, gravacao_id):
+        """Remove a linha de um segmento que não gerou arquivo válido."""
+        if not gravacao_id:
+            return
+        session = SyncSession()
+        try:
+            gravacao = session.get(Gravacao, gravacao_id)
+            if gravacao:
+                session.delete(gravacao)
+                session.commit()
         except Exception as e:
             session.rollback()
-            logger.error(f"[Cam {self.camera_id}] Erro ao salvar no banco: {e}")
+            logger.warning(f"[Cam {self.camera_id}] Erro ao descartar segmento: {e}")
         finally:
             session.close()
 
 
+def _after_segment_saved(camera_id: int, path: str, gravacao_id: int):
+    """Dispara o reconhecimento facial (se ativo) e as miniaturas do segmento salvo."""
+    try:
+        from app.main import is_face_recognition_active
+        if is_face_recognition_active():
+            from app.services.face_recognition_service import process_video_async
+            process_video_async(path, camera_id, gravacao_id=gravacao_id)
+        else:
+            logger.debug(f"[Cam {camera_id}] Reconhecimento facial desativado, pulando análise")
+    except Exception as e:
+        logger.warning(f"[Cam {camera_id}] Erro ao iniciar reconhecimento facial: {e}")
+
+    # Miniaturas de pré-visualização (sprite + WebVTT) em background
+    try:
+        from app.services.thumbnails import generate_async
+        generate_async(path)
+    except Exception as e:
+        logger.warning(f"[Cam {camera_id}] Erro ao iniciar geração de miniaturas: {e}")
+
+
+def save_segments(segments: list):
+    """
+    Finaliza os segmentos em `gravacoes` em uma única transação (linha
+    `in_progress` existente ou nova) e aciona reconhecimento facial/miniaturas.
+    """
+    if not segments:
+        return
+    session = SyncSession()
+    try:
+        ids = [seg.gravacao_id for seg in segments if seg.gravacao_id]
+        existing = {
+            g.id: g for g in session.query(Gravacao).filter(Gravacao.id.in_(ids)).all()
+        } if ids else {}
+
+        saved = []
+        for seg in segments:
+            try:
+                file_size = os.path.getsize(seg.path)
+            except OSError:
+                continue
+            gravacao = existing.get(seg.gravacao_id)
+            if gravacao is None:
+                gravacao = Gravacao(id_camera=seg.camera_id, caminho_arquivo=seg.path)
+                session.add(gravacao)
+            gravacao.data_inicio = seg.inicio
+            gravacao.data_fim = seg.fim
+            gravacao.tamanho_bytes = file_size
+            gravacao.in_progress = False
+            for column, value in {**(seg.activity or {}), **(seg.media or {})}.items():
+                setattr(gravacao, column, value)
+            saved.append((seg, gravacao, file_size))
+        session.flush()
+        saved = [(seg, gravacao.id, file_size) for seg, gravacao, file_size in saved]
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        cameras = ", ".join(str(seg.camera_id) for seg in segments)
+        logger.error(f"[Cam {cameras}] Erro ao salvar no banco: {e}")
+        return
+    finally:
+        session.close()
+
+    for seg, gravacao_id, file_size in saved:
+        duration_secs = (seg.fim - seg.inicio).total_seconds()
+        logger.info(
+            f"[Cam {seg.camera_id}] Segmento salvo: {os.path.basename(seg.path)} "
+            f"({file_size/1024/1024:.1f} MB, {duration_secs:.0f}s)"
+        )
+        _after_segment_saved(seg.camera_id, seg.path, gravacao_id)
+
+
+def recover_in_progress():
+    """
+    Finaliza segmentos que ficaram `in_progress` (processo encerrado durante a
+    gravação): reindexa o arquivo e fixa data_fim pela duração real, ou remove
+    a linha se o arquivo não existir/for inválido.
+    """
+    session = SyncSession()
+    try:
+        pendentes = session.query(Gravacao).filter(Gravacao.in_progress == True).all()
+        for gravacao in pendentes:
+            path = gravacao.caminho_arquivo
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size < MIN_SEGMENT_BYTES:
+                if size:
+                    os.remove(path)
+                session.delete(gravacao)
+                continue
+
+            index = fragment_index.write_sidecar(path)
+            if index is not None and index.fragments:
+                gravacao.data_fim = gravacao.data_inicio + timedelta(seconds=index.duration_seconds)
+            else:
+                gravacao.data_fim = datetime.fromtimestamp(os.path.getmtime(path))
+            gravacao.tamanho_bytes = size
+            gravacao.in_progress = False
+        session.commit()
+        if pendentes:
+            logger.info(f"{len(pendentes)} segmento(s) interrompido(s) recuperado(s)")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erro ao recuperar segmentos em gravação: {e}")
+    finally:
+        session.close()
+
+
 class RecordingManager:
     """Gerencia as threads de gravação com detecção de movimento."""
 
     def __init__(self):
         self.recorders: dict[int, CameraRecorder] = {}
 
-    def start_all(self):
+    def _enabled_cameras(self) -> dict:
         session = SyncSession()
         try:
             cameras = session.query(Camera).filter(Camera.habilitada == True).all()
-            for cam in cameras:
-                self.start_camera(cam.id, cam.nome, cam.rtsp_url)
+            return {cam.id: cam for cam in cameras}
         finally:
             session.close()
 
+    def _start_configured(self, cam):
+        motion_zones.update_zones(cam.id, cam.zonas_movimento)
+        motion.set_kind(cam.id, cam.detector_movimento)
+        self.start_camera(cam.id, cam.nome, cam.rtsp_url)
+
+    def start_all(self):
+        for cam in self._enabled_cameras().values():
+            self._start_configured(cam)
+
     def start_camera(self, camera_id: int, nome: str, rtsp_url: str):
         if camera_id in self.recorders:
             return
@@ -430,12 +883,71 @@ class RecordingManager:
             recorder.stop()
 
     def stop_all(self):
-        for cam_id in list(self.recorders.keys()):
-            self.stop_camera(cam_id)
+        """Parada coordenada de todas as câmeras (bloqueia até SHUTDOWN_DEADLINE_SECONDS)."""
+        recorders = [self.recorders.pop(cam_id) for cam_id in list(self.recorders.keys())]
+        self._shutdown(recorders)
+
+    def _shutdown(self, recorders: list):
+        """
+        Sinaliza todos os recorders de uma vez, espera as threads finalizarem os
+        segmentos em paralelo até o prazo global e salva as linhas finais em uma
+        única transação. Threads que estouram o prazo salvam sozinhas depois.
+        """
+        if not recorders:
+            return
+        started = time.monotonic()
+        deadline = started + SHUTDOWN_DEADLINE_SECONDS
+        batch = SegmentBatch()
+        for rec in recorders:
+            rec.stop(deadline, batch)
+        for rec in recorders:
+            rec.join(max(deadline - time.monotonic(), 0))
+
+        stuck = [rec.camera_id for rec in recorders if rec.is_alive()]
+        segments = batch.close()
+        save_segments(segments)
+        logger.info(
+            f"Parada coordenada de {len(recorders)} câmeras em {time.monotonic() - started:.1f}s: "
+            f"{len(segments)} segmentos salvos"
+            + (f", câmeras ainda finalizando: {stuck}" if stuck else "")
+        )
+
+    def restart_all(self) -> dict:
+        """
+        Reinício rápido: aplica a lista atual de câmeras habilitadas sem derrubar
+        os streams já conectados. Câmeras removidas/desabilitadas, com URL RTSP
+        alterada ou com a thread morta passam pela parada coordenada; as novas e
+        as alteradas são iniciadas.
+        """
+        cameras = self._enabled_cameras()
+        kept, to_stop = [], []
+        for cam_id, rec in list(self.recorders.items()):
+            cam = cameras.get(cam_id)
+            if cam is None or cam.rtsp_url != rec.rtsp_url or not rec.is_alive():
+                to_stop.append(self.recorders.pop(cam_id))
+            else:
+                rec.camera_nome = cam.nome
+                kept.append(cam_id)
+        self._shutdown(to_stop)
+
+        started = []
+        for cam_id, cam in cameras.items():
+            if cam_id not in self.recorders:
+                self._start_configured(cam)
+                started.append(cam_id)
+        return {
+            "mantidas": kept,
+            "paradas": [rec.camera_id for rec in to_stop if rec.camera_id not in cameras],
+            "iniciadas": started,
+        }
 
     def is_active(self) -> bool:
         return any(rec.is_alive() for rec in self.recorders.values())
 
+    def is_recording_path(self, path: str) -> bool:
+        """Indica se o arquivo é o segmento sendo gravado agora por alguma câmera."""
+        return any(rec.recording_path == path for rec in list(self.recorders.values()))
+
     def get_status(self) -> dict:
         return {
             cam_id: {
@@ -446,5 +958,16 @@ class RecordingManager:
             for cam_id, rec in self.recorders.items()
         }
 
+    def get_motion_stats(self) -> dict:
+        """Detector, threshold, taxa de disparos falsos e horas de gravação economizadas por câmera."""
+        return {
+            cam_id: {"nome": rec.camera_nome, **rec.motion_stats()}
+            for cam_id, rec in list(self.recorders.items())
+        }
+
+    def render_metrics(self) -> str:
+        """Telemetria das câmeras no formato de exposição do Prometheus."""
+        return render_recorders(self.recorders)
+
 
 recording_manager = RecordingManager()
@@ -0,0 +1,260 @@
+"""
+Retenção contínua por pressão de disco e cotas.
+
+Complementa a limpeza diária por idade (cleanup.py) com uma thread que, a
+cada RETENTION_CHECK_INTERVAL_SECONDS:
+
+1. Watermarks de disco: se o uso do volume de gravações passar de
+   RETENTION_DISK_HIGH_PCT, remove as gravações mais antigas (todas as
+   câmeras) até voltar a RETENTION_DISK_LOW_PCT
+2. Cotas por câmera (`cameras.quota_gb`): remove as mais antigas da câmera
+   que excedeu a cota
+3. Cotas por grupo (`grupos.quota_gb`): idem, somando as câmeras do grupo
+
+A remoção é oldest-first via índice (data_inicio) em lotes pequenos e com
+taxa limitada (RETENTION_MAX_DELETES_PER_SECOND) para não competir com a
+escrita dos recorders. Também estima os dias de retenção projetados por câmera.
+"""
+
+import os
+import time
+import shutil
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text
+
+from app.config import settings
+from app.models import Camera, Gravacao, Grupo, GrupoCamera
+from app.services import volumes
+from app.services.deletion import DeletionJob, delete_chunk, remove_empty_dirs
+
+logger = logging.getLogger("retention")
+
+EVICT_BATCH = 20              # Gravações removidas por lote
+RATE_WINDOW_DAYS = 7          # Janela para a taxa média de gravação (bytes/dia)
+GB = 1024 ** 3
+
+
+def _disk_used_pct(path: str) -> float:
+    usage = shutil.disk_usage(path)
+    return usage.used / usage.total * 100
+
+
+class RetentionEngine(threading.Thread):
+    """Thread de retenção contínua (watermarks de disco + cotas)."""
+
+    def __init__(self):
+        super().__init__(daemon=True, name="retention_engine")
+        self.running = True
+        self._wake = threading.Event()
+        self.last_run = None
+        self.evicted_total = 0
+        self.evicted_bytes_total = 0
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+
+    def trigger(self):
+        """Antecipa a próxima rodada de retenção."""
+        self._wake.set()
+
+    def run(self):
+        logger.info(
+            f"Retenção contínua iniciada (disco {settings.RETENTION_DISK_HIGH_PCT}%→"
+            f"{settings.RETENTION_DISK_LOW_PCT}%, intervalo "
+            f"{settings.RETENTION_CHECK_INTERVAL_SECONDS}s)"
+        )
+        while self.running:
+            try:
+                self.enforce()
+            except Exception as e:
+                logger.error(f"Erro na retenção contínua: {e}")
+            self._wake.wait(settings.RETENTION_CHECK_INTERVAL_SECONDS)
+            self._wake.clear()
+
+    # ---- Remoção ----
+
+    def _evict(self, session, conditions, should_continue) -> DeletionJob:
+        """
+        Remove lotes oldest-first das gravações que atendem `conditions`
+        enquanto `should_continue(bytes_removidos)` for verdadeiro, respeitando
+        a taxa máxima. Os bytes vêm de `tamanho_bytes` das linhas removidas.
+        """
+        job = DeletionJob(descricao="retenção contínua")
+        batch_interval = EVICT_BATCH / max(settings.RETENTION_MAX_DELETES_PER_SECOND, 1)
+        freed = 0
+
+        while self.running and should_continue(freed):
+            t0 = time.monotonic()
+            rows, futures = delete_chunk(
+                session, conditions, job, order_by=Gravacao.data_inicio, limit=EVICT_BATCH
+            )
+            for future in futures:
+                future.result()
+            freed += sum(size or 0 for _, _, size in rows)
+            if len(rows) < EVICT_BATCH:
+                break
+            # Throttle: não ultrapassar RETENTION_MAX_DELETES_PER_SECOND
+            elapsed = time.monotonic() - t0
+            if elapsed < batch_interval:
+                time.sleep(batch_interval - elapsed)
+
+        job.pastas_removidas = remove_empty_dirs(job._dirs)
+        self.evicted_total += job.deletadas
+        self.evicted_bytes_total += job.bytes_liberados
+        return job
+
+    def _enforce_disk(self, session, root: str):
+        """Watermarks de um volume: remove apenas gravações gravadas nele."""
+        if _disk_used_pct(root) < settings.RETENTION_DISK_HIGH_PCT:
+            return
+
+        logger.warning(
+            f"Volume {root} acima de {settings.RETENTION_DISK_HIGH_PCT}% "
+            f"({_disk_used_pct(root):.1f}%), removendo gravações mais antigas"
+        )
+        # Caminhos arquivados (s3://) não casam com o prefixo do volume
+        job = self._evict(
+            session,
+            [Gravacao.caminho_arquivo.startswith(root.rstrip(os.sep) + os.sep)],
+            lambda freed: _disk_used_pct(root) > settings.RETENTION_DISK_LOW_PCT,
+        )
+        logger.info(
+            f"Retenção por disco ({root}): {job.deletadas} gravações removidas "
+            f"({job.bytes_liberados / GB:.2f} GB), uso atual {_disk_used_pct(root):.1f}%"
+        )
+
+    def _enforce_quota(self, session, camera_ids: list, quota_bytes: int, label: str):
+        used = session.execute(
+            text("SELECT COALESCE(SUM(bytes), 0) FROM uso_camera_dia WHERE id_camera = ANY(:ids)"),
+            {"ids": list(camera_ids)},
+        ).scalar()
+        excess = used - quota_bytes
+        if excess <= 0:
+            return
+
+        job = self._evict(
+            session,
+            [Gravacao.id_camera.in_(camera_ids)],
+            lambda freed: freed < excess,
+        )
+        logger.info(
+            f"Cota {label} excedida em {excess / GB:.2f} GB: "
+            f"{job.deletadas} gravações removidas ({job.bytes_liberados / GB:.2f} GB)"
+        )
+
+    def enforce(self):
+        """Executa uma rodada completa de retenção."""
+        from app.services.recorder import SyncSession
+
+        session = SyncSession()
+        try:
+            for volume in volumes.all_volumes():
+                if volume.usable():
+                    self._enforce_disk(session, volume.path)
+
+            cameras = session.execute(
+                select(Camera.id, Camera.quota_gb).where(Camera.quota_gb > 0)
+            ).all()
+            for cam_id, quota_gb in cameras:
+                self._enforce_quota(session, [cam_id], quota_gb * GB, f"da câmera {cam_id}")
+
+            grupos = session.execute(
+                select(Grupo.id_grupo, Grupo.quota_gb).where(Grupo.quota_gb > 0)
+            ).all()
+            for id_grupo, quota_gb in grupos:
+                camera_ids = session.execute(
+                    select(GrupoCamera.id_camera).where(GrupoCamera.id_grupo == id_grupo)
+                ).scalars().all()
+                if camera_ids:
+                    self._enforce_quota(session, camera_ids, quota_gb * GB, f"do grupo {id_grupo}")
+
+            self.last_run = datetime.now()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    # ---- Projeção ----
+
+    def projection(self) -> dict:
+        """
+        Estima, por câmera, quantos dias de gravação cabem:
+        - câmeras com cota (própria ou do grupo): cota / taxa diária
+        - demais: espaço até o low watermark dividido pela taxa total
+        """
+        from app.services.recorder import SyncSession
+
+        session = SyncSession()
+        try:
+            # Somas por câmera vêm dos rollups diários (services/rollups.py)
+            since = (datetime.now() - timedelta(days=RATE_WINDOW_DAYS)).date()
+            rates = dict(session.execute(text(
+                "SELECT id_camera, SUM(bytes) FROM uso_camera_dia WHERE dia >= :since GROUP BY id_camera"
+            ), {"since": since}).all())
+            stored = dict(session.execute(text(
+                "SELECT id_camera, SUM(bytes) FROM uso_camera_dia GROUP BY id_camera"
+            )).all())
+            oldest = dict(session.execute(text(
+                "SELECT id_camera, MIN(dia) FROM uso_camera_dia WHERE segmentos > 0 GROUP BY id_camera"
+            )).all())
+            cameras = session.execute(select(Camera.id, Camera.nome, Camera.quota_gb)).all()
+            group_quota = {
+                cam_id: quota_gb
+                for cam_id, quota_gb in session.execute(
+                    select(GrupoCamera.id_camera, Grupo.quota_gb)
+                    .join(Grupo, Grupo.id_grupo == GrupoCamera.id_grupo)
+                    .where(Grupo.quota_gb > 0)
+                ).all()
+            }
+        finally:
+            session.close()
+
+        total, used, free = volumes.distinct_usage()
+        recordings_bytes = sum(int(v or 0) for v in stored.values())
+        other_bytes = max(used - recordings_bytes, 0)
+        budget = total * settings.RETENTION_DISK_LOW_PCT / 100 - other_bytes
+        total_rate = sum(int(v or 0) for v in rates.values()) / RATE_WINDOW_DAYS
+        disk_days = budget / total_rate if total_rate > 0 else None
+
+        result = []
+        for cam_id, nome, quota_gb in cameras:
+            rate = int(rates.get(cam_id) or 0) / RATE_WINDOW_DAYS
+            quota = quota_gb or group_quota.get(cam_id)
+            if quota and rate > 0:
+                days = quota * GB / rate
+            else:
+                days = disk_days
+            if days is not None:
+                days = round(min(days, settings.RETENTION_DAYS), 1)
+            result.append({
+                "id_camera": cam_id,
+                "nome": nome,
+                "quota_gb": quota,
+                "bytes_armazenados": int(stored.get(cam_id) or 0),
+                "bytes_por_dia": int(rate),
+                "gravacao_mais_antiga": oldest.get(cam_id),
+                "dias_projetados": days,
+            })
+
+        return {
+            "disco": {
+                "total_bytes": total,
+                "usado_bytes": used,
+                "livre_bytes": free,
+                "uso_pct": round(used / total * 100, 1) if total else None,
+                "high_watermark_pct": settings.RETENTION_DISK_HIGH_PCT,
+                "low_watermark_pct": settings.RETENTION_DISK_LOW_PCT,
+            },
+            "ultima_execucao": self.last_run,
+            "removidas_total": self.evicted_total,
+            "bytes_removidos_total": self.evicted_bytes_total,
+            "cameras": result,
+        }
+
+
+retention_engine = RetentionEngine()
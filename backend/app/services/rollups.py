@@ -0,0 +1,307 @@
+"""
+Rollups de uso por câmera (hora e dia), mantidos de forma incremental.
+
+`uso_camera_hora` e `uso_camera_dia` guardam, por câmera e período (pela
+`data_inicio` do segmento / `dt_registro` do reconhecimento): bytes, segundos
+gravados, número de segmentos e reconhecimentos. Os painéis e a previsão de
+enchimento do disco leem só essas tabelas, com custo independente do volume
+de `gravacoes`.
+
+A atualização é feita por triggers de comando (FOR EACH STATEMENT) com
+transition tables em `gravacoes` e `reconhecimentos`: cada INSERT/UPDATE/DELETE
+aplica um único delta agregado, então os caminhos que já existem (recorder,
+exclusão em lotes, retenção, limpeza, CASCADE ao apagar câmera/pessoa,
+transcoder) ficam cobertos sem código extra, e um DELETE de milhares de linhas
+custa um UPSERT por câmera × hora. Segmentos `in_progress` só entram quando
+finalizados. Partições removidas com DROP (partitions.py) não disparam
+triggers: o intervalo do mês é recalculado com rebuild().
+
+As linhas por hora são mantidas por ROLLUP_HOURLY_DAYS; as diárias, enquanto
+houver dados.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.services import volumes
+
+logger = logging.getLogger("rollups")
+
+ROLLUP_HOURLY_DAYS = 90         # Retenção das linhas por hora
+FORECAST_WINDOW_DAYS = 28       # Dias completos usados na tendência da previsão
+FORECAST_MIN_DAYS = 3           # Abaixo disso a previsão usa só a média
+
+_COUNTERS = ("bytes", "segundos", "segmentos", "reconhecimentos")
+
+# Delta (id_camera, instante, contadores...) aplicado às duas tabelas em um comando
+_APPLY_DELTA = """
+WITH delta AS ({source}),
+por_hora AS (
+    INSERT INTO uso_camera_hora AS u (id_camera, hora, bytes, segundos, segmentos, reconhecimentos)
+    SELECT id_camera, date_trunc('hour', instante), SUM(bytes), SUM(segundos), SUM(segmentos), SUM(reconhecimentos)
+    FROM delta GROUP BY 1, 2
+    HAVING SUM(bytes) <> 0 OR SUM(segundos) <> 0 OR SUM(segmentos) <> 0 OR SUM(reconhecimentos) <> 0
+    ON CONFLICT (id_camera, hora) DO UPDATE SET
+        bytes = u.bytes + EXCLUDED.bytes,
+        segundos = u.segundos + EXCLUDED.segundos,
+        segmentos = u.segmentos + EXCLUDED.segmentos,
+        reconhecimentos = u.reconhecimentos + EXCLUDED.reconhecimentos
+)
+INSERT INTO uso_camera_dia AS u (id_camera, dia, bytes, segundos, segmentos, reconhecimentos)
+SELECT id_camera, instante::date, SUM(bytes), SUM(segundos), SUM(segmentos), SUM(reconhecimentos)
+FROM delta GROUP BY 1, 2
+HAVING SUM(bytes) <> 0 OR SUM(segundos) <> 0 OR SUM(segmentos) <> 0 OR SUM(reconhecimentos) <> 0
+ON CONFLICT (id_camera, dia) DO UPDATE SET
+    bytes = u.bytes + EXCLUDED.bytes,
+    segundos = u.segundos + EXCLUDED.segundos,
+    segmentos = u.segmentos + EXCLUDED.segmentos,
+    reconhecimentos = u.reconhecimentos + EXCLUDED.reconhecimentos
+"""
+
+
+def _gravacoes_source(table: str, sign: str, where: str = "TRUE") -> str:
+    return (
+        f"SELECT id_camera, data_inicio AS instante, "
+        f"{sign}COALESCE(tamanho_bytes, 0)::bigint AS bytes, "
+        f"{sign}COALESCE(duracao_segundos, EXTRACT(EPOCH FROM data_fim - data_inicio))::float8 AS segundos, "
+        f"{sign}1 AS segmentos, 0 AS reconhecimentos "
+        f"FROM {table} WHERE NOT COALESCE(in_progress, FALSE) AND {where}"
+    )
+
+
+def _reconhecimentos_source(table: str, sign: str, where: str = "TRUE") -> str:
+    return (
+        f"SELECT id_camera, COALESCE(dt_registro, now()::timestamp) AS instante, "
+        f"0::bigint AS bytes, 0::float8 AS segundos, 0 AS segmentos, {sign}1 AS reconhecimentos "
+        f"FROM {table} WHERE {where}"
+    )
+
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS uso_camera_hora (
+        id_camera       INTEGER NOT NULL,
+        hora            TIMESTAMP NOT NULL,
+        bytes           BIGINT NOT NULL DEFAULT 0,
+        segundos        DOUBLE PRECISION NOT NULL DEFAULT 0,
+        segmentos       INTEGER NOT NULL DEFAULT 0,
+        reconhecimentos INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (id_camera, hora)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS uso_camera_dia (
+        id_camera       INTEGER NOT NULL,
+        dia             DATE NOT NULL,
+        bytes           BIGINT NOT NULL DEFAULT 0,
+        segundos        DOUBLE PRECISION NOT NULL DEFAULT 0,
+        segmentos       INTEGER NOT NULL DEFAULT 0,
+        reconhecimentos INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (id_camera, dia)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_uso_camera_hora_hora ON uso_camera_hora(hora)",
+    "CREATE INDEX IF NOT EXISTS idx_uso_camera_dia_dia ON uso_camera_dia(dia)",
+]
+
+# (tabela, evento, função, REFERENCING, origem do delta)
+_TRIGGERS = [
+    ("gravacoes", "INSERT", "uso_gravacoes_ins", "NEW TABLE AS novas",
+     _gravacoes_source("novas", "")),
+    ("gravacoes", "UPDATE", "uso_gravacoes_upd", "OLD TABLE AS antigas NEW TABLE AS novas",
+     _gravacoes_source("antigas", "-") + " UNION ALL " + _gravacoes_source("novas", "")),
+    ("gravacoes", "DELETE", "uso_gravacoes_del", "OLD TABLE AS antigas",
+     _gravacoes_source("antigas", "-")),
+    ("reconhecimentos", "INSERT", "uso_reconhecimentos_ins", "NEW TABLE AS novas",
+     _reconhecimentos_source("novas", "")),
+    ("reconhecimentos", "DELETE", "uso_reconhecimentos_del", "OLD TABLE AS antigas",
+     _reconhecimentos_source("antigas", "-")),
+]
+
+
+def _trigger_sql(table: str, event: str, function: str, referencing: str, source: str) -> list:
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+        BEGIN
+            {_APPLY_DELTA.format(source=source)};
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        f"DROP TRIGGER IF EXISTS trg_{function} ON {table}",
+        f"""
+        CREATE TRIGGER trg_{function} AFTER {event} ON {table}
+        REFERENCING {referencing}
+        FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+        """,
+    ]
+
+
+def ensure_schema(session):
+    """Cria tabelas, funções e triggers; popula os rollups na primeira vez."""
+    for statement in _SCHEMA:
+        session.execute(text(statement))
+    for trigger in _TRIGGERS:
+        for statement in _trigger_sql(*trigger):
+            session.execute(text(statement))
+    empty = session.execute(text("SELECT NOT EXISTS (SELECT 1 FROM uso_camera_dia)")).scalar()
+    if empty:
+        rebuild(session, commit=False)
+    session.commit()
+
+
+def rebuild(session, desde: Optional[date] = None, ate: Optional[date] = None, commit: bool = True):
+    """
+    Recalcula os rollups no intervalo de dias [desde, ate) a partir das tabelas
+    base (tudo, se não informado). As tabelas de rollup ficam travadas até o
+    commit, então deltas concorrentes são aplicados depois e não se perdem.
+    """
+    params = {
+        "desde": datetime.combine(desde or date.min, datetime.min.time()),
+        "ate": datetime.combine(ate or date.max, datetime.min.time()),
+    }
+    session.execute(text("LOCK TABLE uso_camera_hora, uso_camera_dia IN EXCLUSIVE MODE"))
+    session.execute(text("DELETE FROM uso_camera_hora WHERE hora >= :desde AND hora < :ate"), params)
+    session.execute(text("DELETE FROM uso_camera_dia WHERE dia >= :desde AND dia < :ate"), params)
+    source = (
+        _gravacoes_source("gravacoes", "", "data_inicio >= :desde AND data_inicio < :ate")
+        + " UNION ALL "
+        + _reconhecimentos_source("reconhecimentos", "", "dt_registro >= :desde AND dt_registro < :ate")
+    )
+    session.execute(text(_APPLY_DELTA.format(source=source)), params)
+    if commit:
+        session.commit()
+
+
+def prune(session) -> int:
+    """Remove linhas por hora antigas e linhas zeradas (dados já apagados)."""
+    cutoff = datetime.now() - timedelta(days=ROLLUP_HOURLY_DAYS)
+    removed = session.execute(
+        text("DELETE FROM uso_camera_hora WHERE hora < :cutoff OR (segmentos <= 0 AND reconhecimentos <= 0)"),
+        {"cutoff": cutoff},
+    ).rowcount
+    removed += session.execute(
+        text("DELETE FROM uso_camera_dia WHERE segmentos <= 0 AND reconhecimentos <= 0")
+    ).rowcount
+    session.commit()
+    return removed
+
+
+# ---- Consultas ----
+
+def summary(granularidade: str = "dia", dias: int = 7, camera_id: Optional[int] = None) -> dict:
+    """Série por câmera e período (hora ou dia) dos últimos `dias` dias, com totais."""
+    from app.services.recorder import SyncSession
+
+    table, column = ("uso_camera_hora", "hora") if granularidade == "hora" else ("uso_camera_dia", "dia")
+    since = datetime.combine(date.today() - timedelta(days=dias - 1), datetime.min.time())
+    where = f"{column} >= :since" + (" AND u.id_camera = :camera_id" if camera_id is not None else "")
+
+    session = SyncSession()
+    try:
+        rows = session.execute(
+            text(
+                f"SELECT u.id_camera, c.nome, u.{column}, u.bytes, u.segundos, u.segmentos, u.reconhecimentos "
+                f"FROM {table} u LEFT JOIN cameras c ON c.id = u.id_camera "
+                f"WHERE {where} ORDER BY u.id_camera, u.{column}"
+            ),
+            {"since": since, "camera_id": camera_id},
+        ).all()
+    finally:
+        session.close()
+
+    cameras = {}
+    for cam_id, nome, periodo, bytes_, segundos, segmentos, reconhecimentos in rows:
+        camera = cameras.setdefault(cam_id, {
+            "id_camera": cam_id,
+            "nome": nome,
+            "totais": dict.fromkeys(_COUNTERS, 0),
+            "serie": [],
+        })
+        values = dict(zip(_COUNTERS, (int(bytes_), round(segundos, 1), segmentos, reconhecimentos)))
+        camera["serie"].append({"periodo": periodo, **values})
+        for key, value in values.items():
+            camera["totais"][key] += value
+
+    for camera in cameras.values():
+        camera["totais"]["horas_gravadas"] = round(camera["totais"]["segundos"] / 3600, 2)
+        camera["totais"]["segundos"] = round(camera["totais"]["segundos"], 1)
+    return {"granularidade": "hora" if table == "uso_camera_hora" else "dia", "dias": dias,
+            "cameras": list(cameras.values())}
+
+
+def _trend(values: list) -> tuple:
+    """(média, inclinação por dia) por mínimos quadrados sobre a série diária."""
+    n = len(values)
+    mean = sum(values) / n
+    if n < FORECAST_MIN_DAYS:
+        return mean, 0.0
+    x_mean = (n - 1) / 2
+    var = sum((x - x_mean) ** 2 for x in range(n))
+    slope = sum((x - x_mean) * (y - mean) for x, y in enumerate(values)) / var
+    return mean, slope
+
+
+def forecast() -> dict:
+    """
+    Previsão de enchimento do disco pela tendência dos bytes gravados por dia
+    (últimos FORECAST_WINDOW_DAYS dias completos, todas as câmeras).
+    """
+    from app.services.recorder import SyncSession
+
+    today = date.today()
+    since = today - timedelta(days=FORECAST_WINDOW_DAYS)
+    session = SyncSession()
+    try:
+        daily = dict(session.execute(
+            text("SELECT dia, SUM(bytes) FROM uso_camera_dia WHERE dia >= :since AND dia < :today GROUP BY dia"),
+            {"since": since, "today": today},
+        ).all())
+        first_day = session.execute(text("SELECT MIN(dia) FROM uso_camera_dia WHERE segmentos > 0")).scalar()
+    finally:
+        session.close()
+
+    total, used, free = volumes.distinct_usage()
+    disk = {
+        "total_bytes": total,
+        "usado_bytes": used,
+        "livre_bytes": free,
+        "uso_pct": round(used / total * 100, 1) if total else None,
+    }
+    # Dias sem gravação dentro da janela contam como zero (desde o primeiro dado)
+    start = max(since, first_day or since)
+    values = [int(daily.get(start + timedelta(days=i), 0)) for i in range((today - start).days)]
+    if not daily or not values:
+        return {"disco": disk, "bytes_por_dia": None, "tendencia_bytes_por_dia": None,
+                "dias_ate_high_watermark": None, "dias_ate_cheio": None, "uso_estavel_bytes": None}
+    mean, slope = _trend(values)
+    rate = max(mean + slope * (len(values) - 1) / 2, 0)   # Valor projetado para hoje
+
+    def days_until(limit_bytes: float) -> Optional[float]:
+        """Dias até `limit_bytes` adicionais, com a taxa crescendo `slope` por dia."""
+        if limit_bytes <= 0:
+            return 0.0
+        if slope <= 0:
+            return round(limit_bytes / rate, 1) if rate > 0 else None
+        # rate*d + slope*d²/2 = limite
+        d = (-rate + (rate ** 2 + 2 * slope * limit_bytes) ** 0.5) / slope
+        return round(d, 1)
+
+    high_limit = total * settings.RETENTION_DISK_HIGH_PCT / 100 - used
+    steady = rate * settings.RETENTION_DAYS
+    return {
+        "disco": disk,
+        "janela_dias": len(values),
+        "bytes_por_dia": int(rate),
+        "tendencia_bytes_por_dia": int(slope),
+        "dias_ate_high_watermark": days_until(high_limit),
+        "dias_ate_cheio": days_until(free),
+        # Com a retenção por idade, o uso se estabiliza em taxa × RETENTION_DAYS
+        "uso_estavel_bytes": int(steady),
+        "retencao_cabe_no_disco": steady <= total * settings.RETENTION_DISK_HIGH_PCT / 100,
+    }
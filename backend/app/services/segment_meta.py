@@ -0,0 +1,82 @@
+"""
+Metadados de mídia do segmento coletados da saída do próprio FFmpeg de gravação.
+
+Nenhuma leitura extra do arquivo: o `-progress` (stdout) dá a duração de mídia
+(out_time_us) e os bytes escritos, e o log (stderr, nível info) traz a linha
+`Stream #0:0: Video: h264 (...), ..., 1920x1080, ...` da entrada. O número de
+keyframes vem do índice de fragmentos que o recorder já monta na finalização
+(com `frag_keyframe`, cada fragmento começa em um keyframe).
+"""
+
+import re
+from typing import Optional
+
+_VIDEO_STREAM = re.compile(rb"Stream #\d+:\d+.*?: Video: (\w+)")
+_RESOLUTION = re.compile(rb", (\d{2,5})x(\d{2,5})\b")
+
+
+def _int(value: Optional[bytes]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SegmentMeta:
+    """Acumula progresso e informações do stream de um segmento em gravação."""
+
+    def __init__(self):
+        self.out_time_us = None
+        self.total_size = None
+        self.codec = None
+        self.width = None
+        self.height = None
+
+    def feed_progress(self, lines: list) -> bool:
+        """Processa linhas `chave=valor` do -progress; True se a gravação avançou."""
+        advanced = False
+        for line in lines:
+            key, _, value = line.partition(b"=")
+            if key == b"out_time_us":
+                out_time = _int(value.strip())
+                if out_time is not None and out_time > (self.out_time_us or 0):
+                    self.out_time_us = out_time
+                    advanced = True
+            elif key == b"total_size":
+                size = _int(value.strip())
+                if size is not None and size > (self.total_size or 0):
+                    self.total_size = size
+                    advanced = True
+        return advanced
+
+    def feed_log(self, lines: list):
+        """Procura o codec/resolução do vídeo de entrada no log do FFmpeg."""
+        if self.codec is not None:
+            return
+        for line in lines:
+            match = _VIDEO_STREAM.search(line)
+            if not match:
+                continue
+            self.codec = match.group(1).decode("ascii", "replace")[:20]
+            resolution = _RESOLUTION.search(line, match.end())
+            if resolution:
+                self.width, self.height = int(resolution.group(1)), int(resolution.group(2))
+            return
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        return self.out_time_us / 1_000_000 if self.out_time_us else None
+
+    def columns(self, file_size: int, index=None) -> dict:
+        """Valores das colunas de mídia de `gravacoes` (None onde não se sabe)."""
+        duration = self.duration_seconds
+        if duration is None and index is not None and index.fragments:
+            duration = index.duration_seconds
+        return {
+            "duracao_segundos": round(duration, 3) if duration else None,
+            "codec_video": self.codec,
+            "largura": self.width,
+            "altura": self.height,
+            "bitrate_kbps": round(file_size * 8 / duration / 1000) if duration else None,
+            "keyframes": sum(1 for frag in index.fragments if frag.keyframe) if index else None,
+        }
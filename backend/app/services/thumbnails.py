@@ -0,0 +1,229 @@
+"""
+Miniaturas de pré-visualização (scrub preview) por gravação.
+
+Para cada segmento gera, ao lado do arquivo de vídeo:
+- `<arquivo>.sprite.jpg`: sprite sheet com miniaturas em grade
+- `<arquivo>.vtt`: trilha WebVTT de thumbnails apontando para regiões do sprite
+
+O FFmpeg decodifica apenas keyframes (`-skip_frame nokey`), o que torna a
+geração barata. Roda em uma única thread de background, alimentada por uma
+fila limitada após a finalização de cada segmento (se a fila enche, o segmento
+fica para a geração sob demanda), e para gravações antigas sob demanda no
+primeiro acesso. Os arquivos são removidos junto com a gravação pela retenção.
+"""
+
+import math
+import os
+import logging
+import queue
+import subprocess
+import threading
+
+import cv2
+
+from app.services import archive, fragment_index
+
+logger = logging.getLogger("thumbnails")
+
+SPRITE_SUFFIX = ".sprite.jpg"
+VTT_SUFFIX = ".vtt"
+# URL do sprite referenciada no VTT (relativa a /api/gravacoes/{id}/thumbnails.vtt)
+SPRITE_URL = "sprite.jpg"
+
+THUMB_WIDTH = 160           # Largura de cada miniatura (altura segue o aspecto)
+THUMB_COLUMNS = 10          # Miniaturas por linha do sprite
+THUMB_MAX_TILES = 100       # Máximo de miniaturas por gravação
+THUMB_MIN_INTERVAL = 2.0    # Intervalo mínimo entre miniaturas (s)
+THUMB_QUEUE_MAX = 500       # Segmentos aguardando a thread de background
+
+# Gera no máximo 1 sprite por vez (não competir com gravação/reconhecimento)
+_semaphore = threading.Semaphore(1)
+_locks_lock = threading.Lock()
+_path_locks = {}            # caminho → [lock, usuários]; removido quando ninguém mais usa
+
+_queue = queue.Queue(maxsize=THUMB_QUEUE_MAX)
+_queued = set()             # Caminhos na fila (evita duplicatas)
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def sprite_path(path: str) -> str:
+    return path + SPRITE_SUFFIX
+
+
+def vtt_path(path: str) -> str:
+    return path + VTT_SUFFIX
+
+
+def _format_ts(seconds: float) -> str:
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600 * 1000)
+    m, ms = divmod(ms, 60 * 1000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+def _build_vtt(sprite_name: str, count: int, interval: float, duration: float,
+               tile_w: int, tile_h: int) -> str:
+    lines = ["WEBVTT", ""]
+    for i in range(count):
+        start = i * interval
+        end = min((i + 1) * interval, duration)
+        if start >= duration:
+            break
+        x = (i % THUMB_COLUMNS) * tile_w
+        y = (i // THUMB_COLUMNS) * tile_h
+        lines.append(f"{_format_ts(start)} --> {_format_ts(end)}")
+        lines.append(f"{sprite_name}#xywh={x},{y},{tile_w},{tile_h}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _generate(path: str) -> bool:
+    """Gera sprite + VTT de uma gravação. Retorna True em caso de sucesso."""
+    index = fragment_index.get_index(path)
+    if index is None or not index.fragments:
+        logger.warning(f"Miniaturas: gravação sem índice válido: {path}")
+        return False
+
+    duration = index.duration_seconds
+    interval = max(THUMB_MIN_INTERVAL, duration / THUMB_MAX_TILES)
+    count = max(1, math.ceil(duration / interval))
+    rows = math.ceil(count / THUMB_COLUMNS)
+    columns = min(count, THUMB_COLUMNS)
+
+    sprite = sprite_path(path)
+    tmp_sprite = sprite + ".tmp.jpg"
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-skip_frame", "nokey",          # Decodifica apenas keyframes
+        "-i", path,
+        "-an",
+        "-vf", f"fps=1/{interval:.3f},scale={THUMB_WIDTH}:-2,tile={columns}x{rows}",
+        "-frames:v", "1",
+        "-q:v", "5",
+        tmp_sprite,
+    ]
+    try:
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=60,
+        )
+        if result.returncode != 0 or not os.path.exists(tmp_sprite):
+            logger.warning(f"FFmpeg falhou ao gerar sprite de {path}: {result.stderr[-300:]}")
+            return False
+
+        image = cv2.imread(tmp_sprite)
+        if image is None:
+            return False
+        tile_w = image.shape[1] // columns
+        tile_h = image.shape[0] // rows
+
+        vtt = _build_vtt(SPRITE_URL, count, interval, duration, tile_w, tile_h)
+        tmp_vtt = vtt_path(path) + ".tmp"
+        with open(tmp_vtt, "w", encoding="utf-8") as f:
+            f.write(vtt)
+
+        os.replace(tmp_sprite, sprite)
+        os.replace(tmp_vtt, vtt_path(path))
+        logger.debug(f"Miniaturas geradas: {os.path.basename(path)} ({count} quadros)")
+        return True
+
+    except subprocess.TimeoutExpired:
+        logger.error(f"FFmpeg timeout ao gerar sprite de {path}")
+        return False
+    except OSError as e:
+        logger.error(f"Erro ao gerar miniaturas de {path}: {e}")
+        return False
+    finally:
+        if os.path.exists(tmp_sprite):
+            try:
+                os.remove(tmp_sprite)
+            except OSError:
+                pass
+
+
+def _acquire_path_lock(path: str) -> threading.Lock:
+    """Lock da gravação, com contagem de usuários para removê-lo só quando livre."""
+    with _locks_lock:
+        entry = _path_locks.get(path)
+        if entry is None:
+            entry = _path_locks[path] = [threading.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def _release_path_lock(path: str):
+    with _locks_lock:
+        entry = _path_locks.get(path)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _path_locks[path]
+
+
+def ensure_thumbnails(path: str) -> bool:
+    """
+    Garante que sprite e VTT existam (gera se faltarem).
+    Requisições simultâneas para a mesma gravação geram apenas uma vez.
+    Gravações arquivadas não são regeneradas: usam os arquivos locais.
+    """
+    if archive.is_archived(path):
+        path = archive.local_path(path)
+        return os.path.exists(vtt_path(path)) and os.path.exists(sprite_path(path))
+
+    if os.path.exists(vtt_path(path)) and os.path.exists(sprite_path(path)):
+        return True
+
+    lock = _acquire_path_lock(path)
+    try:
+        with lock:
+            if os.path.exists(vtt_path(path)) and os.path.exists(sprite_path(path)):
+                return True
+            with _semaphore:
+                return _generate(path)
+    finally:
+        _release_path_lock(path)
+
+
+def _worker_loop():
+    while True:
+        path = _queue.get()
+        with _locks_lock:
+            _queued.discard(path)
+        try:
+            if os.path.exists(path):
+                ensure_thumbnails(path)
+        except Exception as e:
+            logger.error(f"Erro ao gerar miniaturas de {path}: {e}")
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_worker_loop, daemon=True, name="thumbnails")
+            _worker.start()
+
+
+def generate_async(path: str) -> bool:
+    """
+    Enfileira a geração das miniaturas (pós-finalização do segmento).
+    Retorna False se a fila está cheia: o segmento fica para a geração sob
+    demanda no primeiro acesso, em vez de acumular threads esperando.
+    """
+    _ensure_worker()
+    with _locks_lock:
+        if path in _queued:
+            return True
+        try:
+            _queue.put_nowait(path)
+        except queue.Full:
+            logger.warning(f"Fila de miniaturas cheia ({THUMB_QUEUE_MAX}); {os.path.basename(path)} fica sob demanda")
+            return False
+        _queued.add(path)
+    return True
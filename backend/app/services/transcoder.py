@@ -0,0 +1,287 @@
+"""
+Re-encode em background de gravações antigas para um perfil reduzido.
+
+Gravações com mais de TRANSCODE_AFTER_DAYS dias são recodificadas (H.264,
+altura máxima TRANSCODE_MAX_HEIGHT, bitrate TRANSCODE_VIDEO_BITRATE) para
+que o mesmo disco guarde mais dias. Ficam de fora:
+- gravações com reconhecimentos faciais
+- gravações com muito movimento: atividade média acima de MOTION_ACTIVITY_PCT
+  (services/activity.py) ou, sem dados de atividade (gravação contínua),
+  bitrate bem acima da média da câmera
+- gravações arquivadas no object store
+
+Orçamento de CPU: um FFmpeg por vez, com `nice 19`, uma thread de codificação
+e ciclo de trabalho limitado a TRANSCODE_CPU_PERCENT (após cada arquivo a
+thread dorme proporcionalmente ao tempo gasto).
+
+A troca é atômica: o resultado é validado (índice de fragmentos e duração),
+a linha é atualizada (`tamanho_bytes`, `perfil_video`) e o arquivo substituído
+com os.replace antes do commit.
+"""
+
+import os
+import time
+import logging
+import subprocess
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, func, select, update
+
+from app.config import settings
+from app.models import Gravacao, Reconhecimento
+from app.services import archive, fragment_index
+
+logger = logging.getLogger("transcoder")
+
+TRANSCODE_BATCH = 20              # Gravações buscadas por consulta
+TRANSCODE_IDLE_SECONDS = 300      # Espera quando não há candidatas
+TRANSCODE_TIMEOUT = 1800          # Tempo máximo de um FFmpeg (s)
+TRANSCODE_MIN_SAVING = 0.9        # Só troca se o novo arquivo tiver < 90% do original
+MOTION_ACTIVITY_PCT = 5.0         # Atividade média (% de pixels) acima disso = muito movimento
+MOTION_RATE_FACTOR = 1.5          # Sem atividade: bitrate > 1.5x a média da câmera
+DURATION_TOLERANCE = 1.0          # Diferença máxima de duração aceita (s)
+
+PERFIL_ORIGINAL = "original"      # Avaliada e mantida
+PERFIL_REDUZIDO = "reduzido"      # Recodificada
+
+
+def _duration_seconds(column_ini, column_fim):
+    return func.greatest(func.extract("epoch", column_fim - column_ini), 1)
+
+
+class Transcoder(threading.Thread):
+    """Thread única de recodificação com orçamento de CPU."""
+
+    def __init__(self):
+        super().__init__(daemon=True, name="transcoder")
+        self.running = True
+        self._wake = threading.Event()
+        self._process = None
+        self.transcoded_total = 0
+        self.skipped_total = 0
+        self.bytes_saved_total = 0
+        self.current = None
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        process = self._process
+        if process and process.poll() is None:
+            process.kill()
+
+    def status(self) -> dict:
+        return {
+            "ativo": self.is_alive(),
+            "atual": self.current,
+            "recodificadas": self.transcoded_total,
+            "mantidas": self.skipped_total,
+            "bytes_economizados": self.bytes_saved_total,
+        }
+
+    def run(self):
+        logger.info(
+            f"Transcoder iniciado (> {settings.TRANSCODE_AFTER_DAYS} dias → "
+            f"{settings.TRANSCODE_MAX_HEIGHT}p @ {settings.TRANSCODE_VIDEO_BITRATE}, "
+            f"CPU {settings.TRANSCODE_CPU_PERCENT}%)"
+        )
+        while self.running:
+            try:
+                processed = self._run_batch()
+            except Exception as e:
+                logger.error(f"Erro no transcoder: {e}")
+                processed = 0
+            if not processed:
+                self._wake.wait(TRANSCODE_IDLE_SECONDS)
+
+    # ---- Seleção ----
+
+    def _candidates(self, session) -> list:
+        cutoff = datetime.now() - timedelta(days=settings.TRANSCODE_AFTER_DAYS)
+        return session.execute(
+            select(Gravacao.id, Gravacao.id_camera, Gravacao.caminho_arquivo,
+                   Gravacao.tamanho_bytes, Gravacao.data_inicio, Gravacao.data_fim,
+                   Gravacao.atividade_media, Gravacao.largura, Gravacao.altura)
+            .where(
+                Gravacao.data_fim < cutoff,
+                Gravacao.perfil_video.is_(None),
+                ~Gravacao.caminho_arquivo.startswith(archive.ARCHIVE_SCHEME),
+                ~exists().where(Reconhecimento.id_gravacao == Gravacao.id),
+            )
+            .order_by(Gravacao.data_inicio)
+            .limit(TRANSCODE_BATCH)
+        ).all()
+
+    def _camera_rates(self, session, camera_ids) -> dict:
+        """Bitrate médio (bytes/s) das gravações originais de cada câmera."""
+        return dict(session.execute(
+            select(
+                Gravacao.id_camera,
+                func.avg(Gravacao.tamanho_bytes / _duration_seconds(Gravacao.data_inicio, Gravacao.data_fim)),
+            )
+            .where(
+                Gravacao.id_camera.in_(camera_ids),
+                func.coalesce(Gravacao.perfil_video, PERFIL_ORIGINAL) == PERFIL_ORIGINAL,
+            )
+            .group_by(Gravacao.id_camera)
+        ).all())
+
+    def _high_motion(self, row, camera_rate) -> bool:
+        """Segmento com muito movimento pela atividade registrada ou, na falta dela, pelo bitrate."""
+        if row.atividade_media is not None:
+            return row.atividade_media > MOTION_ACTIVITY_PCT
+        if not camera_rate:
+            return False
+        duration = max((row.data_fim - row.data_inicio).total_seconds(), 1)
+        return (row.tamanho_bytes or 0) / duration > float(camera_rate) * MOTION_RATE_FACTOR
+
+    # ---- Processamento ----
+
+    def _run_batch(self) -> int:
+        from app.services.recorder import SyncSession
+
+        session = SyncSession()
+        try:
+            rows = self._candidates(session)
+            if not rows:
+                return 0
+            rates = self._camera_rates(session, {row.id_camera for row in rows})
+
+            for row in rows:
+                if not self.running:
+                    break
+                if self._high_motion(row, rates.get(row.id_camera)):
+                    self._mark(session, row.id, PERFIL_ORIGINAL)
+                    self.skipped_total += 1
+                    continue
+
+                started = time.monotonic()
+                self._process_recording(session, row)
+                elapsed = time.monotonic() - started
+
+                # Ciclo de trabalho: trabalha `elapsed`, descansa o proporcional
+                pct = min(max(settings.TRANSCODE_CPU_PERCENT, 1), 100)
+                self._wake.wait(elapsed * (100 / pct - 1))
+            return len(rows)
+        finally:
+            session.close()
+
+    def _mark(self, session, gravacao_id: int, perfil: str):
+        session.execute(
+            update(Gravacao).where(Gravacao.id == gravacao_id).values(perfil_video=perfil)
+        )
+        session.commit()
+
+    @staticmethod
+    def _media_columns(row, index, size: int) -> dict:
+        """Metadados de mídia da versão recodificada (mesma escala do filtro de _encode)."""
+        duration = index.duration_seconds
+        columns = {
+            "codec_video": "h264",
+            "bitrate_kbps": round(size * 8 / duration / 1000) if duration else None,
+            "keyframes": sum(1 for frag in index.fragments if frag.keyframe),
+        }
+        if row.largura and row.altura and row.altura > settings.TRANSCODE_MAX_HEIGHT:
+            height = settings.TRANSCODE_MAX_HEIGHT
+            columns["largura"] = round(row.largura * height / row.altura / 2) * 2
+            columns["altura"] = height
+        return columns
+
+    def _encode(self, source: str, target: str) -> bool:
+        bitrate = settings.TRANSCODE_VIDEO_BITRATE
+        command = [
+            "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-i", source,
+            "-map", "0:v:0", "-map", "0:a?",
+            "-vf", f"scale=-2:'min({settings.TRANSCODE_MAX_HEIGHT},ih)'",
+            "-c:v", "libx264", "-preset", "veryfast", "-threads", "1",
+            "-b:v", bitrate, "-maxrate", bitrate, "-bufsize", bitrate,
+            "-c:a", "copy",
+            "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            target,
+        ]
+        self._process = subprocess.Popen(
+            command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            preexec_fn=lambda: os.nice(19),
+        )
+        try:
+            _, stderr = self._process.communicate(timeout=TRANSCODE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.communicate()
+            logger.error(f"FFmpeg timeout ao recodificar {source}")
+            return False
+        finally:
+            returncode = self._process.returncode
+            self._process = None
+
+        if returncode != 0:
+            if self.running:
+                logger.warning(f"FFmpeg falhou ao recodificar {source}: {stderr[-300:]}")
+            return False
+        return True
+
+    def _process_recording(self, session, row):
+        path = row.caminho_arquivo
+        tmp = path + ".transcode.mp4"
+        self.current = path
+        try:
+            original = fragment_index.get_index(path)
+            if original is None or not self._encode(path, tmp):
+                self._mark(session, row.id, PERFIL_ORIGINAL)
+                self.skipped_total += 1
+                return
+
+            new_index = fragment_index.build_index(tmp)
+            new_size = os.path.getsize(tmp)
+            old_size = os.path.getsize(path)
+            if (
+                new_index is None
+                or abs(new_index.duration_seconds - original.duration_seconds) > DURATION_TOLERANCE
+                or new_size >= old_size * TRANSCODE_MIN_SAVING
+            ):
+                self._mark(session, row.id, PERFIL_ORIGINAL)
+                self.skipped_total += 1
+                return
+
+            # UPDATE antes do replace: a linha fica travada até o commit, e se a
+            # gravação foi apagada/arquivada no meio do caminho nada é trocado
+            result = session.execute(
+                update(Gravacao)
+                .where(Gravacao.id == row.id, Gravacao.caminho_arquivo == path)
+                .values(tamanho_bytes=new_size, perfil_video=PERFIL_REDUZIDO,
+                        **self._media_columns(row, new_index, new_size))
+            )
+            if result.rowcount != 1:
+                session.rollback()
+                return
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                session.rollback()
+                raise
+            session.commit()
+
+            fragment_index.invalidate(path)
+            fragment_index.write_sidecar(path, new_index)
+            self.transcoded_total += 1
+            self.bytes_saved_total += old_size - new_size
+            logger.info(
+                f"[Cam {row.id_camera}] Recodificada {os.path.basename(path)}: "
+                f"{old_size / 1024 / 1024:.1f} MB → {new_size / 1024 / 1024:.1f} MB"
+            )
+        except OSError as e:
+            logger.error(f"Erro ao recodificar {path}: {e}")
+        finally:
+            self.current = None
+            if os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+
+transcoder = Transcoder()
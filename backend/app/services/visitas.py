@@ -0,0 +1,134 @@
+"""
+Linha do tempo de visitas de uma pessoa ("onde essa pessoa esteve").
+
+Cada segmento gravado reconhece a mesma pessoa de novo, então uma permanência
+de 20 minutos vira dezenas de linhas em `reconhecimentos`. As visitas agrupam
+reconhecimentos consecutivos na mesma câmera: uma nova visita começa quando a
+câmera muda ou quando o intervalo desde o reconhecimento anterior passa de
+`intervalo_max` (padrão: dois segmentos). O agrupamento é feito no banco com
+LAG/SUM em janela sobre o índice (id_pessoa, dt_registro), lendo só o período
+pedido.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+from urllib.parse import urlencode
+
+from sqlalchemy import text
+
+from app.config import settings
+
+VISIT_GAP_SECONDS = 2 * settings.SEGMENT_DURATION_SECONDS
+DEFAULT_DAYS = 30
+
+_VISITAS_SQL = """
+WITH r AS (
+    SELECT id, id_camera, id_gravacao, dt_registro,
+           LAG(id_camera) OVER w AS camera_anterior,
+           LAG(dt_registro) OVER w AS registro_anterior
+    FROM reconhecimentos
+    WHERE id_pessoa = :id_pessoa AND dt_registro >= :inicio AND dt_registro < :fim {filtro_camera}
+    WINDOW w AS (ORDER BY dt_registro, id)
+), marcados AS (
+    SELECT id_camera, id_gravacao, dt_registro,
+           SUM(CASE WHEN camera_anterior IS DISTINCT FROM id_camera
+                      OR dt_registro - registro_anterior > :intervalo
+                    THEN 1 ELSE 0 END)
+               OVER (ORDER BY dt_registro, id ROWS UNBOUNDED PRECEDING) AS visita
+    FROM r
+), visitas AS (
+    SELECT visita, id_camera,
+           MIN(dt_registro) AS primeiro,
+           MAX(dt_registro) AS ultimo,
+           COUNT(*) AS reconhecimentos,
+           array_agg(DISTINCT id_gravacao) FILTER (WHERE id_gravacao IS NOT NULL) AS gravacoes
+    FROM marcados
+    GROUP BY visita, id_camera
+    ORDER BY visita DESC
+    LIMIT :limite
+)
+SELECT v.id_camera, c.nome, v.primeiro, v.ultimo, v.reconhecimentos, v.gravacoes
+FROM visitas v
+LEFT JOIN cameras c ON c.id = v.id_camera
+ORDER BY v.visita DESC
+"""
+
+
+def timeline(
+    id_pessoa: int,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    camera_id: Optional[int] = None,
+    intervalo_max: Optional[int] = None,
+    limite: int = 200,
+) -> dict:
+    """Visitas da pessoa no período (mais recentes primeiro), com as gravações de cada uma."""
+    from app.services.recorder import SyncSession
+
+    data_fim = data_fim or datetime.now()
+    data_inicio = data_inicio or data_fim - timedelta(days=DEFAULT_DAYS)
+    intervalo_max = intervalo_max or VISIT_GAP_SECONDS
+    filtro_camera = "AND id_camera = :camera_id" if camera_id is not None else ""
+
+    session = SyncSession()
+    try:
+        rows = session.execute(
+            text(_VISITAS_SQL.format(filtro_camera=filtro_camera)),
+            {
+                "id_pessoa": id_pessoa,
+                "inicio": data_inicio,
+                "fim": data_fim,
+                "camera_id": camera_id,
+                "intervalo": timedelta(seconds=intervalo_max),
+                "limite": limite,
+            },
+        ).all()
+
+        ids = sorted({gravacao_id for row in rows for gravacao_id in (row.gravacoes or ())})
+        gravacoes = {}
+        if ids:
+            for gravacao_id, inicio, fim in session.execute(
+                text("SELECT id, data_inicio, data_fim FROM gravacoes WHERE id = ANY(:ids)"),
+                {"ids": ids},
+            ):
+                gravacoes[gravacao_id] = {
+                    "id": gravacao_id,
+                    "data_inicio": inicio,
+                    "data_fim": fim,
+                    "url": f"/api/gravacoes/{gravacao_id}/stream",
+                }
+    finally:
+        session.close()
+
+    visitas = []
+    for id_camera, camera_nome, primeiro, ultimo, reconhecimentos, gravacao_ids in rows:
+        segmentos = sorted(
+            (gravacoes[i] for i in (gravacao_ids or ()) if i in gravacoes),
+            key=lambda g: g["data_inicio"],
+        )
+        playlist = None
+        if segmentos:
+            playlist = "/api/gravacoes/playlist.m3u8?" + urlencode({
+                "camera_id": id_camera,
+                "data_inicio": segmentos[0]["data_inicio"].isoformat(),
+                "data_fim": segmentos[-1]["data_fim"].isoformat(),
+            })
+        visitas.append({
+            "id_camera": id_camera,
+            "camera_nome": camera_nome,
+            "primeiro": primeiro,
+            "ultimo": ultimo,
+            "duracao_segundos": round((ultimo - primeiro).total_seconds()),
+            "reconhecimentos": reconhecimentos,
+            "segmentos": len(gravacao_ids or ()),
+            "gravacoes": segmentos,
+            "playlist": playlist,
+        })
+
+    return {
+        "id_pessoa": id_pessoa,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "intervalo_max_segundos": intervalo_max,
+        "visitas": visitas,
+    }
@@ -0,0 +1,204 @@
+"""
+Volumes de gravação (vários discos).
+
+RECORDINGS_PATHS lista as raízes de gravação (padrão: apenas RECORDINGS_PATH).
+Todas seguem o mesmo layout `{raiz}/{camera_id}/YYYY-MM-DD/`, e o caminho
+absoluto fica em `gravacoes.caminho_arquivo`, então playback, limpeza e
+exclusão resolvem o arquivo em qualquer volume sem mapeamento extra.
+
+Posicionamento de cada segmento:
+- cada câmera tem um volume preferido (`camera_id % n`), espalhando a escrita
+  das câmeras entre os discos
+- se o volume preferido tiver bem menos espaço livre que o melhor volume
+  (VOLUME_BALANCE_MARGIN_PCT) ou estiver quase cheio, o segmento vai para o
+  volume com mais espaço livre
+
+Estatísticas por volume: throughput de escrita (bytes dos segmentos
+finalizados na janela recente) e latência de escrita medida por uma sonda
+pequena com fsync.
+"""
+
+import os
+import time
+import shutil
+import logging
+import threading
+from collections import deque
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger("volumes")
+
+VOLUME_BALANCE_MARGIN_PCT = 15     # Diferença de % livre tolerada antes de redirecionar
+VOLUME_MIN_FREE_PCT = 5            # Abaixo disso o volume preferido é evitado
+THROUGHPUT_WINDOW_SECONDS = 300    # Janela do throughput de escrita
+PROBE_INTERVAL_SECONDS = 30        # Intervalo mínimo entre sondas de latência
+PROBE_SIZE = 4096
+
+
+class Volume:
+    """Raiz de gravação e suas estatísticas de escrita."""
+
+    def __init__(self, index: int, path: str):
+        self.index = index
+        self.path = os.path.abspath(path)
+        self.segmentos = 0
+        self.bytes_gravados = 0
+        self.latencia_ms = None
+        self._writes = deque()
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+
+    def usable(self) -> bool:
+        return os.path.isdir(self.path) and os.access(self.path, os.W_OK)
+
+    def free_pct(self) -> float:
+        usage = shutil.disk_usage(self.path)
+        return usage.free / usage.total * 100
+
+    def record_write(self, size: int):
+        now = time.monotonic()
+        with self._lock:
+            self.segmentos += 1
+            self.bytes_gravados += size
+            self._writes.append((now, size))
+            self._trim(now)
+
+    def _trim(self, now: float):
+        while self._writes and self._writes[0][0] < now - THROUGHPUT_WINDOW_SECONDS:
+            self._writes.popleft()
+
+    def throughput(self) -> float:
+        """Bytes/s gravados na janela recente."""
+        with self._lock:
+            self._trim(time.monotonic())
+            return sum(size for _, size in self._writes) / THROUGHPUT_WINDOW_SECONDS
+
+    def probe_latency(self) -> Optional[float]:
+        """Latência (ms) de uma escrita pequena com fsync; no máximo a cada PROBE_INTERVAL_SECONDS."""
+        now = time.monotonic()
+        if now - self._probe_at < PROBE_INTERVAL_SECONDS:
+            return self.latencia_ms
+        self._probe_at = now
+
+        probe = os.path.join(self.path, ".probe")
+        try:
+            t0 = time.perf_counter()
+            with open(probe, "wb") as f:
+                f.write(b"\0" * PROBE_SIZE)
+                f.flush()
+                os.fsync(f.fileno())
+            elapsed = (time.perf_counter() - t0) * 1000
+            os.remove(probe)
+        except OSError as e:
+            logger.warning(f"Sonda de escrita falhou em {self.path}: {e}")
+            return self.latencia_ms
+
+        # Média móvel exponencial para suavizar picos isolados
+        if self.latencia_ms is None:
+            self.latencia_ms = elapsed
+        else:
+            self.latencia_ms = 0.7 * self.latencia_ms + 0.3 * elapsed
+        return self.latencia_ms
+
+
+_volumes = [Volume(i, path) for i, path in enumerate(settings.RECORDINGS_PATHS)]
+
+
+def all_volumes() -> list:
+    return list(_volumes)
+
+
+def roots() -> list:
+    return [v.path for v in _volumes]
+
+
+def volume_for(path: str) -> Optional[Volume]:
+    """Volume que contém o caminho (None se estiver fora de todas as raízes)."""
+    abs_path = os.path.abspath(path)
+    for volume in sorted(_volumes, key=lambda v: len(v.path), reverse=True):
+        if abs_path == volume.path or abs_path.startswith(volume.path + os.sep):
+            return volume
+    return None
+
+
+def relative_path(path: str) -> Optional[str]:
+    """Caminho relativo à raiz do volume (layout `{camera}/{dia}/{arquivo}`)."""
+    volume = volume_for(path)
+    if volume is None:
+        return None
+    return os.path.relpath(os.path.abspath(path), volume.path)
+
+
+def choose_root(camera_id: int) -> str:
+    """Raiz onde o próximo segmento da câmera deve ser gravado."""
+    candidates = [v for v in _volumes if v.usable()]
+    if not candidates:
+        return settings.RECORDINGS_PATH
+    if len(candidates) == 1:
+        return candidates[0].path
+
+    free = {v.path: v.free_pct() for v in candidates}
+    preferred = candidates[camera_id % len(candidates)]
+    best = max(candidates, key=lambda v: free[v.path])
+    if (
+        free[preferred.path] < VOLUME_MIN_FREE_PCT
+        or free[best.path] - free[preferred.path] > VOLUME_BALANCE_MARGIN_PCT
+    ):
+        return best.path
+    return preferred.path
+
+
+def record_segment(path: str, size: int):
+    """Contabiliza um segmento finalizado no volume onde foi gravado."""
+    volume = volume_for(path)
+    if volume is not None:
+        volume.record_write(size)
+
+
+def distinct_usage() -> tuple:
+    """(total, usado, livre) somando cada dispositivo uma única vez."""
+    seen = set()
+    total = used = free = 0
+    for volume in _volumes:
+        try:
+            device = os.stat(volume.path).st_dev
+        except OSError:
+            continue
+        if device in seen:
+            continue
+        seen.add(device)
+        usage = shutil.disk_usage(volume.path)
+        total += usage.total
+        used += usage.used
+        free += usage.free
+    return total, used, free
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def stats() -> list:
+    result = []
+    for volume in _volumes:
+        entry = {
+            "indice": volume.index,
+            "caminho": volume.path,
+            "disponivel": volume.usable(),
+            "segmentos": volume.segmentos,
+            "bytes_gravados": volume.bytes_gravados,
+            "throughput_bytes_s": round(volume.throughput()),
+        }
+        if entry["disponivel"]:
+            usage = shutil.disk_usage(volume.path)
+            entry.update({
+                "total_bytes": usage.total,
+                "usado_bytes": usage.used,
+                "livre_bytes": usage.free,
+                "uso_pct": round(usage.used / usage.total * 100, 1),
+                "latencia_escrita_ms": _round(volume.probe_latency()),
+            })
+        result.append(entry)
+    return result
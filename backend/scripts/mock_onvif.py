@@ -0,0 +1,231 @@
+"""
+Endpoint ONVIF simulado (device + eventos PullPoint) para testar o detector
+"onvif" sem câmera.
+
+Uso:
+    python scripts/mock_onvif.py --port 8090 --periodo 60 --duracao 10
+
+Configure a câmera com detector_movimento="onvif" e
+onvif_url="http://<host>:8090/onvif/device_service". A cada `--periodo`
+segundos o mock emite IsMotion=true por `--duracao` segundos. O estado também
+pode ser forçado manualmente:
+
+    curl -X POST "http://localhost:8090/motion?state=true"
+    curl -X POST "http://localhost:8090/motion?state=false"
+    curl -X POST "http://localhost:8090/motion?state=auto"
+
+Com --usuario/--senha, requisições sem UsernameToken válido recebem SOAP Fault.
+"""
+
+import argparse
+import base64
+import hashlib
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TOPIC = "tns1:RuleEngine/CellMotionDetector/Motion"
+
+ENVELOPE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<s:Envelope xmlns:s="http://www.w3.org/2003/05/soap-envelope" '
+    'xmlns:wsa="http://www.w3.org/2005/08/addressing" '
+    'xmlns:tds="http://www.onvif.org/ver10/device/wsdl" '
+    'xmlns:tev="http://www.onvif.org/ver10/events/wsdl" '
+    'xmlns:wsnt="http://docs.oasis-open.org/wsn/b-2" '
+    'xmlns:tt="http://www.onvif.org/ver10/schema" '
+    'xmlns:tns1="http://www.onvif.org/ver10/topics">'
+    "<s:Body>{body}</s:Body></s:Envelope>"
+)
+
+
+class MotionState:
+    """Estado de movimento simulado, com fila de mudanças por assinatura."""
+
+    def __init__(self, periodo: int, duracao: int):
+        self.periodo = periodo
+        self.duracao = duracao
+        self.forced = None
+        self.started = time.monotonic()
+        self.changed = threading.Condition()
+        self.version = 0
+
+    def current(self) -> bool:
+        if self.forced is not None:
+            return self.forced
+        return (time.monotonic() - self.started) % self.periodo < self.duracao
+
+    def force(self, value):
+        with self.changed:
+            self.forced = value
+            self.version += 1
+            self.changed.notify_all()
+
+
+class Subscription:
+    def __init__(self):
+        self.last_sent = None
+        self.expires = time.monotonic() + 60
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _seconds(duration: str, default: int) -> float:
+    match = re.search(r"PT(\d+(?:\.\d+)?)S", duration or "")
+    return float(match.group(1)) if match else default
+
+
+def _notification(state: bool, operation: str) -> str:
+    return (
+        "<wsnt:NotificationMessage>"
+        f'<wsnt:Topic Dialect="http://www.onvif.org/ver10/tev/topicExpression/ConcreteSet">{TOPIC}</wsnt:Topic>'
+        f'<wsnt:Message><tt:Message UtcTime="{_now()}" PropertyOperation="{operation}">'
+        '<tt:Source><tt:SimpleItem Name="VideoSourceConfigurationToken" Value="VideoSource_1"/></tt:Source>'
+        f'<tt:Data><tt:SimpleItem Name="IsMotion" Value="{str(state).lower()}"/></tt:Data>'
+        "</tt:Message></wsnt:Message></wsnt:NotificationMessage>"
+    )
+
+
+def make_handler(motion: MotionState, username: str, password: str):
+    subscriptions = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            print(f"[mock-onvif] {self.command} {self.path} {fmt % args}")
+
+        def _reply(self, body: str, status: int = 200):
+            data = ENVELOPE.format(body=body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/soap+xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _fault(self, reason: str, status: int = 400):
+            self._reply(
+                "<s:Fault><s:Code><s:Value>s:Sender</s:Value></s:Code>"
+                f'<s:Reason><s:Text xml:lang="en">{reason}</s:Text></s:Reason></s:Fault>',
+                status,
+            )
+
+        def _authorized(self, request: str) -> bool:
+            if not username:
+                return True
+            user = re.search(r"<wsse:Username>(.*?)</wsse:Username>", request)
+            digest = re.search(r"<wsse:Password[^>]*>(.*?)</wsse:Password>", request)
+            nonce = re.search(r"<wsse:Nonce[^>]*>(.*?)</wsse:Nonce>", request)
+            created = re.search(r"<wsu:Created>(.*?)</wsu:Created>", request)
+            if not (user and digest and nonce and created) or user.group(1) != username:
+                return False
+            expected = base64.b64encode(hashlib.sha1(
+                base64.b64decode(nonce.group(1)) + created.group(1).encode() + password.encode()
+            ).digest()).decode()
+            return digest.group(1) == expected
+
+        def do_POST(self):
+            parsed = urlparse(self.path)
+            if parsed.path == "/motion":
+                value = parse_qs(parsed.query).get("state", ["auto"])[0].lower()
+                motion.force(None if value == "auto" else value in ("true", "1"))
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            request = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+            if not self._authorized(request):
+                self._fault("Sender not Authorized", 401)
+                return
+            host = f"http://{self.headers.get('Host')}"
+
+            if "GetCapabilities" in request:
+                self._reply(
+                    "<tds:GetCapabilitiesResponse><tds:Capabilities>"
+                    f"<tt:Events><tt:XAddr>{host}/onvif/event_service</tt:XAddr>"
+                    "<tt:WSSubscriptionPolicySupport>false</tt:WSSubscriptionPolicySupport>"
+                    "<tt:WSPullPointSupport>true</tt:WSPullPointSupport>"
+                    "</tt:Events></tds:Capabilities></tds:GetCapabilitiesResponse>"
+                )
+            elif "CreatePullPointSubscription" in request:
+                sub_id = uuid.uuid4().hex
+                subscriptions[sub_id] = Subscription()
+                self._reply(
+                    "<tev:CreatePullPointSubscriptionResponse><tev:SubscriptionReference>"
+                    f"<wsa:Address>{host}/onvif/subscription/{sub_id}</wsa:Address>"
+                    f"</tev:SubscriptionReference><wsnt:CurrentTime>{_now()}</wsnt:CurrentTime>"
+                    f"<wsnt:TerminationTime>{_now()}</wsnt:TerminationTime>"
+                    "</tev:CreatePullPointSubscriptionResponse>"
+                )
+            elif parsed.path.startswith("/onvif/subscription/"):
+                self._subscription(parsed.path.rsplit("/", 1)[-1], request)
+            else:
+                self._fault("Action not supported")
+
+        def _subscription(self, sub_id: str, request: str):
+            sub = subscriptions.get(sub_id)
+            if sub is None or sub.expires < time.monotonic():
+                self._fault("Subscription not found")
+                return
+
+            if "Unsubscribe" in request:
+                subscriptions.pop(sub_id, None)
+                self._reply("<wsnt:UnsubscribeResponse/>")
+            elif "Renew" in request:
+                sub.expires = time.monotonic() + _seconds(request, 60)
+                self._reply(
+                    f"<wsnt:RenewResponse><wsnt:TerminationTime>{_now()}</wsnt:TerminationTime>"
+                    f"<wsnt:CurrentTime>{_now()}</wsnt:CurrentTime></wsnt:RenewResponse>"
+                )
+            elif "PullMessages" in request:
+                deadline = time.monotonic() + _seconds(request, 5)
+                messages = ""
+                # Long-poll: responde na primeira mudança de estado ou no timeout
+                while time.monotonic() < deadline:
+                    state = motion.current()
+                    if state != sub.last_sent:
+                        operation = "Initialized" if sub.last_sent is None else "Changed"
+                        messages = _notification(state, operation)
+                        sub.last_sent = state
+                        break
+                    with motion.changed:
+                        motion.changed.wait(0.2)
+                self._reply(
+                    f"<tev:PullMessagesResponse><tev:CurrentTime>{_now()}</tev:CurrentTime>"
+                    f"<tev:TerminationTime>{_now()}</tev:TerminationTime>{messages}"
+                    "</tev:PullMessagesResponse>"
+                )
+            else:
+                self._fault("Action not supported")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint ONVIF simulado (eventos de movimento)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--periodo", type=int, default=60, help="Ciclo de movimento simulado (s)")
+    parser.add_argument("--duracao", type=int, default=10, help="Duração do movimento em cada ciclo (s)")
+    parser.add_argument("--usuario", default="", help="Exige UsernameToken com este usuário")
+    parser.add_argument("--senha", default="")
+    args = parser.parse_args()
+
+    motion = MotionState(args.periodo, args.duracao)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(motion, args.usuario, args.senha))
+    print(f"[mock-onvif] http://{args.host}:{args.port}/onvif/device_service")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,10 @@ CREATE TABLE IF NOT EXISTS cameras (
     hr_ini          INTEGER,
     hr_fim          INTEGER,
     recursos        VARCHAR(2000),
+    quota_gb        INTEGER,
+    zonas_movimento TEXT,
+    detector_movimento VARCHAR(20),
+    onvif_url       VARCHAR(500),
     criada_em       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     atualizada_em   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -24,6 +28,18 @@ CREATE TABLE IF NOT EXISTS gravacoes (
     data_fim        TIMESTAMP NOT NULL,
     tamanho_bytes   BIGINT DEFAULT 0,
     face_analyzed   BOOLEAN DEFAULT FALSE,
+    perfil_video    VARCHAR(20),
+    in_progress     BOOLEAN DEFAULT FALSE,
+    atividade_max   REAL,
+    atividade_media REAL,
+    atividade_serie BYTEA,
+    atividade_mapa  BYTEA,
+    duracao_segundos REAL,
+    codec_video     VARCHAR(20),
+    largura         INTEGER,
+    altura          INTEGER,
+    bitrate_kbps    INTEGER,
+    keyframes       INTEGER,
     criada_em       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -32,12 +48,38 @@ CREATE INDEX IF NOT EXISTS idx_gravacoes_camera     ON gravacoes(id_camera);
 CREATE INDEX IF NOT EXISTS idx_gravacoes_datas       ON gravacoes(data_inicio, data_fim);
 CREATE INDEX IF NOT EXISTS idx_gravacoes_camera_data ON gravacoes(id_camera, data_inicio, data_fim);
 CREATE INDEX IF NOT EXISTS idx_gravacoes_face_analyzed ON gravacoes(face_analyzed);
+CREATE INDEX IF NOT EXISTS idx_gravacoes_in_progress ON gravacoes(in_progress) WHERE in_progress;
+
+-- Rollups de uso por câmera (triggers e carga inicial criados pelo backend, services/rollups.py)
+CREATE TABLE IF NOT EXISTS uso_camera_hora (
+    id_camera       INTEGER NOT NULL,
+    hora            TIMESTAMP NOT NULL,
+    bytes           BIGINT NOT NULL DEFAULT 0,
+    segundos        DOUBLE PRECISION NOT NULL DEFAULT 0,
+    segmentos       INTEGER NOT NULL DEFAULT 0,
+    reconhecimentos INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_camera, hora)
+);
+CREATE INDEX IF NOT EXISTS idx_uso_camera_hora_hora ON uso_camera_hora(hora);
+
+CREATE TABLE IF NOT EXISTS uso_camera_dia (
+    id_camera       INTEGER NOT NULL,
+    dia             DATE NOT NULL,
+    bytes           BIGINT NOT NULL DEFAULT 0,
+    segundos        DOUBLE PRECISION NOT NULL DEFAULT 0,
+    segmentos       INTEGER NOT NULL DEFAULT 0,
+    reconhecimentos INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_camera, dia)
+);
+CREATE INDEX IF NOT EXISTS idx_uso_camera_dia_dia ON uso_camera_dia(dia);
+CREATE INDEX IF NOT EXISTS idx_gravacoes_camera_atividade ON gravacoes(id_camera, atividade_max);
 
 -- Tabela de Pessoas (reconhecimento facial)
 CREATE TABLE IF NOT EXISTS pessoas (
     id_pessoa       SERIAL PRIMARY KEY,
     no_pessoa       VARCHAR(200) NOT NULL,
     ao_tipo         CHAR(1) NOT NULL DEFAULT 'V' CHECK (ao_tipo IN ('S', 'C', 'A', 'V')),
+    total_fotos     INTEGER NOT NULL DEFAULT 0,
     criada_em       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     atualizada_em   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -48,7 +90,8 @@ CREATE TABLE IF NOT EXISTS reconhecimentos (
     id_pessoa       INTEGER NOT NULL REFERENCES pessoas(id_pessoa) ON DELETE CASCADE,
     id_camera       INTEGER NOT NULL REFERENCES cameras(id) ON DELETE CASCADE,
     id_gravacao     INTEGER REFERENCES gravacoes(id) ON DELETE CASCADE,
-    dt_registro     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    dt_registro     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    encoding        BYTEA
 );
 
 -- Índices para consultas em reconhecimentos
@@ -56,11 +99,13 @@ CREATE INDEX IF NOT EXISTS idx_reconhecimentos_pessoa ON reconhecimentos(id_pess
 CREATE INDEX IF NOT EXISTS idx_reconhecimentos_camera ON reconhecimentos(id_camera);
 CREATE INDEX IF NOT EXISTS idx_reconhecimentos_gravacao ON reconhecimentos(id_gravacao);
 CREATE INDEX IF NOT EXISTS idx_reconhecimentos_data   ON reconhecimentos(dt_registro);
+CREATE INDEX IF NOT EXISTS idx_reconhecimentos_pessoa_data ON reconhecimentos(id_pessoa, dt_registro);
 
 -- Tabela de Grupos de Câmeras
 CREATE TABLE IF NOT EXISTS grupos (
     id_grupo        SERIAL PRIMARY KEY,
     no_grupo        VARCHAR(200) NOT NULL,
+    quota_gb        INTEGER,
     criado_em       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     atualizado_em   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -0,0 +1,97 @@
+-- ============================================
+-- Particionamento mensal de gravacoes e reconhecimentos (opcional)
+--
+-- Converte as tabelas em particionadas por RANGE mensal para que a
+-- limpeza diária remova meses expirados com DROP PARTITION.
+--
+-- Uso (com o backend parado):
+--   docker compose exec -T postgres psql -U cameras -d cameras_db < database/partitioning.sql
+--
+-- Observações:
+-- - A PK passa a incluir a coluna de particionamento: (id, data_inicio) e
+--   (id, dt_registro). Os ids continuam vindo das mesmas sequences.
+-- - reconhecimentos.id_gravacao deixa de ter FK para gravacoes (o PostgreSQL
+--   exige que a FK referencie uma chave única que inclua a coluna de
+--   particionamento); a limpeza remove os reconhecimentos expirados por data.
+-- - As partições dos próximos meses são criadas pelo backend (startup e
+--   limpeza diária); a partição DEFAULT recebe o que ficar fora delas.
+-- ============================================
+
+BEGIN;
+
+-- ---- gravacoes ----
+ALTER TABLE reconhecimentos DROP CONSTRAINT IF EXISTS reconhecimentos_id_gravacao_fkey;
+ALTER SEQUENCE gravacoes_id_seq OWNED BY NONE;
+
+CREATE TABLE gravacoes_new (LIKE gravacoes INCLUDING DEFAULTS)
+    PARTITION BY RANGE (data_inicio);
+ALTER TABLE gravacoes_new ADD PRIMARY KEY (id, data_inicio);
+ALTER TABLE gravacoes_new
+    ADD FOREIGN KEY (id_camera) REFERENCES cameras(id) ON DELETE CASCADE;
+CREATE TABLE gravacoes_default PARTITION OF gravacoes_new DEFAULT;
+
+DO $$
+DECLARE
+    mes DATE;
+    ultimo DATE := date_trunc('month', CURRENT_DATE + INTERVAL '2 months');
+BEGIN
+    SELECT date_trunc('month', COALESCE(MIN(data_inicio), CURRENT_DATE)) INTO mes FROM gravacoes;
+    WHILE mes <= ultimo LOOP
+        EXECUTE format(
+            'CREATE TABLE gravacoes_p%s PARTITION OF gravacoes_new FOR VALUES FROM (%L) TO (%L)',
+            to_char(mes, 'YYYYMM'), mes, mes + INTERVAL '1 month'
+        );
+        mes := mes + INTERVAL '1 month';
+    END LOOP;
+END $$;
+
+INSERT INTO gravacoes_new SELECT * FROM gravacoes;
+DROP TABLE gravacoes;
+ALTER TABLE gravacoes_new RENAME TO gravacoes;
+ALTER SEQUENCE gravacoes_id_seq OWNED BY gravacoes.id;
+
+CREATE INDEX IF NOT EXISTS idx_gravacoes_camera     ON gravacoes(id_camera);
+CREATE INDEX IF NOT EXISTS idx_gravacoes_datas       ON gravacoes(data_inicio, data_fim);
+CREATE INDEX IF NOT EXISTS idx_gravacoes_camera_data ON gravacoes(id_camera, data_inicio, data_fim);
+CREATE INDEX IF NOT EXISTS idx_gravacoes_face_analyzed ON gravacoes(face_analyzed);
+CREATE INDEX IF NOT EXISTS idx_gravacoes_id         ON gravacoes(id);
+
+-- ---- reconhecimentos ----
+ALTER SEQUENCE reconhecimentos_id_seq OWNED BY NONE;
+
+CREATE TABLE reconhecimentos_new (LIKE reconhecimentos INCLUDING DEFAULTS)
+    PARTITION BY RANGE (dt_registro);
+ALTER TABLE reconhecimentos_new ADD PRIMARY KEY (id, dt_registro);
+ALTER TABLE reconhecimentos_new
+    ADD FOREIGN KEY (id_pessoa) REFERENCES pessoas(id_pessoa) ON DELETE CASCADE;
+ALTER TABLE reconhecimentos_new
+    ADD FOREIGN KEY (id_camera) REFERENCES cameras(id) ON DELETE CASCADE;
+CREATE TABLE reconhecimentos_default PARTITION OF reconhecimentos_new DEFAULT;
+
+DO $$
+DECLARE
+    mes DATE;
+    ultimo DATE := date_trunc('month', CURRENT_DATE + INTERVAL '2 months');
+BEGIN
+    SELECT date_trunc('month', COALESCE(MIN(dt_registro), CURRENT_DATE)) INTO mes FROM reconhecimentos;
+    WHILE mes <= ultimo LOOP
+        EXECUTE format(
+            'CREATE TABLE reconhecimentos_p%s PARTITION OF reconhecimentos_new FOR VALUES FROM (%L) TO (%L)',
+            to_char(mes, 'YYYYMM'), mes, mes + INTERVAL '1 month'
+        );
+        mes := mes + INTERVAL '1 month';
+    END LOOP;
+END $$;
+
+INSERT INTO reconhecimentos_new SELECT * FROM reconhecimentos;
+DROP TABLE reconhecimentos;
+ALTER TABLE reconhecimentos_new RENAME TO reconhecimentos;
+ALTER SEQUENCE reconhecimentos_id_seq OWNED BY reconhecimentos.id;
+
+CREATE INDEX IF NOT EXISTS idx_reconhecimentos_pessoa   ON reconhecimentos(id_pessoa);
+CREATE INDEX IF NOT EXISTS idx_reconhecimentos_camera   ON reconhecimentos(id_camera);
+CREATE INDEX IF NOT EXISTS idx_reconhecimentos_gravacao ON reconhecimentos(id_gravacao);
+CREATE INDEX IF NOT EXISTS idx_reconhecimentos_data     ON reconhecimentos(dt_registro);
+CREATE INDEX IF NOT EXISTS idx_reconhecimentos_pessoa_data ON reconhecimentos(id_pessoa, dt_registro);
+
+COMMIT;
@@ -32,13 +32,27 @@ export const updateCamera = (id, data) => api.put(`/api/cameras/${id}`, data)
 export const deleteCamera = (id) => api.delete(`/api/cameras/${id}`)
 export const toggleCameraContinuos = (id) => api.patch(`/api/cameras/${id}/continuos`)
 export const probeCamera = (id) => api.post(`/api/cameras/${id}/probe`)
+export const getCameraZonas = (id) => api.get(`/api/cameras/${id}/zonas`)
+export const updateCameraZonas = (id, zonas) => api.put(`/api/cameras/${id}/zonas`, zonas)
 
 // ---- Gravações ----
 export const getGravacoes = (params) => api.get('/api/gravacoes/', { params })
 export const getGravacao = (id) => api.get(`/api/gravacoes/${id}`)
-export const getGravacaoStreamUrl = (id) => `${API_BASE_URL}/api/gravacoes/${id}/stream`
+export const getGravacaoStreamUrl = (id, follow = false) =>
+    `${API_BASE_URL}/api/gravacoes/${id}/stream${follow ? '?follow=true' : ''}`
 export const getGravacaoDownloadUrl = (id) => `${API_BASE_URL}/api/gravacoes/${id}/download`
+export const getGravacaoThumbnailsUrl = (id) => `${API_BASE_URL}/api/gravacoes/${id}/thumbnails.vtt`
+export const getGravacaoAtividade = (id) => api.get(`/api/gravacoes/${id}/atividade`)
+export const getGravacaoAtividadeMapaUrl = (id) => `${API_BASE_URL}/api/gravacoes/${id}/atividade.png`
+export const getGravacoesExportUrl = (cameraIds, dataInicio, dataFim) => {
+    const params = new URLSearchParams({ data_inicio: dataInicio, data_fim: dataFim })
+    cameraIds.forEach((id) => params.append('camera_id', id))
+    return `${API_BASE_URL}/api/gravacoes/export?${params.toString()}`
+}
+export const getGravacoesPlaylistUrl = (params) =>
+    `${API_BASE_URL}/api/gravacoes/playlist.m3u8?${new URLSearchParams(params).toString()}`
 export const deleteGravacoes = (params) => api.delete('/api/gravacoes/', { params })
+export const getDeleteJob = (jobId) => api.get(`/api/gravacoes/jobs/${jobId}`)
 export const deleteGravacao = (id) => api.delete(`/api/gravacoes/${id}`)
 export const analyzeGravacao = (id) => api.post(`/api/gravacoes/${id}/analyze`)
 
@@ -48,8 +62,10 @@ export const getStream = (cameraId) => api.get(`/api/stream/${cameraId}`)
 
 // ---- Gravação (controle) ----
 export const getRecordingStatus = () => api.get('/api/recording/status')
+export const getRecordingMotionStats = () => api.get('/api/recording/motion')
 export const startRecording = () => api.post('/api/recording/start')
 export const stopRecording = () => api.post('/api/recording/stop')
+export const restartRecording = () => api.post('/api/recording/restart')
 export const getContinuousRecordingStatus = () => api.get('/api/recording/continuous/status')
 export const startContinuousRecording = () => api.post('/api/recording/continuous/start')
 export const stopContinuousRecording = () => api.post('/api/recording/continuous/stop')
@@ -61,11 +77,14 @@ export const getFaceRecognitionStatus = () => api.get('/api/face-recognition/sta
 export const startFaceRecognition = () => api.post('/api/face-recognition/start')
 export const stopFaceRecognition = () => api.post('/api/face-recognition/stop')
 
+// ---- Armazenamento ----
+export const getRetencao = () => api.get('/api/armazenamento/retencao')
+
 // ---- Health ----
 export const getHealth = () => api.get('/api/health')
 
 // ---- Pessoas ----
-export const getPessoas = () => api.get('/api/pessoas/')
+export const getPessoas = (params) => api.get('/api/pessoas/', { params })
 export const getPessoa = (id) => api.get(`/api/pessoas/${id}`)
 export const createPessoa = (data) => api.post('/api/pessoas/', data)
 export const updatePessoa = (id, data) => api.put(`/api/pessoas/${id}`, data)
@@ -82,6 +101,14 @@ export const uploadFace = (idPessoa, file) => {
 }
 export const getFaces = (idPessoa) => api.get(`/api/pessoas/${idPessoa}/faces`)
 export const deleteFace = (idPessoa, filename) => api.delete(`/api/pessoas/${idPessoa}/faces/${filename}`)
+export const buscarPorFoto = (file, params) => {
+    const formData = new FormData()
+    formData.append('file', file)
+    return api.post('/api/pessoas/busca-por-foto', formData, {
+        params,
+        headers: { 'Content-Type': 'multipart/form-data' },
+    })
+}
 
 // ---- Reconhecimentos ----
 export const getReconhecimentos = (idPessoa) => api.get(`/api/pessoas/${idPessoa}/reconhecimentos`)
@@ -15,6 +15,8 @@ const TIPO_LABELS = {
     V: { label: 'Visitante', color: '#64748b' },
 }
 
+const PAGE_SIZE = 200
+
 export default function Pessoas() {
     const [pessoas, setPessoas] = useState([])
     const [loading, setLoading] = useState(true)
@@ -23,6 +25,9 @@ export default function Pessoas() {
     const [toast, setToast] = useState(null)
     const [formNome, setFormNome] = useState('')
     const [formTipo, setFormTipo] = useState('V')
+    const [filtroTipo, setFiltroTipo] = useState('')
+    const [hasMore, setHasMore] = useState(false)
+    const [loadingMore, setLoadingMore] = useState(false)
 
     // Face capture state
     const [showFaceCapture, setShowFaceCapture] = useState(false)
@@ -43,11 +48,17 @@ export default function Pessoas() {
     const [photoViewerFaces, setPhotoViewerFaces] = useState([])
     const [photoViewerLoading, setPhotoViewerLoading] = useState(false)
 
-    const fetchPessoas = async () => {
+    const pessoasParams = (limit, offset) => (
+        filtroTipo ? { limit, offset, ao_tipo: filtroTipo } : { limit, offset }
+    )
+
+    // Recarrega a partir do início mantendo as páginas já exibidas
+    const fetchPessoas = async (limit = Math.max(PAGE_SIZE, pessoas.length)) => {
         try {
             setLoading(true)
-            const { data } = await getPessoas()
+            const { data } = await getPessoas(pessoasParams(limit, 0))
             setPessoas(data)
+            setHasMore(data.length === limit)
         } catch {
             showToast('Erro ao carregar pessoas', 'error')
         } finally {
@@ -55,7 +66,20 @@ export default function Pessoas() {
         }
     }
 
-    useEffect(() => { fetchPessoas() }, [])
+    const loadMorePessoas = async () => {
+        try {
+            setLoadingMore(true)
+            const { data } = await getPessoas(pessoasParams(PAGE_SIZE, pessoas.length))
+            setPessoas((prev) => [...prev, ...data])
+            setHasMore(data.length === PAGE_SIZE)
+        } catch {
+            showToast('Erro ao carregar pessoas', 'error')
+        } finally {
+            setLoadingMore(false)
+        }
+    }
+
+    useEffect(() => { fetchPessoas(PAGE_SIZE) }, [filtroTipo])
 
     const showToast = (message, type = 'success') => {
         setToast({ message, type })
@@ -459,9 +483,22 @@ export default function Pessoas() {
                     </h1>
                     <p className="page-subtitle">Gerencie pessoas e registre faces para reconhecimento facial</p>
                 </div>
-                <button className="btn btn-primary" onClick={openNewModal} id="btn-add-pessoa">
-                    <Plus size={16} /> Nova Pessoa
-                </button>
+                <div style={{ display: 'flex', gap: '0.5rem', alignItems: 'center' }}>
+                    <select
+                        className="form-select"
+                        value={filtroTipo}
+                        onChange={(e) => setFiltroTipo(e.target.value)}
+                        id="filtro-pessoa-tipo"
+                    >
+                        <option value="">Todos os tipos</option>
+                        {Object.entries(TIPO_LABELS).map(([value, { label }]) => (
+                            <option key={value} value={value}>{label}</option>
+                        ))}
+                    </select>
+                    <button className="btn btn-primary" onClick={openNewModal} id="btn-add-pessoa">
+                        <Plus size={16} /> Nova Pessoa
+                    </button>
+                </div>
             </div>
 
             {loading ? (
@@ -473,7 +510,7 @@ export default function Pessoas() {
                 <div className="empty-state">
                     <UserCircle size={48} />
                     <p style={{ fontSize: '1.125rem', fontWeight: 500, marginTop: '0.5rem' }}>
-                        Nenhuma pessoa cadastrada
+                        {filtroTipo ? 'Nenhuma pessoa deste tipo' : 'Nenhuma pessoa cadastrada'}
                     </p>
                     <p style={{ fontSize: '0.875rem', marginTop: '0.25rem' }}>
                         Clique em "Nova Pessoa" para começar.
@@ -488,6 +525,7 @@ export default function Pessoas() {
                                 <th>Nome</th>
                                 <th>Tipo</th>
                                 <th>Fotos</th>
+                                <th>Visto por último</th>
                                 <th>Cadastrado em</th>
                                 <th>Ações</th>
                             </tr>
@@ -551,6 +589,15 @@ export default function Pessoas() {
                                                 )}
                                             </button>
                                         </td>
+                                        <td style={{ color: 'var(--color-text-secondary)', fontSize: '0.8125rem' }}>
+                                            {pessoa.ultimo_reconhecimento ? (
+                                                <span title={`${pessoa.total_reconhecimentos} reconhecimento(s)`}>
+                                                    {formatDate(pessoa.ultimo_reconhecimento)}
+                                                    {pessoa.ultima_camera_nome && ` · ${pessoa.ultima_camera_nome}`}
+                                                    {` (${pessoa.total_reconhecimentos}x)`}
+                                                </span>
+                                            ) : '—'}
+                                        </td>
                                         <td style={{ color: 'var(--color-text-secondary)', fontSize: '0.8125rem' }}>
                                             {formatDate(pessoa.criada_em)}
                                         </td>
@@ -587,6 +634,18 @@ export default function Pessoas() {
                             })}
                         </tbody>
                     </table>
+                    {hasMore && (
+                        <div style={{ display: 'flex', justifyContent: 'center', padding: '1rem' }}>
+                            <button
+                                className="btn btn-secondary btn-sm"
+                                onClick={loadMorePessoas}
+                                disabled={loadingMore}
+                                id="btn-mais-pessoas"
+                            >
+                                {loadingMore ? 'Carregando...' : 'Carregar mais'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
@@ -8,7 +8,7 @@ import {
 import HlsPlayer from '../components/HlsPlayer'
 import {
     getCameras, getGravacoes, getGravacaoStreamUrl, getGravacaoDownloadUrl,
-    deleteGravacoes, deleteGravacao, analyzeGravacao,
+    deleteGravacoes, getDeleteJob, deleteGravacao, analyzeGravacao,
     getStreams, getGrupos, getPessoaFaceUrl
 } from '../api/client'
 
@@ -260,7 +260,14 @@ export default function Playback() {
 
         setDeleting(true)
         try {
-            const { data } = await deleteGravacoes(buildParams())
+            let { data } = await deleteGravacoes(buildParams())
+            // Exclusão roda em background: acompanha o job até concluir
+            while (data.status === 'executando') {
+                await new Promise(resolve => setTimeout(resolve, 1000))
+                const res = await getDeleteJob(data.job_id)
+                data = res.data
+            }
+            if (data.status === 'erro') throw new Error('Falha no job de exclusão')
             showToast(`${data.deletadas} gravações removidas (${formatSize(data.bytes_liberados)} liberados)`)
             setGravacoes([])
             setSelectedVideo(null)